@@ -0,0 +1,148 @@
+"""
+Steamアプリリストの同期のベンチマーク（手元のスタブサーバーに対して実行する）。
+IStoreService/GetAppList を真似たサーバーを立て、次を比べる。
+- 初回の全件の同期（ページ送り・インデックスの作成込み）
+- 一部のアプリが追加・改名された後の、差分の同期（受信量・時間）
+- 差分を上乗せしたインデックスの検索結果が、全件から作り直したインデックスと一致するか
+- start_steam_app_list_sync がすぐに戻る（Twitchへの最初のリクエストを待たせない）か
+
+    python benchmarks/bench_app_list_sync.py [--apps 150000] [--changes 500]
+
+作業用の一時ディレクトリで実行するので、手元のキャッシュは書き換えない。
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import string
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from radar import app_catalog, steam_index, utils  # noqa: E402
+from radar.http_client import HttpClient  # noqa: E402
+
+
+class StubStore:
+    """IStoreService/GetAppList の、appid順のページ送りと if_modified_since だけを真似る"""
+
+    def __init__(self, apps):
+        self.apps = apps  # appid -> {'appid', 'name', 'last_modified'}
+        self.requests = 0
+        self.bytes_sent = 0
+        self.lock = threading.Lock()
+
+    def page(self, query):
+        since = int(query.get('if_modified_since', ['0'])[0])
+        last_appid = int(query.get('last_appid', ['0'])[0])
+        limit = int(query.get('max_results', ['10000'])[0])
+        with self.lock:
+            matching = [app for appid, app in sorted(self.apps.items()) if appid > last_appid and app['last_modified'] > since]
+        page = matching[:limit]
+        body = {'apps': page}
+        if len(matching) > limit:
+            body.update(have_more_results=True, last_appid=page[-1]['appid'])
+        return json.dumps({'response': body}).encode('utf-8')
+
+
+def start_server(store):
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            url = urlsplit(self.path)
+            if url.path != app_catalog.STORE_APP_LIST_PATH:
+                self.send_error(404); return
+            payload = store.page(parse_qs(url.query))
+            with store.lock:
+                store.requests += 1
+                store.bytes_sent += len(payload)
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def random_name(rng):
+    return ' '.join(''.join(rng.choices(string.ascii_letters, k=rng.randint(3, 9))) for _ in range(rng.randint(1, 4)))
+
+
+def timed_sync(http, cfg, store):
+    store.requests = store.bytes_sent = 0
+    started = time.perf_counter()
+    result = app_catalog.sync(http, cfg)
+    return result, time.perf_counter() - started, store.requests, store.bytes_sent
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--apps', type=int, default=150000)
+    parser.add_argument('--changes', type=int, default=500)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    now = int(time.time())
+    apps = {appid: {'appid': appid, 'name': random_name(rng), 'last_modified': now - 86400 * 30}
+            for appid in rng.sample(range(10, args.apps * 20), args.apps)}
+    store = StubStore(apps)
+    server = start_server(store)
+
+    os.chdir(tempfile.mkdtemp())
+    os.environ['STEAM_API_KEY'] = 'bench'
+    cfg = {'steam_app_list': {
+        'mode': 'incremental', 'page_size': 20000, 'api_base': f"http://127.0.0.1:{server.server_port}",
+    }}
+    http = HttpClient(cfg)
+
+    result, seconds, requests_made, bytes_sent = timed_sync(http, cfg, store)
+    print(f"初回（全件）: {seconds:.2f}秒 / {requests_made}リクエスト / {bytes_sent / 1e6:.1f}MB / {result}")
+
+    # 一部を改名し、新しいアプリを追加する
+    changed_names = {}
+    for app in rng.sample(list(apps.values()), args.changes // 2):
+        app['name'], app['last_modified'] = random_name(rng), now
+        changed_names[app['appid']] = app['name']
+    for appid in range(args.apps * 20, args.apps * 20 + args.changes - args.changes // 2):
+        apps[appid] = {'appid': appid, 'name': random_name(rng), 'last_modified': now}
+        changed_names[appid] = apps[appid]['name']
+
+    index_before = steam_index.index_version(utils.STEAM_APP_LIST_FILE)
+    result, seconds, requests_made, bytes_sent = timed_sync(http, cfg, store)
+    print(f"差分: {seconds:.2f}秒 / {requests_made}リクエスト / {bytes_sent / 1e3:.1f}KB / {result}")
+    print(f"   - インデックスのファイルは書き換えていない: {index_before == steam_index.index_version(utils.STEAM_APP_LIST_FILE)}")
+
+    # 上乗せしたインデックスと、全件から作り直したインデックスの検索結果を比べる
+    overlaid = utils.load_steam_app_index(cfg)
+    conn = app_catalog.open_catalog()
+    app_catalog.rebuild_index(conn, 'rebuilt.bin')
+    app_catalog.close_catalog(conn)
+    rebuilt = steam_index.open_index('rebuilt.bin')
+    queries = list(changed_names.values())[:100] + [name[:-1] for name in list(changed_names.values())[:100]]
+    found = sum(steam_index.find_appid(overlaid, q) == appid for q, appid in zip(queries, changed_names))
+    same = sum(steam_index.find_appid(overlaid, q) == steam_index.find_appid(rebuilt, q) for q in queries)
+    print(f"   - 変わったアプリが見つかった: {found}/100 / 作り直したインデックスと同じ結果: {same}/{len(queries)}")
+
+    async def start():
+        started = time.perf_counter()
+        task = await utils.start_steam_app_list_sync(http, cfg)
+        returned = time.perf_counter() - started
+        await task
+        return returned
+    print(f"バックグラウンドの同期を開始して戻るまで: {asyncio.run(start()) * 1000:.1f}ms")
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,97 @@
+"""
+記録した外部APIの応答(fixtures)を再生して、core.main を丸ごと実行・計測するベンチマーク。
+認証情報もネットワークも使わないので、変更の前後で同じ入力に対する所要時間を比べられる。
+
+    RADAR_FIXTURES=record python run.py                      # まず、実際の実行の応答を記録する
+    python benchmarks/bench_replay.py --archive fixtures.sqlite3 [--runs 3] [--latency-ms 50]
+
+毎回、config.yaml と events.csv だけを置いた一時ディレクトリで実行する（キャッシュなしの状態）。
+--cache-dir を指定すると、そこにあるキャッシュファイルを写してから実行する。
+--warm を指定すると、同じディレクトリで続けて実行する（2回目以降はキャッシュが効いた状態）。
+"""
+import argparse
+import asyncio
+import glob
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import yaml
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, ROOT)
+
+from radar import core  # noqa: E402
+
+CACHE_PATTERNS = ['steam_app_list.bin', '*.sqlite3']
+
+
+def prepare_workdir(args, fixtures_path):
+    workdir = tempfile.mkdtemp(prefix='radar-replay-')
+    with open(os.path.join(ROOT, 'config.yaml'), encoding='utf-8') as f:
+        cfg = yaml.safe_load(f)
+    fixtures_cfg = cfg.setdefault('fixtures', {})
+    fixtures_cfg.update(mode='replay', path=fixtures_path)
+    if args.latency_ms is not None:
+        fixtures_cfg['latency_ms'] = args.latency_ms if args.latency_ms == 'recorded' else float(args.latency_ms)
+    with open(os.path.join(workdir, 'config.yaml'), 'w', encoding='utf-8') as f:
+        yaml.safe_dump(cfg, f, allow_unicode=True, sort_keys=False)
+    if os.path.exists(os.path.join(ROOT, 'events.csv')):
+        shutil.copy(os.path.join(ROOT, 'events.csv'), workdir)
+    if args.cache_dir:
+        for pattern in CACHE_PATTERNS:
+            for path in glob.glob(os.path.join(args.cache_dir, pattern)):
+                if os.path.abspath(path) != fixtures_path:
+                    shutil.copy(path, workdir)
+    return workdir
+
+
+def latest_report(workdir):
+    reports = sorted(glob.glob(os.path.join(workdir, 'run_reports', '*.json')))
+    if not reports:
+        return {}
+    with open(reports[-1], encoding='utf-8') as f:
+        return json.load(f)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--archive', default=os.path.join(ROOT, 'fixtures.sqlite3'))
+    parser.add_argument('--runs', type=int, default=3)
+    parser.add_argument('--latency-ms', default=None, help="'recorded' または ms（省略時は config.yaml の設定）")
+    parser.add_argument('--cache-dir', default=None)
+    parser.add_argument('--warm', action='store_true')
+    args = parser.parse_args()
+
+    fixtures_path = os.path.abspath(args.archive)
+    if not os.path.exists(fixtures_path):
+        sys.exit(f"記録ファイルがありません: {fixtures_path}（RADAR_FIXTURES=record python run.py で作成）")
+    # 手元の環境変数より、config.yaml に書いた再生の設定を優先させる
+    os.environ.pop('RADAR_FIXTURES', None)
+    os.environ.pop('RADAR_FIXTURES_PATH', None)
+
+    workdir = None
+    timings = []
+    for run in range(args.runs):
+        if workdir is None or not args.warm:
+            workdir = prepare_workdir(args, fixtures_path)
+        os.chdir(workdir)
+        started = time.perf_counter()
+        asyncio.run(core.main())
+        elapsed = time.perf_counter() - started
+        timings.append(elapsed)
+
+        report = latest_report(workdir)
+        phases = ' / '.join(f"{name} {seconds:.2f}秒" for name, seconds in report.get('phases', {}).items())
+        requests_made = sum(stats.get('count', 0) for stats in report.get('upstreams', {}).values())
+        print(f"\n⏱️ {run + 1}回目: {elapsed:.2f}秒（{phases}）/ 外部リクエスト {requests_made}件\n")
+
+    timings.sort()
+    print(f"📊 {args.runs}回の実行: 最短 {timings[0]:.2f}秒 / 中央値 {timings[len(timings) // 2]:.2f}秒 / 最長 {timings[-1]:.2f}秒")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,98 @@
+"""
+起動時間のベンチマーク。
+新しいPythonプロセスで「radar.core の import から、最初のTwitchへのリクエストまで」と、
+シグナルの読み込み (signals.load_signals) にかかる時間を測る。
+Googleトレンド / X の重みを0にした場合と、有効にした場合の両方を比べる。
+
+    python benchmarks/bench_startup.py [--repeat 5]
+
+実際の通信は行わない（Twitchのクライアントは差し替え、ソケットの接続は数えるだけで止める）。
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.join(os.path.dirname(__file__), '..')
+
+# 子プロセスで実行するコード。結果はJSONで標準出力に返す
+CHILD = r'''
+import asyncio, json, os, socket, sys, time
+started = time.perf_counter()
+
+connections = []
+def refuse_connection(address, *args, **kwargs):
+    connections.append(str(address))
+    raise OSError('network disabled in benchmark')
+socket.create_connection = refuse_connection
+
+import radar.core as core
+imported = time.perf_counter()
+
+class FirstRequest(Exception):
+    pass
+
+class StubTwitch:
+    def __init__(self, *args, **kwargs):
+        raise FirstRequest()
+
+core.Twitch = StubTwitch
+core.load_config = lambda: CFG
+os.environ.setdefault('TWITCH_CLIENT_ID', 'bench')
+os.environ.setdefault('TWITCH_CLIENT_SECRET', 'bench')
+try:
+    asyncio.run(core.main())
+except FirstRequest:
+    pass
+first_request = time.perf_counter()
+
+from radar import signals
+loaded = signals.load_signals(CFG)
+signals_loaded = time.perf_counter()
+
+print(json.dumps({
+    'import': imported - started,
+    'first_request': first_request - started,
+    'load_signals': signals_loaded - first_request,
+    'signals': [module.__name__.rsplit('.', 1)[-1] for module in loaded],
+    'pytrends_imported': 'pytrends' in sys.modules,
+    'connections': connections,
+}))
+'''
+
+
+def run_child(weights):
+    cfg = {'weights': weights}
+    code = f"CFG = {cfg!r}\n" + CHILD
+    env = dict(os.environ, PYTHONPATH=ROOT, PYTHONDONTWRITEBYTECODE='1')
+    output = subprocess.run(
+        [sys.executable, '-c', code], cwd=ROOT, env=env, capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    scenarios = {
+        'Trends / X 無効': {'trends_jp_spike': 0, 'twitter_jp_spike': 0},
+        'Trends / X 有効': {'trends_jp_spike': 10, 'twitter_jp_spike': 15},
+    }
+    for label, weights in scenarios.items():
+        runs = [run_child(weights) for _ in range(args.repeat)]
+        last = runs[-1]
+        median = lambda key: statistics.median(run[key] for run in runs) * 1000
+        print(f"[{label}]")
+        print(f"  import radar.core           : {median('import'):8.1f} ms")
+        print(f"  import → 最初のTwitchリクエスト: {median('first_request'):8.1f} ms")
+        print(f"  シグナルの読み込み           : {median('load_signals'):8.1f} ms ({len(last['signals'])}件)")
+        print(f"  pytrends の import           : {last['pytrends_imported']}")
+        print(f"  起動中のネットワーク接続     : {len(last['connections'])}件")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,122 @@
+"""
+get_steam_appid のベンチマーク。
+全件に対する従来の線形スキャンと、事前に組み立てたインデックスを比較し、
+結果が一致することも同時に確認する。
+
+    python benchmarks/bench_steam_appid.py [--queries 300]
+
+steam_app_list.bin があればそれを使い、なければ約20万件の疑似リストを生成する。
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from rapidfuzz import fuzz, process
+from radar import steam_index, utils
+
+COMMON_WORDS = [
+    'Apex', 'Legends', 'Dark', 'Souls', 'Elden', 'Ring', 'Monster', 'Hunter', 'World', 'Rise',
+    'Street', 'Fighter', 'Final', 'Fantasy', 'Dragon', 'Quest', 'Story', 'Tales', 'Sword', 'Art',
+    'Online', 'Simulator', 'Tycoon', 'Battle', 'Royale', 'Craft', 'Mine', 'Space', 'Station', 'Farm',
+    'The', 'of', 'and', 'Night', 'Dead', 'Daylight', 'Resident', 'Evil', 'Ghost', 'Tsushima',
+    'Soundtrack', 'Demo', 'DLC', 'Edition', 'Deluxe', 'Remastered', 'Pack', 'Season', 'Pass', 'II',
+]
+
+
+def load_or_generate_app_list(size):
+    index = steam_index.open_index(utils.STEAM_APP_LIST_FILE)
+    if index is not None:
+        names = steam_index.app_names(index)
+        return names, {name: int(index['appids'][pos]) for pos, name in enumerate(names)}
+    rng = random.Random(0)
+    # 実際のアプリ名に近づけるため、よく使われる単語と、ランダムな造語を混ぜる
+    syllables = ['ka', 'ri', 'to', 'mon', 'zel', 'dra', 'gon', 'ax', 'vel', 'or', 'thu', 'lin', 'pe', 'sty', 'qu']
+    words = COMMON_WORDS + [
+        ''.join(rng.choice(syllables) for _ in range(rng.randint(2, 4))).capitalize() for _ in range(30_000)
+    ]
+    names = []
+    for _ in range(size):
+        name = ' '.join(
+            rng.choice(COMMON_WORDS) if rng.random() < 0.3 else rng.choice(words)
+            for _ in range(rng.randint(1, 5))
+        )
+        if rng.random() < 0.3:
+            name += f" {rng.randint(2, 2025)}"
+        if rng.random() < 0.1:
+            name += rng.choice(['™', ':', ' - Soundtrack', '®'])
+        names.append(name)
+    app_dict = {name: 10 * (i + 1) for i, name in enumerate(names)}
+    return names, app_dict
+
+
+def make_queries(names, count):
+    """実際のTwitchカテゴリ名に近い「少しずれた」ゲーム名を作る"""
+    rng = random.Random(1)
+    queries = []
+    for _ in range(count):
+        name = rng.choice(names)
+        kind = rng.randrange(6)
+        if kind == 0:
+            queries.append(name)
+        elif kind == 1:
+            queries.append(name.upper())
+        elif kind == 2 and len(name) > 4:
+            cut = rng.randrange(len(name))
+            queries.append(name[:cut] + name[cut + 1:])
+        elif kind == 3:
+            queries.append(' '.join(reversed(name.split())))
+        elif kind == 4:
+            queries.append(name.split()[0])
+        else:
+            queries.append(name + ' Demo')
+    return queries
+
+
+def linear_scan(game_name, app_names, app_dict):
+    best_match = process.extractOne(game_name, app_names, scorer=fuzz.WRatio, score_cutoff=90)
+    return app_dict.get(best_match[0]) if best_match else None
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--size', type=int, default=200_000)
+    parser.add_argument('--queries', type=int, default=300)
+    args = parser.parse_args()
+
+    app_names, app_dict = load_or_generate_app_list(args.size)
+    queries = make_queries(app_names, args.queries)
+    print(f"アプリ数: {len(app_names)}件 / 検索クエリ: {len(queries)}件")
+
+    index_path = os.path.join(tempfile.mkdtemp(), 'steam_app_list.bin')
+    start = time.perf_counter()
+    steam_index.write_index(app_names, app_dict, index_path)
+    print(f"インデックス構築: {time.perf_counter() - start:.2f}秒 ({os.path.getsize(index_path) / 1e6:.1f}MB)")
+
+    start = time.perf_counter()
+    index = steam_index.open_index(index_path)
+    print(f"インデックス読み込み: {(time.perf_counter() - start) * 1000:.2f}ms")
+
+    start = time.perf_counter()
+    expected = [linear_scan(q, app_names, app_dict) for q in queries]
+    linear_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    actual = [steam_index.find_appid(index, q) for q in queries]
+    index_time = time.perf_counter() - start
+
+    mismatches = [(q, e, a) for q, e, a in zip(queries, expected, actual) if e != a]
+    print(f"線形スキャン: {linear_time:.2f}秒 ({linear_time / len(queries) * 1000:.1f}ms/件)")
+    print(f"インデックス: {index_time:.2f}秒 ({index_time / len(queries) * 1000:.1f}ms/件)")
+    print(f"高速化: {linear_time / index_time:.1f}倍 / 不一致: {len(mismatches)}件")
+    for q, e, a in mismatches[:10]:
+        print(f"   - {q!r}: 線形={e} インデックス={a}")
+    return 1 if mismatches else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
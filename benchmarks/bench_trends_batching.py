@@ -0,0 +1,101 @@
+"""
+Googleトレンドのまとめた問い合わせが、1語だけで問い合わせた場合（基準）と同じ急上昇を見つけられるかを確かめる。
+Googleトレンドの値の付け方（問い合わせの中で一番大きい語を100とした整数）を真似た偽の pytrends に対して、
+次の3つを比べる（リクエスト数と、基準と判定が一致したキーワードの数）。
+- 基準      : 1語ずつ問い合わせる
+- 従来      : アンカー語と4語ずつまとめるだけ（min_peak=0）
+- 組分け    : 検索量で組を分け、最大値が min_peak 未満の語は小さな語どうし・1語で問い合わせ直す
+              （1回目と、検索量の見積もりが残った2回目）
+
+    python benchmarks/bench_trends_batching.py [--keywords 400] [--spiking 0.3]
+"""
+import argparse
+import os
+import random
+import sys
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from radar import trends_cache  # noqa: E402
+from radar.signals import google_trends  # noqa: E402
+
+POINTS = 168  # today 7-d は1時間ごとの値
+ANCHOR = 'Minecraft'  # config.yaml の google_trends.anchor_term の既定値
+
+
+class FakeTrends:
+    """build_payload / interest_over_time だけを真似る。値は問い合わせの中の最大値を100とした整数"""
+
+    def __init__(self, volumes):
+        self.volumes = volumes
+        self.terms = []
+        self.requests = 0
+
+    def build_payload(self, terms, **_):
+        self.terms = terms
+        self.requests += 1
+
+    def interest_over_time(self):
+        series = {term: self.volumes[term] for term in self.terms}
+        top = max(values.max() for values in series.values())
+        return pd.DataFrame({term: np.round(values * 100 / top).astype(int) for term, values in series.items()})
+
+
+def make_volumes(rng, keywords, spiking):
+    """アンカー語の1/1000〜2倍の検索量。一部の語だけ、直近2時間が3倍に跳ねている"""
+    volumes = {ANCHOR: 1000 * (1 + 0.1 * np.sin(np.arange(POINTS) / 6))}
+    for keyword in keywords:
+        level = 10 ** rng.uniform(0, np.log10(2000))
+        values = level * np.array([1 + 0.2 * rng.random() for _ in range(POINTS)])
+        if rng.random() < spiking:
+            values[-2:] *= 3
+        volumes[keyword] = values
+    return volumes
+
+
+def detected(series, keywords):
+    return {keyword: (google_trends._spike_ratio(series.get(keyword, [])) or 0) > 2 for keyword in keywords}
+
+
+def run(fake, keywords, cfg, conn):
+    fake.requests = 0
+    series = google_trends._fetch_series(keywords, cfg, trends_cache_conn=conn)
+    return detected(series, keywords), fake.requests
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--keywords', type=int, default=400)
+    parser.add_argument('--spiking', type=float, default=0.3)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    keywords = [f"game{i}" for i in range(args.keywords)]
+    fake = FakeTrends(make_volumes(rng, keywords, args.spiking))
+    google_trends._pytrends = fake
+
+    baseline = detected({keyword: google_trends._fetch_unanchored([keyword])[keyword][0] for keyword in keywords}, keywords)
+    print(f"基準（1語ずつ）: {len(keywords)}リクエスト / 急上昇 {sum(baseline.values())}語")
+
+    def report(label, result, requests_made):
+        agree = sum(result[keyword] == baseline[keyword] for keyword in keywords)
+        hits = sum(result[keyword] and baseline[keyword] for keyword in keywords)
+        print(f"{label}: {requests_made}リクエスト / 基準と一致 {agree}/{len(keywords)}"
+              f" / 急上昇を検出 {hits}/{sum(baseline.values())}")
+
+    conn = trends_cache.open_cache(':memory:')
+    report('従来（まとめるだけ）', *run(fake, keywords, {'google_trends': {'min_peak': 0}}, conn))
+    trends_cache.close_cache(conn)
+
+    conn = trends_cache.open_cache(':memory:')
+    cfg = {'google_trends': {'min_peak': google_trends.MIN_PEAK, 'cache_ttl_hours': 0}}
+    report('組分け（1回目）    ', *run(fake, keywords, cfg, conn))
+    report('組分け（2回目）    ', *run(fake, keywords, cfg, conn))
+    trends_cache.close_cache(conn)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,157 @@
+"""
+X (Twitter) のクエリ計画のベンチマーク（手元の偽のX APIサーバーに対して実行する）。
+/2/tweets/counts/recent と /2/tweets/search/recent を真似たサーバーを立て、次を比べる。
+- 従来の方式（1ゲームにつき search_recent を1回、max_results=10）
+- まとめたクエリで件数を数え、上位だけツイートを取得する方式（signals.twitter.collect）
+それぞれのリクエスト数と、読んだツイート数（X の月間の取得上限に数えられる分）を出し、
+件数とエンゲージメントのサンプルが、ゲームごとに問い合わせた場合と一致するかを確かめる。
+
+    python benchmarks/bench_x_planner.py [--games 1000] [--active 0.05]
+"""
+import argparse
+import json
+import os
+import random
+import re
+import string
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+os.environ.setdefault('X_BEARER', 'bench')
+
+from radar.http_client import HttpClient  # noqa: E402
+from radar.signals import twitter  # noqa: E402
+
+
+class FakeX:
+    """ゲーム名(フレーズ)とハッシュタグの OR だけを解釈する、偽のX API"""
+
+    def __init__(self, tweets):
+        self.tweets = tweets  # 新しい順の [{'id', 'text', 'public_metrics'}, ...]
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.requests = {'counts': 0, 'search': 0}
+        self.posts_read = 0
+
+    def matching(self, query):
+        query = query.split(')')[0]
+        phrases = [p.casefold() for p in re.findall(r'"([^"]*)"', query)]
+        hashtags = [h.casefold() for h in re.findall(r'#\w+', re.sub(r'"[^"]*"', '', query))]
+        return [
+            tweet for tweet in self.tweets
+            if any(p in tweet['text'].casefold() for p in phrases) or any(h in tweet['text'].casefold() for h in hashtags)
+        ]
+
+    def counts(self, params):
+        with self.lock:
+            self.requests['counts'] += 1
+        total = len(self.matching(params['query'][0]))
+        return {'data': [{'tweet_count': total}], 'meta': {'total_tweet_count': total}}
+
+    def search(self, params):
+        max_results = int(params.get('max_results', ['10'])[0])
+        if not 10 <= max_results <= 100:
+            return None
+        data = self.matching(params['query'][0])[:max_results]
+        with self.lock:
+            self.requests['search'] += 1
+            self.posts_read += len(data)
+        return {'data': data, 'meta': {'result_count': len(data)}} if data else {'meta': {'result_count': 0}}
+
+
+def start_server(fake):
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            url = urlsplit(self.path)
+            params = parse_qs(url.query)
+            if url.path == twitter.COUNTS_PATH:
+                body = fake.counts(params)
+            elif url.path == twitter.SEARCH_PATH:
+                body = fake.search(params)
+            else:
+                self.send_error(404); return
+            if body is None:
+                self.send_error(400); return
+            payload = json.dumps(body).encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def random_name(rng):
+    return ' '.join(''.join(rng.choices(string.ascii_letters, k=rng.randint(4, 9))) for _ in range(rng.randint(1, 3)))
+
+
+def make_tweets(rng, names, active):
+    """一部のゲームだけが話題になっている状態（大半は0件、数件のゲームと、100件を超えるゲームが少し）"""
+    tweets = []
+    for name in rng.sample(names, int(len(names) * active)):
+        volume = rng.choice([1, 2, 3, 5, 8, 15, 40, 150])
+        for _ in range(volume):
+            mention = f"#{re.sub(r'[^0-9A-Za-z_]', '', name)}" if rng.random() < 0.3 else name
+            tweets.append({'text': f"{mention} たのしい", 'public_metrics': {
+                'like_count': rng.randint(0, 20), 'retweet_count': rng.randint(0, 5),
+            }})
+    rng.shuffle(tweets)
+    for i, tweet in enumerate(tweets):
+        tweet['id'] = str(i)
+    return tweets
+
+
+def legacy(games, cfg, http):
+    """従来の方式：1ゲームにつき search_recent を1回（件数も、取得した最大10件から数える）"""
+    results = {}
+    for game in games:
+        tweets = twitter._search(http, cfg, [game['name']], '', twitter.SAMPLE_SIZE)
+        results[game['name']] = {'count': len(tweets), 'engagements': [twitter._engagement(t) for t in tweets]}
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--games', type=int, default=1000)
+    parser.add_argument('--active', type=float, default=0.05)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    names = list(dict.fromkeys(random_name(rng) for _ in range(args.games)))
+    games = [{'name': name} for name in names]
+    fake = FakeX(make_tweets(rng, names, args.active))
+    server = start_server(fake)
+    cfg = {'x': {'api_base': f"http://127.0.0.1:{server.server_port}", 'max_query_length': 512, 'sample_top': 30}}
+    http = HttpClient(cfg)
+
+    legacy_results = legacy(games, cfg, http)
+    print(f"従来     : search {fake.requests['search']}回 / 読んだツイート {fake.posts_read}件")
+
+    fake.reset()
+    planned = twitter.collect(games, cfg, http)
+    print(f"まとめる : counts {fake.requests['counts']}回 + search {fake.requests['search']}回"
+          f" / 読んだツイート {fake.posts_read}件")
+
+    # 件数は、ゲームごとに数えた場合（偽サーバーの正解）と一致するはず
+    exact = sum(planned[name]['count'] == len(fake.matching(twitter.combined_query([name]))) for name in names)
+    print(f"   - 件数が正しいゲーム: {exact}/{len(names)}")
+    # サンプルを取ったゲームは、従来の方式と同じツイートのエンゲージメントになるはず
+    sampled = [name for name in names if planned[name]['engagements']]
+    same = sum(sorted(planned[name]['engagements']) == sorted(legacy_results[name]['engagements']) for name in sampled)
+    print(f"   - サンプルが従来と同じゲーム: {same}/{len(sampled)}")
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,194 @@
+import os
+import sqlite3
+import time
+from . import steam_index
+
+# Steamの全アプリ（AppIDと名前）を、実行をまたいで持っておく表。
+# 前回の同期からの差分だけを IStoreService/GetAppList で取り、上書き(upsert)で反映する。
+APP_CATALOG_FILE = 'steam_apps.sqlite3'
+
+DEFAULT_API_BASE = 'https://api.steampowered.com'
+STORE_APP_LIST_PATH = '/IStoreService/GetAppList/v1/'
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS apps (
+    appid         INTEGER PRIMARY KEY,
+    name          TEXT NOT NULL,
+    last_modified INTEGER NOT NULL DEFAULT 0,
+    sync_id       INTEGER NOT NULL,    -- 最後に名前が変わった（または追加された）同期
+    seen_sync_id  INTEGER NOT NULL     -- 最後にAPIの結果に含まれていた同期（全件の同期で、消えたアプリを掃除する用）
+);
+CREATE INDEX IF NOT EXISTS apps_by_sync ON apps (sync_id);
+CREATE TABLE IF NOT EXISTS syncs (
+    sync_id     INTEGER PRIMARY KEY AUTOINCREMENT,
+    mode        TEXT NOT NULL,         -- full / delta
+    started_at  REAL NOT NULL,
+    finished_at REAL,
+    changed     INTEGER NOT NULL DEFAULT 0,
+    removed     INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key   TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+
+def open_catalog(path=APP_CATALOG_FILE):
+    conn = sqlite3.connect(path)
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute('PRAGMA synchronous=NORMAL')
+    conn.executescript(_SCHEMA)
+    return conn
+
+
+def close_catalog(conn):
+    if conn is not None:
+        conn.commit()
+        conn.close()
+
+
+def _get_meta(conn, key):
+    row = conn.execute('SELECT value FROM meta WHERE key = ?', (key,)).fetchone()
+    return row[0] if row else None
+
+
+def _set_meta(conn, key, value):
+    conn.execute('INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)', (key, str(value)))
+
+
+def catalog_version(conn):
+    """
+    AppIDの対応のキャッシュを丸ごと捨てるべきかの判定に使う版。
+    差分の同期では変わらず、全件を取り直した時（消えたアプリがありうる時）だけ変わる。
+    """
+    return f"catalog:{_get_meta(conn, 'full_sync_id')}"
+
+
+def latest_sync_id(conn):
+    row = conn.execute('SELECT MAX(sync_id) FROM syncs WHERE finished_at IS NOT NULL').fetchone()
+    return row[0] or 0
+
+
+def changed_apps(conn, since_sync_id, until_sync_id):
+    """since_sync_id より後、until_sync_id までの同期で、追加・改名されたアプリを (AppID, 名前) で返す"""
+    return conn.execute(
+        'SELECT appid, name FROM apps WHERE sync_id > ? AND sync_id <= ?', (since_sync_id, until_sync_id)
+    ).fetchall()
+
+
+def _fetch_pages(http, settings, if_modified_since):
+    """IStoreService/GetAppList を、last_appid で1ページずつ送りながら取得する"""
+    url = settings.get('api_base', DEFAULT_API_BASE).rstrip('/') + STORE_APP_LIST_PATH
+    params = {
+        'key': os.environ.get('STEAM_API_KEY', ''),
+        'max_results': settings.get('page_size', 50000),
+        'include_games': 'true',
+        'include_software': 'true',
+    }
+    if if_modified_since:
+        params['if_modified_since'] = if_modified_since
+
+    while True:
+        response = http.get(url, params=params, timeout=30)
+        response.raise_for_status()
+        body = response.json().get('response', {})
+        apps = body.get('apps', [])
+        yield apps
+        if not apps or not body.get('have_more_results'):
+            return
+        params['last_appid'] = body.get('last_appid') or apps[-1]['appid']
+
+
+def _index_is_current(conn, index_path):
+    """検索用インデックス(steam_app_list.bin)が、このカタログから作ったものか"""
+    return (
+        os.path.exists(index_path)
+        and _get_meta(conn, 'index_file_version') == steam_index.index_version(index_path)
+    )
+
+
+def rebuild_index(conn, index_path=steam_index.STEAM_APP_INDEX_FILE):
+    """カタログ全体から、メモリマップ用の検索インデックスを作り直す（差分の反映ではなく、ときどきの整理用）"""
+    rows = conn.execute('SELECT appid, name FROM apps ORDER BY appid').fetchall()
+    app_names = [name for _, name in rows]
+    app_dict = {name: appid for appid, name in rows}
+    steam_index.write_index(app_names, app_dict, index_path)
+    _set_meta(conn, 'index_sync_id', latest_sync_id(conn))
+    _set_meta(conn, 'index_file_version', steam_index.index_version(index_path))
+    conn.commit()
+
+
+def load_overlay(conn, index_path=steam_index.STEAM_APP_INDEX_FILE):
+    """
+    インデックスを作った後の同期で追加・改名されたアプリ（インデックスに上乗せする差分）を返す。
+    インデックスがこのカタログから作ったものでなければ、上乗せできないので None。
+    """
+    if not _index_is_current(conn, index_path):
+        return None
+    since = int(_get_meta(conn, 'index_sync_id') or 0)
+    return changed_apps(conn, since, latest_sync_id(conn))
+
+
+def sync(http, cfg, path=APP_CATALOG_FILE, index_path=steam_index.STEAM_APP_INDEX_FILE):
+    """
+    前回の同期から変わったアプリだけを取得して、カタログに反映する。
+    初回と full_refresh_days ごとには全件を取り直し、APIの結果から消えたアプリを掃除する。
+    全体を1つのトランザクションで行うので、途中で失敗しても前回の状態のまま残る。
+    戻り値は、同期の結果のまとめ(dict)。
+    """
+    settings = cfg.get('steam_app_list', {})
+    conn = open_catalog(path)
+    try:
+        marker = _get_meta(conn, 'last_modified')
+        full_synced_at = float(_get_meta(conn, 'full_synced_at') or 0)
+        full = marker is None or time.time() - full_synced_at > settings.get('full_refresh_days', 30) * 86400
+        mode = 'full' if full else 'delta'
+
+        sync_id = conn.execute(
+            'INSERT INTO syncs (mode, started_at) VALUES (?, ?)', (mode, time.time())
+        ).lastrowid
+        newest_modified, received = int(marker or 0), 0
+        for apps in _fetch_pages(http, settings, None if full else int(marker)):
+            rows = [
+                (app['appid'], app['name'], app.get('last_modified', 0), sync_id, sync_id)
+                for app in apps if app.get('name')
+            ]
+            # 名前が変わった時だけ sync_id を進める（価格の変更などでは検索用の差分にしない）
+            conn.executemany(
+                'INSERT INTO apps (appid, name, last_modified, sync_id, seen_sync_id) VALUES (?, ?, ?, ?, ?) '
+                'ON CONFLICT(appid) DO UPDATE SET '
+                'sync_id = CASE WHEN apps.name != excluded.name THEN excluded.sync_id ELSE apps.sync_id END, '
+                'name = excluded.name, last_modified = excluded.last_modified, seen_sync_id = excluded.seen_sync_id',
+                rows,
+            )
+            received += len(rows)
+            newest_modified = max([newest_modified] + [app.get('last_modified', 0) for app in apps])
+
+        removed = 0
+        if full:
+            if received == 0:
+                raise RuntimeError("全件の同期で、アプリが1件も返ってきませんでした")
+            removed = conn.execute('DELETE FROM apps WHERE seen_sync_id != ?', (sync_id,)).rowcount
+            _set_meta(conn, 'full_synced_at', time.time())
+            _set_meta(conn, 'full_sync_id', sync_id)
+
+        changed = conn.execute('SELECT COUNT(*) FROM apps WHERE sync_id = ?', (sync_id,)).fetchone()[0]
+        _set_meta(conn, 'last_modified', newest_modified)
+        conn.execute(
+            'UPDATE syncs SET finished_at = ?, changed = ?, removed = ? WHERE sync_id = ?',
+            (time.time(), changed, removed, sync_id),
+        )
+        conn.commit()
+
+        # 全件の同期の後と、上乗せの差分が大きくなりすぎた時だけ、インデックスを作り直す
+        overlay = load_overlay(conn, index_path)
+        rebuilt = full or overlay is None or len(overlay) > settings.get('max_overlay', 20000)
+        if rebuilt:
+            rebuild_index(conn, index_path)
+        return {'mode': mode, 'received': received, 'changed': changed, 'removed': removed, 'rebuilt': rebuilt}
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        close_catalog(conn)
@@ -0,0 +1,144 @@
+import sqlite3
+import threading
+import time
+from rapidfuzz import fuzz, process
+from . import app_catalog, steam_index
+
+# Twitchのgame_id -> Steam AppID の対応を、実行をまたいで覚えておくキャッシュ
+APPID_CACHE_FILE = 'appid_cache.sqlite3'
+
+# 差分の同期で変わったアプリがこれより多ければ、1件ずつ確かめずに丸ごと捨てる
+MAX_CHANGES_TO_RECHECK = 20000
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS resolutions (
+    game_id      TEXT PRIMARY KEY,
+    game_name    TEXT NOT NULL,
+    appid        INTEGER,          -- NULL は「見つからなかった」ことを表す
+    matched_name TEXT,
+    score        REAL,
+    resolved_at  REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key   TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+# AppIDの解決はイベントループの外（スレッド）で行うので、接続は1つにしてロックで順番に使う
+_lock = threading.Lock()
+
+
+def open_cache(app_list_version, path=APPID_CACHE_FILE):
+    """
+    キャッシュを開く。Steamアプリリストが更新されていたら、
+    古い対応はすべて捨ててから使う。
+    """
+    conn = sqlite3.connect(path, check_same_thread=False)
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute('PRAGMA synchronous=NORMAL')
+    conn.executescript(_SCHEMA)
+
+    row = conn.execute("SELECT value FROM meta WHERE key = 'app_list_version'").fetchone()
+    if row is None or row[0] != app_list_version:
+        conn.execute('DELETE FROM resolutions')
+        conn.execute("DELETE FROM meta WHERE key = 'app_catalog_sync_id'")
+        conn.execute(
+            "INSERT OR REPLACE INTO meta (key, value) VALUES ('app_list_version', ?)", (app_list_version,)
+        )
+        conn.commit()
+    return conn
+
+
+def close_cache(conn):
+    if conn is not None:
+        with _lock:
+            conn.commit()
+            conn.close()
+
+
+def apply_app_changes(conn, catalog_conn):
+    """
+    前回の実行の後にアプリのカタログ(app_catalog)へ追加・改名されたアプリの分だけ、対応を捨てる。
+    - 対応先のAppIDが改名されたもの
+    - 見つからなかったゲームで、新しいアプリなら90点以上で一致するもの
+    - 見つかったゲームで、新しいアプリの方がより高い点で一致するもの
+    戻り値は、捨てた件数。
+    """
+    latest = app_catalog.latest_sync_id(catalog_conn)
+    with _lock:
+        row = conn.execute("SELECT value FROM meta WHERE key = 'app_catalog_sync_id'").fetchone()
+        conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('app_catalog_sync_id', ?)", (str(latest),))
+        if row is None or int(row[0]) >= latest:
+            conn.commit()
+            return 0
+
+        changed = app_catalog.changed_apps(catalog_conn, int(row[0]), latest)
+        if len(changed) > MAX_CHANGES_TO_RECHECK:
+            removed = conn.execute('DELETE FROM resolutions').rowcount
+            conn.commit()
+            return removed
+
+        changed_appids = {appid for appid, _ in changed}
+        changed_names = [name for _, name in changed]
+        outdated = []
+        for game_id, game_name, appid, score in conn.execute('SELECT game_id, game_name, appid, score FROM resolutions'):
+            if appid in changed_appids:
+                outdated.append((game_id,))
+                continue
+            if score is not None and score >= 100:
+                continue
+            cutoff = steam_index.MATCH_SCORE_CUTOFF if appid is None else score
+            match = process.extractOne(game_name, changed_names, scorer=fuzz.WRatio, score_cutoff=cutoff)
+            if match and (appid is None or match[1] > score):
+                outdated.append((game_id,))
+        conn.executemany('DELETE FROM resolutions WHERE game_id = ?', outdated)
+        conn.commit()
+        return len(outdated)
+
+
+def _find_override(overrides, game_id, game_name):
+    """config.yaml の appid_overrides を、game_id -> ゲーム名の順に探す"""
+    overrides = {str(key): value for key, value in overrides.items()}
+    for key in (game_id, game_name):
+        if key in overrides:
+            return True, overrides[key]
+    return False, None
+
+
+def resolve_steam_appid(conn, game_id, game_name, app_index, cfg):
+    """
+    Twitchのゲームに対応するSteam AppIDを返す。
+    1. 手動の上書き設定 (appid_overrides)
+    2. キャッシュ済みの結果（見つからなかった結果は negative_ttl_hours の間だけ有効）
+    3. アプリリストに対する、あいまい検索
+    """
+    found, appid = _find_override(cfg.get('appid_overrides') or {}, str(game_id), game_name)
+    if found:
+        return appid
+
+    if conn is None:
+        return steam_index.find_appid(app_index, game_name) if app_index else None
+
+    negative_ttl = cfg.get('appid_cache', {}).get('negative_ttl_hours', 24) * 3600
+    with _lock:
+        row = conn.execute(
+            'SELECT game_name, appid, resolved_at FROM resolutions WHERE game_id = ?', (str(game_id),)
+        ).fetchone()
+    if row is not None and row[0] == game_name:
+        cached_name, cached_appid, resolved_at = row
+        if cached_appid is not None or time.time() - resolved_at < negative_ttl:
+            return cached_appid
+
+    if not app_index:
+        return None
+
+    match = steam_index.find_match(app_index, game_name)
+    appid, matched_name, score = match if match else (None, None, None)
+    with _lock:
+        conn.execute(
+            'INSERT OR REPLACE INTO resolutions (game_id, game_name, appid, matched_name, score, resolved_at) '
+            'VALUES (?, ?, ?, ?, ?, ?)',
+            (str(game_id), game_name, appid, matched_name, score, time.time()),
+        )
+    return appid
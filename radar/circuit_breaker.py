@@ -0,0 +1,188 @@
+import asyncio
+import threading
+import time
+import aiohttp
+import requests
+
+# 既定の設定（config.yaml の circuit_breakers で、問い合わせ先ごとに上書き可能）
+# failure_threshold: 連続で何回失敗したら遮断するか / reset_seconds: 遮断してから何秒後に1回だけ試すか
+DEFAULT_BREAKER = {'failure_threshold': 5, 'reset_seconds': 300}
+
+# 問い合わせ先の不調とみなすHTTPステータス（それ以外の 4xx は、リクエスト側の問題とみなす）
+FAILURE_STATUSES = {401, 403, 429}
+
+CLOSED, OPEN, HALF_OPEN = 'closed', 'open', 'half_open'
+
+
+class CircuitOpenError(requests.exceptions.ConnectionError):
+    """遮断中の問い合わせ先を呼ぼうとした（requests のエラーとして、既存の except でそのまま拾える）"""
+
+
+def is_failure_status(status):
+    return status in FAILURE_STATUSES or status >= 500
+
+
+class CircuitBreaker:
+    """
+    1つの問い合わせ先のサーキットブレーカー。
+    - closed    : 通常どおり呼ぶ。連続の失敗が failure_threshold 回に達したら open へ
+    - open      : 呼ばずにすぐ諦める。reset_seconds が経ったら half_open へ
+    - half_open : 1回だけ試しに呼ぶ。成功なら closed へ、失敗ならまた open へ
+    """
+
+    def __init__(self, failure_threshold, reset_seconds):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self.probe_in_flight = False
+        self.failures = 0   # この実行での失敗の合計
+        self.rejected = 0   # 遮断中で呼ばずに済ませた回数
+        self.trips = 0      # open になった回数
+        self.lock = threading.Lock()
+
+    def _refresh(self):
+        if self.state == OPEN and time.monotonic() - self.opened_at >= self.reset_seconds:
+            self.state = HALF_OPEN
+            self.probe_in_flight = False
+
+    def is_open(self):
+        """
+        呼ぶ前から諦めるべきか（half_open の試しの1回は、ここでは消費しない）。
+        諦める場合は、呼び出しを省略した回数に数える。
+        """
+        with self.lock:
+            self._refresh()
+            skip = self.state == OPEN or (self.state == HALF_OPEN and self.probe_in_flight)
+            if skip:
+                self.rejected += 1
+            return skip
+
+    def allow(self):
+        with self.lock:
+            self._refresh()
+            if self.state == CLOSED:
+                return True
+            if self.state == HALF_OPEN and not self.probe_in_flight:
+                self.probe_in_flight = True
+                return True
+            self.rejected += 1
+            return False
+
+    def record_success(self):
+        with self.lock:
+            self.state = CLOSED
+            self.consecutive_failures = 0
+            self.probe_in_flight = False
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            self.consecutive_failures += 1
+            if self.state == HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+                if self.state != OPEN:
+                    self.trips += 1
+                self.state = OPEN
+                self.opened_at = time.monotonic()
+                self.probe_in_flight = False
+
+
+class CircuitBreakers:
+    """
+    問い合わせ先(upstream)ごとのサーキットブレーカーをまとめて管理する。
+    tracer を渡すと、call() で呼んだ外部リクエストの回数とレイテンシも記録する。
+    """
+
+    def __init__(self, cfg, tracer=None):
+        self.settings = cfg.get('circuit_breakers', {})
+        self.tracer = tracer
+        self.breakers = {}
+        self.lock = threading.Lock()
+
+    def get(self, upstream):
+        with self.lock:
+            if upstream not in self.breakers:
+                setting = {**DEFAULT_BREAKER, **self.settings.get('default', {}), **self.settings.get(upstream, {})}
+                self.breakers[upstream] = CircuitBreaker(setting['failure_threshold'], setting['reset_seconds'])
+            return self.breakers[upstream]
+
+    def is_open(self, upstream):
+        return upstream is not None and self.get(upstream).is_open()
+
+    def call(self, upstream, func, *args, is_failure=None, **kwargs):
+        """
+        func を呼び、結果を問い合わせ先のブレーカーに記録する。遮断中なら CircuitOpenError。
+        is_failure: 例外のうち、問い合わせ先の不調とみなすものを判定する関数（省略時はすべて）
+        """
+        breaker = self.guard(upstream)
+        try:
+            if self.tracer is None:
+                result = func(*args, **kwargs)
+            else:
+                result = self.tracer.timed(upstream, func, *args, **kwargs)
+        except Exception as e:
+            if is_failure is None or is_failure(e):
+                breaker.record_failure()
+            else:
+                breaker.record_success()
+            raise
+        breaker.record_success()
+        return result
+
+    def guard(self, upstream):
+        """呼ぶ直前に確認する。遮断中なら CircuitOpenError"""
+        breaker = self.get(upstream)
+        if not breaker.allow():
+            raise CircuitOpenError(f"{upstream} は一時的に遮断中です")
+        return breaker
+
+    def record_status(self, upstream, status):
+        breaker = self.get(upstream)
+        if is_failure_status(status):
+            breaker.record_failure()
+        else:
+            breaker.record_success()
+
+    def attach_twitch(self, twitch_api):
+        """
+        twitchAPI の全リクエストの成否を、twitch のブレーカーに記録する。
+        twitchAPI は 401 / 5xx と 400 / 404 を例外にするので、ほかの問い合わせ先と同じく
+        401 / 5xx と接続エラー・タイムアウトだけを失敗に数え、400 / 404 はリクエスト側の問題とみなす。
+        """
+        from twitchAPI.type import TwitchBackendException, UnauthorizedException
+        failures = (UnauthorizedException, TwitchBackendException, aiohttp.ClientError, asyncio.TimeoutError)
+        original_request = twitch_api._api_request
+
+        async def guarded_request(method, session, url, *args, **kwargs):
+            breaker = self.guard('twitch')
+            try:
+                response = await original_request(method, session, url, *args, **kwargs)
+            except Exception as e:
+                if isinstance(e, failures):
+                    breaker.record_failure()
+                else:
+                    breaker.record_success()
+                raise
+            self.record_status('twitch', response.status)
+            return response
+
+        twitch_api._api_request = guarded_request
+
+    def report(self):
+        """実行の終わりに表示する、問題のあった問い合わせ先ごとの状態"""
+        lines = []
+        for upstream, breaker in sorted(self.breakers.items()):
+            if breaker.failures or breaker.trips:
+                lines.append(
+                    f"{upstream}: {breaker.state}（失敗 {breaker.failures}回 / 遮断 {breaker.trips}回 / "
+                    f"呼び出しを省略 {breaker.rejected}回）"
+                )
+        return lines
+
+
+def call(breakers, upstream, func, *args, is_failure=None, **kwargs):
+    """breakers が渡されていなければ、そのまま実行する"""
+    if breakers is None:
+        return func(*args, **kwargs)
+    return breakers.call(upstream, func, *args, is_failure=is_failure, **kwargs)
@@ -2,18 +2,24 @@
 
 import os
 import yaml
-import json
-import pandas as pd
-import requests
-from datetime import datetime, timezone
+import numpy as np
 from twitchAPI.twitch import Twitch
 import asyncio
-import sys
+import contextlib
 import time
 
 # --- 1. インポートセクション ---
-from .signals import steam_ccu, slot_fit, competition, upcoming_event, twitch_drops, steam_news, jp_ratio, twitter, google_trends, market_health
-from . import utils
+from . import signals, utils, appid_cache, trends_cache, steamcharts_cache, news_cache, history_store, scoring, pruning, tracing, fixtures
+from .executor import SignalRunner
+from .http_client import HttpClient
+from .rate_limit import RateLimiter
+from .stream_index import build_stream_index
+from .discovery import discover_games
+from .singleflight import SingleFlight
+from .circuit_breaker import CircuitBreakers
+from .tracing import RunTrace
+from .notifier import DiscordNotifier
+from .event_index import build_event_index
 
 # --- 2. ヘルパー関数 ---
 def load_config():
@@ -21,9 +27,22 @@ def load_config():
         return yaml.safe_load(f)
 
 # --- 3. メインの司令塔関数 ---
-async def main(horizon='3d'):
-    print(f"🚀 Hot Games Radar PRO ({horizon}モード) - 起動します...")
+async def main(horizon=None):
+    """
+    horizon を指定するとそのモードだけを、省略すると config.yaml の horizons すべてを
+    1回の実行で評価する（外部APIへの問い合わせは全horizonで共有する）。
+    """
     cfg = load_config()
+    # fixtures.mode（環境変数 RADAR_FIXTURES）が record なら外部APIの応答を記録し、replay なら記録から再生する
+    with fixtures.activate(cfg):
+        await run_radar(cfg, horizon)
+
+async def run_radar(cfg, horizon=None):
+    """1回分の実行の本体（発見 → 評価 → 通知）"""
+    # シグナルごとの実行時間・結果と、外部リクエストの回数・レイテンシを、この実行の間ずっと記録する
+    tracer = RunTrace()
+    horizons = [horizon] if horizon else cfg.get('horizons', ['3d'])
+    print(f"🚀 Hot Games Radar PRO ({'/'.join(horizons)}モード) - 起動します...")
 
     try:
         twitch_api = Twitch(os.environ['TWITCH_CLIENT_ID'], os.environ['TWITCH_CLIENT_SECRET'])
@@ -32,187 +51,325 @@ async def main(horizon='3d'):
     except Exception as e:
         print(f"❌ Twitch APIの初期化または認証に失敗しました: {e}"); return
 
-    # 台帳の準備
-    utils.update_steam_app_list()
-    steam_app_list, events_df = {}, None
-    try:
-        with open(utils.STEAM_APP_LIST_FILE, 'r', encoding='utf-8') as f:
-            steam_app_list = json.load(f)
-    except FileNotFoundError:
-        print("⚠️ Steamアプリリストファイルが見つかりません。")
+    # 計測はいちばん内側で行い、レート制限の待ち時間を含めない
+    tracer.attach_twitch(twitch_api)
+    # 問い合わせ先ごとのレート制限。固定の待機時間ではなく、実際の残り枠で送信を調整する
+    rate_limiter = RateLimiter(cfg)
+    rate_limiter.attach_twitch(twitch_api)
+    # 失敗が続いた問い合わせ先は、この実行の残りでは呼ばない（サーキットブレーカー）
+    breakers = CircuitBreakers(cfg, tracer)
+    breakers.attach_twitch(twitch_api)
+
+    # Steam / SteamCharts / Discord への通信は、この1つのクライアントで接続を使い回す
+    http = HttpClient(cfg, rate_limiter, breakers, tracer)
+
+    # 台帳の準備（Steamアプリリストは、前回からの差分だけをバックグラウンドで取得する）
+    app_list_sync = await utils.start_steam_app_list_sync(http, cfg)
+    event_index = build_event_index(None)
+    steam_app_index = utils.load_steam_app_index(cfg)
+    appid_cache_conn = utils.open_appid_cache(cfg)
+    if app_list_sync is not None:
+        # 終わった時点で、変わったアプリを実行中のインデックスにも上乗せする
+        app_list_sync.add_done_callback(lambda task: utils.report_steam_app_list_sync(task, steam_app_index))
     try:
+        # pandas は重いので、Twitchへの最初のリクエストの後で読み込む
+        import pandas as pd
         events_df = pd.read_csv('events.csv', parse_dates=['start_jst'], encoding='utf-8')
+        # ゲーム名ごとの索引を1回だけ作り、シグナルはゲームごとに表を走査せず二分探索で引く
+        event_index = build_event_index(events_df)
     except Exception as e:
         print(f"⚠️ events.csvの読み込みに失敗しました: {e}")
 
     print("📡 日本市場の注目ゲームを調査中...")
-    games_to_analyze = []
+    phase_started = time.perf_counter()
     try:
         target_stream_count = cfg.get('analysis_target_count', 1000)
         print(f"   - 日本語の人気配信 {target_stream_count}件を起点に調査します...")
-        
-        jp_streams = []
-        async for stream in twitch_api.get_streams(language='ja', first=100):
-            jp_streams.append(stream)
-            if len(jp_streams) >= target_stream_count:
-                break
-        
+
+        # 配信のページ送り・get_games・AppIDの解決を、キューでつないで同時に進める
+        jp_streams, jp_streams_truncated, games = await discover_games(
+            twitch_api, cfg, lambda game_data: prepare_game(game_data, cfg, steam_app_index, appid_cache_conn)
+        )
+
         print(f"   - 実際に取得できた日本語配信: {len(jp_streams)}件")
-        game_ids = list(set([s.game_id for s in jp_streams if s.game_id]))
-        print(f"   - {len(game_ids)}件のユニークなゲームを発見しました。")
-        
-        if game_ids:
-            chunk_size = 100
-            for i in range(0, len(game_ids), chunk_size):
-                chunk = game_ids[i:i + chunk_size]
-                async for game in twitch_api.get_games(game_ids=chunk):
-                    games_to_analyze.append(game)
-        
-        jp_viewer_counts = {s.game_id: s.viewer_count for s in jp_streams}
-        games_to_analyze.sort(key=lambda g: jp_viewer_counts.get(g.id, 0), reverse=True)
+        print(f"   - {len(games)}件のユニークなゲームを発見しました。")
+
+        # ゲームごとの視聴者数の配列・合計・件数・最大値を、ここで1回だけ集計する
+        stream_index = build_stream_index(jp_streams)
+        games.sort(key=lambda g: stream_index['games'].get(g['id'], {}).get('total', 0), reverse=True)
+        games_to_analyze = [game['game_data'] for game in games]
         print(f"✅ {len(games_to_analyze)}件の日本市場ゲームを分析対象とします。")
     except Exception as e:
         print(f"❌ ゲームリストの取得に失敗しました: {e}"); return
+    tracer.record_phase('discovery', time.perf_counter() - phase_started)
+
+    # 今回のスナップショットを履歴に残す（次回以降の伸び率の計算に使う）
+    history_conn, history_taken_at = None, None
+    try:
+        history_conn = history_store.open_store()
+        history_taken_at = history_store.record_snapshot(history_conn, stream_index, jp_streams_truncated, cfg)
+    except Exception as e:
+        print(f"⚠️ 配信履歴の記録に失敗しました: {e}")
 
     print("⚙️ 各ゲームのスコアを計算中...")
-    ENABLED_SIGNALS = [steam_ccu, slot_fit, competition, upcoming_event, twitch_drops, steam_news, jp_ratio, twitter, google_trends, market_health]
-    
-    tasks = [
-        analyze_single_game(
-            game_data, cfg, twitch_api, steam_app_list, events_df, ENABLED_SIGNALS, jp_streams, horizon
-        ) 
-        for game_data in games_to_analyze
-    ]
-    results = await asyncio.gather(*tasks)
+    phase_started = time.perf_counter()
+    # 有効なシグナルだけを、ここで初めて読み込む（重み0のシグナルは import もしない）
+    ENABLED_SIGNALS = signals.load_signals(cfg)
+
+    # horizon(3d/7d/30d)で結果が変わるシグナルだけを、horizonごとに評価し直す
+    # それ以外（外部APIを呼ぶもの）は、1回の実行で1度だけ評価して全horizonで共有する
+    horizon_signals = [m for m in ENABLED_SIGNALS if getattr(m, 'HORIZON_DEPENDENT', False)]
+    shared_signals = [m for m in ENABLED_SIGNALS if m not in horizon_signals]
+
+    # score_batch() を持つシグナルは、ゲームごとではなく全ゲームをまとめて一度に評価する
+    scoring_mode = cfg.get('scoring_mode', 'batch')
+    is_batch = lambda m: scoring_mode == 'batch' and hasattr(m, 'score_batch')
+
+    # 同期シグナル（requests / time.sleep を使うもの）はスレッドプールで並行実行する
+    runner = SignalRunner(cfg, breakers, tracer)
+    # 全シグナルに共通で渡す、この実行だけの道具（twitch_api と同じように渡す）
+    signal_context = {
+        'twitch_api': twitch_api, 'http': http, 'rate_limiter': rate_limiter, 'circuit_breakers': breakers,
+        'tracer': tracer,
+        'event_index': event_index,
+        'stream_index': stream_index, 'jp_streams_truncated': jp_streams_truncated,
+        'trends_cache_conn': trends_cache.open_cache(), 'steamcharts_cache_conn': steamcharts_cache.open_cache(),
+        'news_cache_conn': news_cache.open_cache(),
+        'history_conn': history_conn, 'history_taken_at': history_taken_at,
+        # 同じ問い合わせ（同じAppIDなど）は、この実行の中で1回にまとめる
+        'single_flight': SingleFlight(),
+    }
+
+    # 実行ごとに1回だけ準備するシグナル（全ゲーム分をまとめて問い合わせるもの）
+    for module in ENABLED_SIGNALS:
+        if hasattr(module, 'prepare'):
+            try:
+                with tracer.measure(tracing.signal_name(module, 'prepare')):
+                    signal_context.update(await module.prepare(games=games_to_analyze, cfg=cfg, **signal_context) or {})
+            except Exception as e:
+                print(f"⚠️ {module.__name__}の事前準備に失敗しました: {e}")
+    # 2段階評価：外部APIを呼ばない安いシグナルで先に順位の見込みを出し、
+    # 通知される上位に届きうるゲームだけ、外部APIを呼ぶ高いシグナルを実行する
+    pruning_enabled = cfg.get('pruning', {}).get('enabled', True)
+    expensive_signals = [m for m in shared_signals if pruning_enabled and pruning.is_expensive(m, signal_context)]
+    cheap_signals = [m for m in shared_signals if m not in expensive_signals]
+
+    rankings = {}
+    try:
+        await prefetch_signals([m for m in cheap_signals if not is_batch(m)], games, cfg, signal_context, runner)
+        tasks = [
+            analyze_single_game(
+                game, cfg, signal_context, [m for m in cheap_signals if not is_batch(m)], horizons[0], runner
+            ) 
+            for game in games
+        ]
+        results = await asyncio.gather(*tasks)
+        analyzed_games = [game for game, _ in results]
+        errors = {game['id']: error for game, error in results if error}
+        shared_batch_results = run_batch_signals(
+            [m for m in cheap_signals if is_batch(m)], analyzed_games, cfg, horizons[0], signal_context
+        )
+
+        slates = {}
+        for horizon in horizons:
+            slates[horizon] = await evaluate_horizon(
+                analyzed_games, errors, shared_batch_results,
+                [m for m in horizon_signals if not is_batch(m)], [m for m in horizon_signals if is_batch(m)],
+                cfg, horizon, signal_context, runner
+            )
 
-    scored_games, errored_games = [], []
-    for game, error in results:
-        if error:
-            errored_games.append({'name': game['name'], 'error': error})
-        else:
-            scored_games.append(game)
+        if expensive_signals:
+            await run_expensive_signals(
+                analyzed_games, errors, slates, expensive_signals, is_batch, cfg, horizons[0], signal_context, runner
+            )
 
-    scored_games.sort(key=lambda x: x.get('total_score', 0), reverse=True)
+        for horizon, (horizon_games, batch_results) in slates.items():
+            rankings[horizon] = rank_slate(horizon_games, batch_results, errors, cfg, horizon)
+    finally:
+        runner.shutdown()
+        appid_cache.close_cache(appid_cache_conn)
+        trends_cache.close_cache(signal_context['trends_cache_conn'])
+        steamcharts_cache.close_cache(signal_context['steamcharts_cache_conn'])
+        news_cache.close_cache(signal_context['news_cache_conn'])
+        history_store.close_store(history_conn)
+    tracer.record_phase('scoring', time.perf_counter() - phase_started)
     print("✅ スコア計算完了！")
 
     print("📨 結果をDiscordに送信中...")
-    send_results_to_discord(scored_games, errored_games, cfg, horizon)
+    phase_started = time.perf_counter()
+    # horizonごとのWebhookへ同時に送る（待ち時間はDiscordのレート制限ヘッダーに従う）
+    notifier = DiscordNotifier(cfg, rate_limiter, breakers, tracer)
+    await notifier.send_all(rankings, run_summary=tracer.summary_lines())
+    if app_list_sync is not None:
+        await asyncio.gather(app_list_sync, return_exceptions=True)
+    http.close()
+    tracer.record_phase('notify', time.perf_counter() - phase_started)
+
+    # 失敗が続いた問い合わせ先（サーキットブレーカー）の状態を報告する
+    breaker_report = breakers.report()
+    for line in breaker_report:
+        print(f"🔌 {line}")
+
+    # シグナル・外部リクエストごとの計測結果を、実行ごとのJSONレポートに残す
+    try:
+        report_path = tracer.write_report(
+            cfg.get('tracing', {}).get('report_dir', 'run_reports'),
+            extra={'horizons': horizons, 'games': len(games), 'circuit_breakers': breaker_report},
+        )
+        print(f"📊 実行レポートを保存しました: {report_path}")
+    except Exception as e:
+        print(f"⚠️ 実行レポートの保存に失敗しました: {e}")
     print("🎉 全ての処理が正常に完了しました！")
 
 # --- 4. 現場監督関数 ---
-async def analyze_single_game(game_data, cfg, twitch_api, steam_app_list, events_df, signal_modules, jp_streams, horizon):
-    """１つのゲームを分析し、成功なら結果を、失敗ならエラーメッセージを返す"""
-    game = {'id': game_data.id, 'name': game_data.name, 'game_data': game_data}
-    error_messages = []
+def merge_signal_result(game_scores, game_flags, result):
+    """シグナル1つ分の結果を、ゲームのスコアとフラグに取り込む"""
+    if result:
+        for key, value in result.items():
+            if 'score' in key: game_scores[key] = value
+        if 'source_hit_flags' in result:
+            game_flags.extend(result.get('source_hit_flags', []))
 
-    appid = utils.get_steam_appid(game['name'], steam_app_list)
-    if appid:
-        game['steam_appid'] = appid
+def run_batch_signals(signal_modules, games, cfg, horizon, signal_context):
+    """全ゲーム分の列を返すシグナル(score_batch)を実行する"""
+    batch_results = []
+    tracer = signal_context.get('tracer')
+    for module in signal_modules:
+        try:
+            with tracer.measure(tracing.signal_name(module, 'score_batch')) if tracer else contextlib.nullcontext():
+                batch_results.append(module.score_batch(games=games, cfg=cfg, horizon=horizon, **signal_context) or {})
+        except Exception as e:
+            print(f"⚠️ {module.__name__}の一括評価に失敗しました: {e}")
+    return batch_results
 
-    game_scores, game_flags = {}, []
-    
+async def prefetch_signals(signal_modules, games, cfg, signal_context, runner):
+    """これから評価するゲームの分を、まとめて問い合わせられるシグナル(prefetch)に先に取りに行かせる"""
     for module in signal_modules:
+        if hasattr(module, 'prefetch') and games:
+            try:
+                await runner.call(module, 'prefetch', games=games, cfg=cfg, **signal_context)
+            except Exception as e:
+                print(f"⚠️ {module.__name__}の事前取得に失敗しました: {e}")
+
+async def run_game_signals(game, signal_modules, cfg, horizon, signal_context, runner):
+    """
+    1つのゲームに対して、シグナルを互いに待たずに同時に実行し、結果のリストを返す。
+    失敗したシグナルの分は、結果の代わりにその例外が入る。
+    """
+    # ★★★【あなたの指摘を反映！】★★★
+    # 各専門家に、現在の分析モード(horizon)を、正しく伝える
+    signal_kwargs = dict(game=game, cfg=cfg, horizon=horizon, **signal_context)
+
+    async def run_signal(module):
         try:
-            # ★★★【あなたの指摘を反映！】★★★
-            # 各専門家に、現在の分析モード(horizon)を、正しく伝える
-            if asyncio.iscoroutinefunction(module.score):
-                result = await module.score(game=game, cfg=cfg, twitch_api=twitch_api, events_df=events_df, jp_streams=jp_streams, horizon=horizon)
-            else:
-                result = module.score(game=game, cfg=cfg, twitch_api=twitch_api, events_df=events_df, jp_streams=jp_streams, horizon=horizon)
-            
-            if result:
-                for key, value in result.items():
-                    if 'score' in key: game_scores[key] = value
-                if 'source_hit_flags' in result:
-                    game_flags.extend(result.get('source_hit_flags', []))
+            return await runner.run(module, **signal_kwargs)
         except Exception as e:
-            pass
+            return e
 
-    # 'weights'の取得方法を、3チャンネル対応の構造に合わせる
-    current_weights = cfg.get('weights', {}).get(horizon, cfg.get('weights', {}))
-    total_score = 0
-    for key, value in game_scores.items():
-        weight_multiplier = current_weights.get(key.replace('_score', ''), 1)
-        total_score += value * weight_multiplier
+    return await asyncio.gather(*(run_signal(module) for module in signal_modules))
 
-    game['total_score'] = total_score
-    game['flags'] = list(set(game_flags))
-    
-    error_summary = ", ".join(error_messages) if error_messages else None
-    return game, error_summary
+async def evaluate_horizon(analyzed_games, errors, shared_batch_results, per_game_signals, batch_signals, cfg, horizon, signal_context, runner):
+    """
+    1つのhorizon用に、ゲームの写しを作ってhorizonで変わるシグナルだけを評価する。
+    共有の評価結果はそのまま使う。戻り値は (ゲームの写し, score_batch() の結果のリスト)。
+    失敗したシグナルは、ゲームごとのエラー(errors)に書き足す。
+    """
+    games = [dict(game, scores=dict(game['scores']), flags=list(game['flags'])) for game in analyzed_games]
+
+    for game in games:
+        results = await run_game_signals(game, per_game_signals, cfg, horizon, signal_context, runner)
+        add_errors(errors, game['id'], [f"{message} ({horizon})" for message in signal_errors(per_game_signals, results)])
+        for result in results:
+            if not isinstance(result, Exception):
+                merge_signal_result(game['scores'], game['flags'], result)
+
+    batch_results = shared_batch_results + run_batch_signals(batch_signals, games, cfg, horizon, signal_context)
+    return games, batch_results
 
-# --- 5. 通知担当関数 ---
-def send_results_to_discord(games, errored_games, cfg, horizon):
+async def run_expensive_signals(analyzed_games, errors, slates, expensive_signals, is_batch, cfg, horizon, signal_context, runner):
     """
-    Discordに分析結果を送信する。
-    Embedのサイズ制限を考慮し、10件ごとに分割して送信する。
+    どれかのhorizonで通知される上位に入りうるゲームにだけ、外部APIを呼ぶシグナルを実行し、
+    その結果を各horizonの写し(slates)に書き足す。
     """
-    webhook_secret_name = f"DISCORD_WEBHOOK_URL_{horizon.upper()}"
-    webhook_url = os.environ.get(webhook_secret_name)
-    
-    if not webhook_url:
-        print(f"⚠️ Webhook URL ({webhook_secret_name}) が設定されていません。"); return
+    candidates = np.zeros(len(analyzed_games), dtype=bool)
+    for slate_horizon, (games, batch_results) in slates.items():
+        partial_totals = scoring.slate_totals(games, batch_results, cfg, slate_horizon)
+        low, high = pruning.contribution_bounds(expensive_signals, analyzed_games, cfg, slate_horizon)
+        candidates |= pruning.select_candidates(partial_totals, low, high, cfg)
+    print(f"✂️ 外部APIを使うシグナルの評価対象: {int(candidates.sum())}/{len(analyzed_games)}件")
 
-    score_threshold = cfg.get('notification_score_threshold', 10)
-    game_count = cfg.get('notification_game_count', 20)
-    
-    # --- ★★★【分割送信機能の心臓部】★★★ ---
-    
-    # 1. まず、通知対象となるゲームのリストを作成
-    games_to_notify = [g for g in games if g.get('total_score', 0) >= score_threshold][:game_count]
-    
-    # 2. リストを、10件ずつの小さな「塊（チャンク）」に分割する
-    chunk_size = 10
-    chunks = [games_to_notify[i:i + chunk_size] for i in range(0, len(games_to_notify), chunk_size)]
-    
-    total_notified_count = 0
-
-    # 3. 各チャンク（10件ずつのリスト）ごとに、Embedを作成して送信する
-    for i, chunk in enumerate(chunks):
-        
-        # 2通目以降のタイトルを少し変える
-        report_title = f"📈 Hot Games Radar ({horizon}) - 分析レポート"
-        if len(chunks) > 1:
-            report_title += f" ({i+1}/{len(chunks)})"
-
-        embed = { "title": report_title, "color": 5814783, "fields": [] }
-
-        for game in chunk:
-            # game_countは全体の上限、notified_countは現在のEmbedの件数を数える
-            current_rank = total_notified_count + 1
-            
-            tags_for_title = " ".join([f"`{flag}`" for flag in game['flags'][:2]])
-            field_name = f"{'🥇🥈🥉'[current_rank-1] if current_rank <= 3 else '🔹'} {current_rank}位: {game['name']} (スコア: {game.get('total_score', 0):.0f}) {tags_for_title}"
-            
-            links = []
-            if 'steam_appid' in game:
-                links.append(f"**[Steam]({f'https://store.steampowered.com/app/{game["steam_appid"]}'})**")
-            twitch_category_name = game['name'].lower().replace(' ', '-')
-            links.append(f"**[Twitch]({f'https://www.twitch.tv/directory/category/{twitch_category_name}'})**")
-            google_trend_query = requests.utils.quote(f"{game['name']} ゲーム")
-            links.append(f"**[Googleトレンド]({f'https://trends.google.com/trends/explore?q={google_trend_query}&geo=JP'})**")
-            link_string = " | ".join(links)
-            
-            field_value = f"🔗 {link_string}\n──────────"
-            embed["fields"].append({ "name": field_name, "value": field_value })
-            total_notified_count += 1
-
-        # エラー報告は、最後のレポートにだけ付ける
-        if i == len(chunks) - 1 and cfg.get('notification_include_errors', True) and errored_games:
-            error_list_str = "\n".join([f"- {g['name']}" for g in errored_games[:5]])
-            embed["fields"].append({ "name": "⚠️ 一部センサーでエラーが検出されたゲーム", "value": error_list_str })
-
-        if not embed["fields"]:
-            continue # 送信するフィールドがなければ、次のチャンクへ
+    per_game_signals = [m for m in expensive_signals if not is_batch(m)]
+    candidate_indexes = np.flatnonzero(candidates).tolist()
+    await prefetch_signals(
+        per_game_signals, [analyzed_games[i] for i in candidate_indexes], cfg, signal_context, runner
+    )
+    signal_results = await asyncio.gather(*(
+        run_game_signals(analyzed_games[i], per_game_signals, cfg, horizon, signal_context, runner)
+        for i in candidate_indexes
+    ))
+    extra_batch_results = run_batch_signals(
+        [m for m in expensive_signals if is_batch(m)], analyzed_games, cfg, horizon, signal_context
+    )
 
-        try:
-            response = requests.post(webhook_url, json={"embeds": [embed]})
-            response.raise_for_status()
-            print(f"✅ Discordへレポート({i+1}/{len(chunks)})の通知に成功しました。")
-            # APIのレートリミットを避けるため、少し待機
-            time.sleep(1) 
-        except requests.exceptions.RequestException as e:
-            print(f"❌ Discordへの通知に失敗しました: {e}")
-
-    if total_notified_count == 0:
-        print("✅ 通知対象の注目ゲームはありませんでした。")
\ No newline at end of file
+    for i, results in zip(candidate_indexes, signal_results):
+        add_errors(errors, analyzed_games[i]['id'], signal_errors(per_game_signals, results))
+
+    for games, batch_results in slates.values():
+        batch_results.extend(extra_batch_results)
+        for i, results in zip(candidate_indexes, signal_results):
+            for result in results:
+                if not isinstance(result, Exception):
+                    merge_signal_result(games[i]['scores'], games[i]['flags'], result)
+
+def signal_errors(signal_modules, results):
+    """run_game_signals() の結果から、失敗したシグナルのエラーメッセージを取り出す"""
+    return [
+        f"{module.__name__}: {result}" for module, result in zip(signal_modules, results) if isinstance(result, Exception)
+    ]
+
+def add_errors(errors, game_id, error_messages):
+    """ゲームごとのエラー(errors)に、失敗したシグナルのエラーメッセージを書き足す"""
+    if error_messages:
+        errors[game_id] = ", ".join(([errors[game_id]] if game_id in errors else []) + error_messages)
+
+def rank_slate(games, batch_results, errors, cfg, horizon):
+    """
+    重み付け（ゲーム×シグナルの行列）で合計を出し、1つのhorizonのランキングを作る。
+    一部のシグナルが失敗したゲームも、取れた分のスコアでランキングに載せ、エラーは別に一覧にする。
+    """
+    scoring.score_slate(games, batch_results, cfg, horizon)
+
+    errored_games = [{'name': game['name'], 'error': errors[game['id']]} for game in games if game['id'] in errors]
+    scored_games = sorted(games, key=lambda x: x.get('total_score', 0), reverse=True)
+    return scored_games, errored_games
+
+def prepare_game(game_data, cfg, steam_app_index, appid_cache_conn):
+    """Helixのゲーム情報から、分析用のゲーム(dict)を作る（配信の取得中に、届いた順に呼ばれる）"""
+    game = {'id': game_data.id, 'name': game_data.name, 'game_data': game_data}
+
+    # 一度解決したゲームは、キャッシュから即座にAppIDを取り出す
+    appid = appid_cache.resolve_steam_appid(appid_cache_conn, game['id'], game['name'], steam_app_index, cfg)
+    if appid:
+        game['steam_appid'] = appid
+    return game
+
+async def analyze_single_game(game, cfg, signal_context, signal_modules, horizon, runner):
+    """１つのゲームを分析し、成功なら結果を、失敗ならエラーメッセージを返す"""
+    error_messages = []
+
+    game_scores, game_flags = {}, []
+
+    # 1つのゲームのシグナルも、互いに待たずに同時に実行する
+    signal_results = await run_game_signals(game, signal_modules, cfg, horizon, signal_context, runner)
+    error_messages.extend(signal_errors(signal_modules, signal_results))
+
+    for result in signal_results:
+        if not isinstance(result, Exception):
+            merge_signal_result(game_scores, game_flags, result)
+
+    # 重み付けと合計は、全ゲームが揃ってから scoring.score_slate でまとめて行う
+    game['scores'] = game_scores
+    game['flags'] = game_flags
+    
+    error_summary = ", ".join(error_messages) if error_messages else None
+    return game, error_summary
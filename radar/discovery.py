@@ -0,0 +1,75 @@
+import asyncio
+
+# Helixの get_games に一度に渡せるIDの上限
+GAME_ID_BATCH_SIZE = 100
+
+
+async def _produce_game_ids(twitch_api, target_stream_count, jp_streams, id_queue):
+    """日本語配信をページ送りしながら集め、初めて見たゲームIDをすぐ次の段へ流す"""
+    seen_ids = set()
+    truncated = False  # 取得上限で打ち切ったか（＝取りこぼした配信があり得るか）
+    async for stream in twitch_api.get_streams(language='ja', first=100):
+        jp_streams.append(stream)
+        if stream.game_id and stream.game_id not in seen_ids:
+            seen_ids.add(stream.game_id)
+            await id_queue.put(stream.game_id)
+        if len(jp_streams) >= target_stream_count:
+            truncated = True
+            break
+    await id_queue.put(None)  # 終わりの合図
+    return truncated
+
+
+async def _fetch_games(twitch_api, id_queue, game_queue):
+    """
+    届いたゲームIDを get_games に渡し、ゲーム情報を次の段へ流す。
+    問い合わせ中に届いたIDは、次の問い合わせで最大100件までまとめて送る。
+    """
+    done = False
+    while not done:
+        chunk = [await id_queue.get()]
+        while len(chunk) < GAME_ID_BATCH_SIZE and not id_queue.empty():
+            chunk.append(id_queue.get_nowait())
+        if chunk[-1] is None:
+            chunk.pop()
+            done = True
+        if chunk:
+            async for game in twitch_api.get_games(game_ids=chunk):
+                await game_queue.put(game)
+    await game_queue.put(None)
+
+
+async def _resolve_games(game_queue, resolve, games):
+    """
+    届いたゲームから順に、分析の下準備（Steam AppIDの解決など）を済ませる。
+    キャッシュにないゲームのあいまい検索は1件で数十ミリ秒かかるので、スレッドで実行し、
+    その間も配信のページ送りと get_games を止めない。
+    """
+    while (game_data := await game_queue.get()) is not None:
+        games.append(await asyncio.to_thread(resolve, game_data))
+
+
+async def discover_games(twitch_api, cfg, resolve):
+    """
+    「日本語配信の取得 → get_games → ゲームの下準備」を、上限付きのキューでつないで同時に進める。
+    配信のページ送りが終わるのを待たずに、見つかったゲームから順に次の段へ流れていく。
+    - resolve : Helixのゲーム情報を受け取り、分析用のゲーム(dict)を返す関数
+    戻り値は (取得した配信のリスト, 取得上限で打ち切ったか, 下準備済みのゲームのリスト)。
+    """
+    target_stream_count = cfg.get('analysis_target_count', 1000)
+    queue_size = cfg.get('pipeline', {}).get('queue_size', 200)
+    id_queue = asyncio.Queue(maxsize=queue_size)
+    game_queue = asyncio.Queue(maxsize=queue_size)
+    jp_streams, games = [], []
+
+    # どこかの段が失敗したら、残りの段も止める
+    try:
+        async with asyncio.TaskGroup() as stages:
+            producer = stages.create_task(_produce_game_ids(twitch_api, target_stream_count, jp_streams, id_queue))
+            stages.create_task(_fetch_games(twitch_api, id_queue, game_queue))
+            stages.create_task(_resolve_games(game_queue, resolve, games))
+    except ExceptionGroup as group:
+        # 呼び出し元には、最初に失敗した段のエラーをそのまま伝える
+        raise group.exceptions[0]
+
+    return jp_streams, producer.result(), games
@@ -0,0 +1,78 @@
+import numpy as np
+
+NS_PER_DAY = 86400 * 10**9
+EVENT_TZ = 'Asia/Tokyo'
+
+
+def to_ns(dt):
+    """タイムゾーン付きの日時を、索引と同じUTCのナノ秒に変換する"""
+    return int(dt.timestamp()) * 10**9 + dt.microsecond * 1000
+
+
+def normalize_name(name):
+    """イベント台帳とTwitchのゲーム名を突き合わせるための名前（大文字小文字と前後の空白を無視）"""
+    return str(name).strip().lower()
+
+
+class GameEvents:
+    """1つのゲームのイベント。開始時刻（UTCのナノ秒）の昇順に並べた配列で持つ"""
+
+    __slots__ = ('starts', 'hype_weights', 'event_names', 'rows')
+
+    def __init__(self, starts, hype_weights, event_names, rows):
+        self.starts = starts
+        self.hype_weights = hype_weights
+        self.event_names = event_names
+        self.rows = rows  # events.csv での行番号（同点のとき、先に登録されたイベントを選ぶのに使う）
+
+    def between(self, start_ns, end_ns, include_end=True):
+        """開始時刻が [start_ns, end_ns] に入るイベントの範囲(slice)を、二分探索で返す"""
+        lo = np.searchsorted(self.starts, start_ns, side='left')
+        hi = np.searchsorted(self.starts, end_ns, side='right' if include_end else 'left')
+        return slice(lo, hi)
+
+
+class EventIndex:
+    """
+    イベント台帳(events.csv)の索引。実行ごとに1回だけ作り、全シグナル・全ゲームで共有する。
+    ゲームごとの検索は辞書の参照1回、期間の絞り込みは二分探索なので、台帳が大きくなっても
+    ゲーム1件あたりの手間はほとんど増えない。
+    """
+
+    def __init__(self, games):
+        self.games = games
+
+    def __len__(self):
+        return len(self.games)
+
+    def get(self, game_name):
+        return self.games.get(normalize_name(game_name))
+
+
+def build_event_index(events_df):
+    """pd.read_csv('events.csv') の結果から索引を作る（開始日時がないイベントは除く）"""
+    if events_df is None or events_df.empty:
+        return EventIndex({})
+    import pandas as pd
+
+    starts = pd.to_datetime(events_df['start_jst'], errors='coerce')
+    starts = starts.dt.tz_localize(EVENT_TZ) if starts.dt.tz is None else starts.dt.tz_convert(EVENT_TZ)
+    valid = starts.notna().to_numpy()
+    start_ns = starts.dt.tz_convert('UTC').dt.tz_localize(None).to_numpy('datetime64[ns]').astype(np.int64)[valid]
+    names = events_df['game_name'].astype(str).str.strip().str.lower().to_numpy()[valid]
+    hype_weights = pd.to_numeric(events_df['hype_weight'], errors='coerce').fillna(0).to_numpy(dtype=float)[valid]
+    event_names = events_df['event_name'].astype(str).to_numpy()[valid]
+    rows = np.flatnonzero(valid)
+    if not len(rows):
+        return EventIndex({})
+
+    # ゲーム名 → 開始時刻 の順に並べ、ゲーム名の変わり目で切り分ける
+    order = np.lexsort((rows, start_ns, names))
+    names, start_ns, hype_weights, event_names, rows = (
+        names[order], start_ns[order], hype_weights[order], event_names[order], rows[order]
+    )
+    boundaries = np.flatnonzero(names[1:] != names[:-1]) + 1
+    games = {}
+    for lo, hi in zip(np.r_[0, boundaries], np.r_[boundaries, len(names)]):
+        games[names[lo]] = GameEvents(start_ns[lo:hi], hype_weights[lo:hi], event_names[lo:hi], rows[lo:hi])
+    return EventIndex(games)
@@ -0,0 +1,107 @@
+import asyncio
+import functools
+import time
+from concurrent.futures import ThreadPoolExecutor
+from . import pruning, tracing
+
+# 問い合わせ先ごとの同時実行数（config.yaml の concurrency.upstreams で上書き可能）
+DEFAULT_UPSTREAM_LIMITS = {
+    'twitch': 4,
+    'steam': 8,
+    'google_trends': 1,  # pytrendsのセッションは共有なので、同時には1件だけ
+    'x': 2,
+}
+
+
+class SignalRunner:
+    """
+    シグナルの score() を、イベントループを止めずに実行する係。
+    - 同期シグナルのうち、外部APIを呼ぶもの（モジュールに UPSTREAM がある）はスレッドプールで実行する
+    - 外部APIを呼ばない同期シグナルは、計算だけなのでその場で実行する
+    - 非同期シグナルはそのまま await する
+    どの場合も、問い合わせ先(UPSTREAM)ごとの同時実行数の上限を守る。
+    breakers を渡すと、問い合わせ先が遮断中のシグナルは呼ばずに None を返す。
+    tracer を渡すと、シグナルごとの実行時間・結果・エラーを記録する。
+    """
+
+    def __init__(self, cfg, breakers=None, tracer=None):
+        concurrency = cfg.get('concurrency', {})
+        self.limits = {**DEFAULT_UPSTREAM_LIMITS, **concurrency.get('upstreams', {})}
+        self.pool = ThreadPoolExecutor(
+            max_workers=concurrency.get('max_workers', 32), thread_name_prefix='radar-signal'
+        )
+        self.semaphores = {}
+        self.breakers = breakers
+        self.tracer = tracer
+
+    def _semaphore(self, upstream):
+        if upstream not in self.semaphores:
+            self.semaphores[upstream] = asyncio.Semaphore(self.limits.get(upstream, 4))
+        return self.semaphores[upstream]
+
+    async def run(self, module, **kwargs):
+        return await self.call(module, 'score', **kwargs)
+
+    async def call(self, module, hook, **kwargs):
+        """score() 以外のフック（prefetch など）も、同じ決まりで実行する"""
+        upstream = getattr(module, 'UPSTREAM', None)
+        func = getattr(module, hook)
+        name = tracing.signal_name(module, hook)
+
+        # 問い合わせ先が遮断中なら、シグナルごと呼ばずにすぐ諦める（手元のデータだけで評価できるものは除く）
+        if self.breakers is not None and upstream is not None and pruning.is_expensive(module, kwargs):
+            if self.breakers.is_open(upstream):
+                if self.tracer:
+                    self.tracer.record_signal(name, 0.0, 'skipped')
+                return None
+
+        if asyncio.iscoroutinefunction(func):
+            if upstream is None:
+                return await self._traced_async(name, func, kwargs)
+            async with self._semaphore(upstream):
+                return await self._traced_async(name, func, kwargs)
+
+        if upstream is None:
+            return self._traced(name, func, kwargs)
+
+        loop = asyncio.get_running_loop()
+        async with self._semaphore(upstream):
+            return await loop.run_in_executor(self.pool, functools.partial(self._traced, name, func, kwargs))
+
+    def _traced(self, name, func, kwargs):
+        """シグナルを1回実行し、時間と結果を記録する（スレッドプールの中でも動く）"""
+        token = tracing.current_signal.set(name)
+        started = time.perf_counter()
+        try:
+            result = func(**kwargs)
+        except Exception as e:
+            self._record(name, started, None, e, kwargs)
+            raise
+        finally:
+            tracing.current_signal.reset(token)
+        self._record(name, started, result, None, kwargs)
+        return result
+
+    async def _traced_async(self, name, func, kwargs):
+        token = tracing.current_signal.set(name)
+        started = time.perf_counter()
+        try:
+            result = await func(**kwargs)
+        except Exception as e:
+            self._record(name, started, None, e, kwargs)
+            raise
+        finally:
+            tracing.current_signal.reset(token)
+        self._record(name, started, result, None, kwargs)
+        return result
+
+    def _record(self, name, started, result, error, kwargs):
+        if self.tracer is None:
+            return
+        game_name = (kwargs.get('game') or {}).get('name')
+        self.tracer.record_signal(
+            name, time.perf_counter() - started, tracing.outcome_of(result, error), error, game_name
+        )
+
+    def shutdown(self):
+        self.pool.shutdown(wait=False, cancel_futures=True)
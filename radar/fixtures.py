@@ -0,0 +1,315 @@
+import asyncio
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+import zlib
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from http import HTTPStatus
+from urllib.parse import parse_qsl, quote_plus, urlencode, urlsplit, urlunsplit
+import aiohttp
+import requests
+from multidict import CIMultiDict, CIMultiDictProxy
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+from yarl import URL
+from .notifier import webhook_env_name
+
+# 外部APIの応答を記録し、あとで同じ応答を返して、認証情報もネットワークもなしに実行を再現する。
+# - requests（共有のHTTPクライアント・pytrends など）は HTTPAdapter.send で
+# - aiohttp（twitchAPI のページ送りと認証・Discordへの通知）は ClientSession._request で
+# 差し替えるので、呼び出す側のコードは記録・再生を意識しない。
+FIXTURES_FILE = 'fixtures.sqlite3'
+
+# 記録に残さない秘密の値（URLや本文に現れたら {環境変数名} に置き換える）
+SECRET_ENV = ['TWITCH_CLIENT_ID', 'TWITCH_CLIENT_SECRET', 'STEAM_API_KEY', 'X_BEARER']
+
+# 実行のたびに変わるので、同じリクエストかどうかの判定に使わないクエリパラメーター
+DEFAULT_IGNORE_PARAMS = ['start_time', 'end_time']
+
+# 本文は展開済みで保存するので、圧縮・長さのヘッダーは残さない（Cookieも残さない）
+_DROP_HEADERS = {'set-cookie', 'content-encoding', 'content-length', 'transfer-encoding'}
+
+# 認証の応答に含まれるトークン
+_TOKEN_FIELDS = re.compile(rb'"(access_token|refresh_token)"\s*:\s*"[^"]*"')
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    request TEXT NOT NULL,             -- メソッドと正規化したURL（秘密の値は置き換え済み）
+    seq     INTEGER NOT NULL,          -- 同じリクエストの何回目の応答か
+    status  INTEGER NOT NULL,
+    headers TEXT NOT NULL,             -- JSON
+    body    BLOB NOT NULL,             -- zlibで圧縮した本文
+    elapsed REAL NOT NULL,             -- 記録した時の応答時間（秒）
+    PRIMARY KEY (request, seq)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS meta (
+    key   TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+
+class FixtureMissing(requests.exceptions.ConnectionError, aiohttp.ClientConnectionError):
+    """再生中に、記録にないリクエストを送ろうとした（どちらのライブラリの接続エラーとしても拾える）"""
+
+
+class ReplayedResponse:
+    """aiohttp.ClientResponse の代わりに返す、記録した応答（このリポジトリと twitchAPI が使う分だけ）"""
+
+    def __init__(self, method, url, status, headers, body):
+        self.method = method
+        self.url = URL(url)
+        self.status = status
+        self.reason = _reason(status)
+        self.headers = CIMultiDictProxy(CIMultiDict(headers))
+        self._body = body
+
+    @property
+    def ok(self):
+        return self.status < 400
+
+    async def read(self):
+        return self._body
+
+    async def text(self, encoding=None, errors='strict'):
+        return self._body.decode(encoding or 'utf-8', errors)
+
+    async def json(self, *, encoding=None, loads=json.loads, content_type='application/json'):
+        text = self._body.decode(encoding or 'utf-8').strip()
+        return loads(text) if text else None
+
+    def raise_for_status(self):
+        if self.status >= 400:
+            request_info = aiohttp.RequestInfo(self.url, self.method, CIMultiDictProxy(CIMultiDict()), self.url)
+            raise aiohttp.ClientResponseError(request_info, (), status=self.status, message=self.reason)
+
+    def release(self):
+        pass
+
+    def close(self):
+        pass
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        pass
+
+
+def _reason(status):
+    try:
+        return HTTPStatus(status).phrase
+    except ValueError:
+        return ''
+
+
+def _replayed_requests_response(request, status, headers, body):
+    response = requests.Response()
+    response.status_code = status
+    response.reason = _reason(status)
+    response.headers = CaseInsensitiveDict(headers)
+    response.encoding = get_encoding_from_headers(response.headers)
+    response._content = body
+    response._content_consumed = True
+    response.url = request.url
+    response.request = request
+    return response
+
+
+class Fixtures:
+    """
+    1回の実行分の記録(record)・再生(replay)の係。スレッドからも非同期処理からも使える。
+    同じリクエストが何度も送られた時は、記録した順に応答を返す（足りなければ最後の応答を繰り返す）。
+    """
+
+    def __init__(self, cfg, mode, path=FIXTURES_FILE):
+        fixtures_cfg = cfg.get('fixtures', {})
+        self.mode = mode
+        self.path = path
+        self.ignore_params = set(fixtures_cfg.get('ignore_params', DEFAULT_IGNORE_PARAMS))
+        self.latency_ms = fixtures_cfg.get('latency_ms', 'recorded')
+        self.latency_hosts_ms = fixtures_cfg.get('latency_hosts_ms') or {}
+        self.secret_names = SECRET_ENV + [webhook_env_name(h) for h in cfg.get('horizons', ['3d'])]
+        self.lock = threading.Lock()
+        self.conn = None
+        self.rows = []                          # 記録した応答
+        self.responses = {}                     # 再生する応答: リクエスト -> [(status, headers, body, elapsed), ...]
+        self.sequence = defaultdict(int)        # リクエストごとの、次に記録・再生する番号
+        self.misses = []
+        self.placeholders = []
+        self.originals = None
+
+    # --- 記録ファイル ---
+
+    def open(self):
+        self.conn = sqlite3.connect(self.path)
+        self.conn.executescript(_SCHEMA)
+        if self.mode == 'record':
+            self.conn.execute('DELETE FROM responses')
+            self.conn.execute('DELETE FROM meta')
+            # 再生する時は、記録した時に設定されていた秘密の環境変数に、仮の値を入れる
+            env = {name: self._placeholder(name, os.environ[name]) for name in self.secret_names if os.environ.get(name)}
+            self.conn.executemany('INSERT INTO meta (key, value) VALUES (?, ?)', [
+                ('recorded_at', datetime.now(timezone.utc).isoformat()), ('env', json.dumps(env)),
+            ])
+            return
+
+        for request, status, headers, body, elapsed in self.conn.execute(
+            'SELECT request, status, headers, body, elapsed FROM responses ORDER BY request, seq'
+        ):
+            self.responses.setdefault(request, []).append((status, json.loads(headers), zlib.decompress(body), elapsed))
+        meta = dict(self.conn.execute('SELECT key, value FROM meta'))
+        for name, value in json.loads(meta.get('env', '{}')).items():
+            if name not in os.environ:
+                os.environ[name] = value
+                self.placeholders.append(name)
+        print(f"📼 記録した外部APIの応答を再生します（{meta.get('recorded_at', '記録日時不明')}の記録・{len(self.responses)}種類）")
+
+    def close(self):
+        if self.mode == 'record':
+            self.conn.executemany(
+                'INSERT INTO responses (request, seq, status, headers, body, elapsed) VALUES (?, ?, ?, ?, ?, ?)',
+                self.rows,
+            )
+            self.conn.commit()
+            self.conn.execute('VACUUM')
+            print(f"📼 外部APIの応答を {len(self.rows)}件 記録しました: {self.path}")
+        else:
+            served = sum(self.sequence.values()) - len(self.misses)
+            print(f"📼 記録から {served}件 の応答を再生しました（記録になかったリクエスト: {len(self.misses)}件）")
+            for request in self.misses[:5]:
+                print(f"   - {request}")
+            for name in self.placeholders:
+                os.environ.pop(name, None)
+        self.conn.close()
+
+    # --- リクエストの照合 ---
+
+    @staticmethod
+    def _placeholder(name, value):
+        # URL（DiscordのWebhook）は、問い合わせ先が分かるようにホストまでは残す
+        parts = urlsplit(value)
+        if parts.scheme in ('http', 'https') and parts.netloc:
+            return f"{parts.scheme}://{parts.netloc}/replay/{name}"
+        return f"replay-{name}"
+
+    def _redact(self, text):
+        for name in self.secret_names:
+            value = os.environ.get(name)
+            if value:
+                text = text.replace(value, f"{{{name}}}").replace(quote_plus(value), f"{{{name}}}")
+        return text
+
+    def request_key(self, method, url):
+        """同じリクエストかどうかを判定するキー（クエリは並べ替え、毎回変わるものと秘密の値は除く）"""
+        parts = urlsplit(url)
+        query = sorted(
+            (key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True) if key not in self.ignore_params
+        )
+        return self._redact(f"{method.upper()} {urlunsplit((parts.scheme, parts.netloc, parts.path, urlencode(query), ''))}")
+
+    def record(self, method, url, status, headers, body, elapsed):
+        request = self.request_key(method, url)
+        body = _TOKEN_FIELDS.sub(rb'"\1": "replay"', body or b'')
+        for name in self.secret_names:
+            value = os.environ.get(name)
+            if value:
+                body = body.replace(value.encode('utf-8'), f"{{{name}}}".encode('utf-8'))
+        headers = {key: value for key, value in headers.items() if key.lower() not in _DROP_HEADERS}
+        with self.lock:
+            seq = self.sequence[request]
+            self.sequence[request] += 1
+            self.rows.append((request, seq, status, json.dumps(headers), zlib.compress(body, 9), elapsed))
+
+    def replay(self, method, url):
+        """記録した応答を (status, headers, body, 待つ秒数) で返す"""
+        request = self.request_key(method, url)
+        with self.lock:
+            seq = self.sequence[request]
+            self.sequence[request] += 1
+            entries = self.responses.get(request)
+            if not entries:
+                self.misses.append(request)
+                raise FixtureMissing(f"記録にないリクエストです: {request}")
+        status, headers, body, elapsed = entries[min(seq, len(entries) - 1)]
+        latency_ms = self.latency_hosts_ms.get(urlsplit(url).hostname, self.latency_ms)
+        delay = elapsed if latency_ms == 'recorded' else float(latency_ms) / 1000
+        return status, headers, body, delay
+
+    # --- 通信ライブラリへの差し込み ---
+
+    def install(self):
+        fixtures = self
+        original_send = HTTPAdapter.send
+        original_request = aiohttp.ClientSession._request
+
+        def send(adapter, request, **kwargs):
+            if fixtures.mode == 'replay':
+                status, headers, body, delay = fixtures.replay(request.method, request.url)
+                time.sleep(delay)
+                return _replayed_requests_response(request, status, headers, body)
+            started = time.perf_counter()
+            response = original_send(adapter, request, **kwargs)
+            fixtures.record(
+                request.method, request.url, response.status_code, response.headers, response.content,
+                time.perf_counter() - started,
+            )
+            return response
+
+        async def session_request(session, method, str_or_url, **kwargs):
+            url = str(str_or_url)
+            if kwargs.get('params'):
+                url = str(URL(url).update_query(kwargs['params']))
+            if fixtures.mode == 'replay':
+                status, headers, body, delay = fixtures.replay(method, url)
+                await asyncio.sleep(delay)
+                return ReplayedResponse(method, url, status, headers, body)
+            started = time.perf_counter()
+            response = await original_request(session, method, str_or_url, **kwargs)
+            body = await response.read()
+            fixtures.record(method, url, response.status, response.headers, body, time.perf_counter() - started)
+            return response
+
+        self.originals = (original_send, original_request)
+        HTTPAdapter.send = send
+        aiohttp.ClientSession._request = session_request
+
+    def uninstall(self):
+        if self.originals is not None:
+            HTTPAdapter.send, aiohttp.ClientSession._request = self.originals
+            self.originals = None
+
+
+def fixtures_mode(cfg):
+    """record / replay / off（環境変数 RADAR_FIXTURES が config.yaml の fixtures.mode より優先）"""
+    mode = os.environ.get('RADAR_FIXTURES') or cfg.get('fixtures', {}).get('mode')
+    return mode if mode in ('record', 'replay') else 'off'
+
+
+@contextmanager
+def activate(cfg):
+    """
+    record なら、この中で送ったすべてのリクエストの応答を記録ファイルに残す。
+    replay なら、この中ではネットワークに出ず、記録ファイルの応答を（設定した遅延をつけて）返す。
+    off なら何もしない。
+    """
+    mode = fixtures_mode(cfg)
+    if mode == 'off':
+        yield None
+        return
+
+    path = os.environ.get('RADAR_FIXTURES_PATH') or cfg.get('fixtures', {}).get('path', FIXTURES_FILE)
+    fixtures = Fixtures(cfg, mode, path)
+    fixtures.open()
+    fixtures.install()
+    try:
+        yield fixtures
+    finally:
+        fixtures.uninstall()
+        fixtures.close()
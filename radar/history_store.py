@@ -0,0 +1,89 @@
+import sqlite3
+import time
+
+# 実行ごとに取得した日本語配信の集計（ゲームごとのスナップショット）を、実行をまたいで残しておく
+HISTORY_FILE = 'stream_history.sqlite3'
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    taken_at     REAL PRIMARY KEY,
+    stream_count INTEGER NOT NULL,     -- その実行で取得した配信の総数
+    truncated    INTEGER NOT NULL      -- 取得上限で打ち切ったか
+);
+CREATE TABLE IF NOT EXISTS snapshots (
+    taken_at      REAL NOT NULL,
+    game_id       TEXT NOT NULL,
+    stream_count  INTEGER NOT NULL,
+    total_viewers INTEGER NOT NULL,
+    top_viewers   INTEGER NOT NULL,
+    PRIMARY KEY (taken_at, game_id)
+) WITHOUT ROWID;
+"""
+
+
+def open_store(path=HISTORY_FILE):
+    conn = sqlite3.connect(path)
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute('PRAGMA synchronous=NORMAL')
+    conn.executescript(_SCHEMA)
+    return conn
+
+
+def close_store(conn):
+    if conn is not None:
+        conn.commit()
+        conn.close()
+
+
+def record_snapshot(conn, stream_index, truncated, cfg, taken_at=None):
+    """
+    今回の実行のスナップショットを追記し、保存期間(history.retention_days)を過ぎたものを消す。
+    戻り値は記録した時刻。
+    """
+    taken_at = time.time() if taken_at is None else taken_at
+    conn.execute(
+        'INSERT OR REPLACE INTO runs (taken_at, stream_count, truncated) VALUES (?, ?, ?)',
+        (taken_at, stream_index['stream_count'], int(bool(truncated))),
+    )
+    conn.executemany(
+        'INSERT OR REPLACE INTO snapshots (taken_at, game_id, stream_count, total_viewers, top_viewers) '
+        'VALUES (?, ?, ?, ?, ?)',
+        [
+            (taken_at, game_id, entry['count'], entry['total'], entry['max'])
+            for game_id, entry in stream_index['games'].items()
+        ],
+    )
+
+    retention_days = cfg.get('history', {}).get('retention_days', 30)
+    expired_before = taken_at - retention_days * 86400
+    conn.execute('DELETE FROM snapshots WHERE taken_at < ?', (expired_before,))
+    conn.execute('DELETE FROM runs WHERE taken_at < ?', (expired_before,))
+    conn.commit()
+    return taken_at
+
+
+def load_prior_snapshots(conn, game_ids, before, run_count):
+    """
+    before より前の直近 run_count 回の実行について、ゲームごとのスナップショットを返す。
+    戻り値: (対象の実行の数, game_id -> [(stream_count, total_viewers), ...])
+    その実行の取得範囲に入らなかったゲームは、その回の値を持たない。
+    """
+    if conn is None or not game_ids:
+        return 0, {}
+    run_times = [row[0] for row in conn.execute(
+        'SELECT taken_at FROM runs WHERE taken_at < ? ORDER BY taken_at DESC LIMIT ?', (before, run_count)
+    )]
+    if not run_times:
+        return 0, {}
+
+    # 主キー (taken_at, game_id) の範囲検索で、対象の実行のスナップショットだけを読む
+    wanted = set(game_ids)
+    history = {}
+    rows = conn.execute(
+        'SELECT game_id, stream_count, total_viewers FROM snapshots WHERE taken_at BETWEEN ? AND ?',
+        (run_times[-1], run_times[0]),
+    )
+    for game_id, stream_count, total_viewers in rows:
+        if game_id in wanted:
+            history.setdefault(game_id, []).append((stream_count, total_viewers))
+    return len(run_times), history
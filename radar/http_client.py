@@ -0,0 +1,93 @@
+import time
+from urllib.parse import urlsplit
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# ホストごとのコネクションプールの大きさと、レート制限の区分（config.yaml の http.hosts で上書き可能）
+DEFAULT_HOSTS = {
+    'api.steampowered.com': {'pool_size': 8, 'upstream': 'steam'},
+    'steamcharts.com': {'pool_size': 4, 'upstream': 'steamcharts'},
+    'discord.com': {'pool_size': 2, 'upstream': 'discord'},
+    'api.x.com': {'pool_size': 2, 'upstream': 'x'},
+}
+
+
+class HttpClient(requests.Session):
+    """
+    1回の実行の間だけ使い回す、共有のHTTPクライアント。
+    ホストごとにコネクションを保持(keep-alive)し、タイムアウトとリトライを1か所で設定する。
+    rate_limiter を渡すと、送信前にホストに対応するトークンバケットを待ち、
+    レスポンスのレート制限ヘッダー（429 の Retry-After を含む）を反映する。
+    breakers を渡すと、遮断中の問い合わせ先には送らずに CircuitOpenError にし、成否を記録する。
+    tracer を渡すと、問い合わせ先ごとのリクエスト回数・レイテンシ・ステータスを記録する。
+    requests.Session と同じように get / post で呼び出せる。
+    """
+
+    def __init__(self, cfg, rate_limiter=None, breakers=None, tracer=None):
+        super().__init__()
+        http_cfg = cfg.get('http', {})
+        self.timeout = http_cfg.get('timeout', 10)
+        self.rate_limiter = rate_limiter
+        self.breakers = breakers
+        self.tracer = tracer
+        self.upstreams = {}
+
+        # 接続エラーと一時的なサーバーエラーだけを、GETに限ってリトライする
+        retry = Retry(
+            total=http_cfg.get('retries', 2),
+            backoff_factor=http_cfg.get('backoff', 0.5),
+            status_forcelist=[502, 503, 504],
+            allowed_methods=['GET'],
+            raise_on_status=False,
+        )
+        hosts = {**DEFAULT_HOSTS, **http_cfg.get('hosts', {})}
+        for host, host_cfg in hosts.items():
+            self.upstreams[host] = host_cfg.get('upstream', DEFAULT_HOSTS.get(host, {}).get('upstream'))
+            pool_size = host_cfg.get('pool_size', 4)
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, pool_block=True, max_retries=retry)
+            self.mount(f"https://{host}/", adapter)
+        self.mount('https://', HTTPAdapter(pool_maxsize=4, max_retries=retry))
+
+    def request(self, method, url, **kwargs):
+        kwargs.setdefault('timeout', self.timeout)
+        upstream = self.upstreams.get(urlsplit(url).hostname)
+        if self.breakers is None or upstream is None:
+            return self._send(upstream, method, url, **kwargs)
+
+        breaker = self.breakers.guard(upstream)
+        try:
+            response = self._send(upstream, method, url, **kwargs)
+        except Exception:
+            breaker.record_failure()
+            raise
+        self.breakers.record_status(upstream, response.status_code)
+        return response
+
+    def _send(self, upstream, method, url, **kwargs):
+        if self.tracer is None:
+            return self._send_limited(upstream, method, url, **kwargs)
+
+        started = time.perf_counter()
+        try:
+            response = self._send_limited(upstream, method, url, **kwargs)
+        except Exception as e:
+            self.tracer.record_request(upstream or urlsplit(url).hostname, time.perf_counter() - started, type(e).__name__)
+            raise
+        self.tracer.record_request(upstream or urlsplit(url).hostname, time.perf_counter() - started, response.status_code)
+        return response
+
+    def _send_limited(self, upstream, method, url, **kwargs):
+        if self.rate_limiter is None or upstream is None:
+            return super().request(method, url, **kwargs)
+
+        self.rate_limiter.acquire(upstream)
+        response = super().request(method, url, **kwargs)
+        wait = self.rate_limiter.observe(upstream, response.status_code, response.headers)
+        if response.status_code == 429 and wait > 0:
+            # 指定された時間だけ待ってから、1回だけ送り直す
+            time.sleep(wait)
+            self.rate_limiter.acquire(upstream)
+            response = super().request(method, url, **kwargs)
+            self.rate_limiter.observe(upstream, response.status_code, response.headers)
+        return response
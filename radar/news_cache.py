@@ -0,0 +1,87 @@
+import sqlite3
+import threading
+import time
+
+# Steamニュースの記事ごとの分類結果(ランク)を、AppIDごとに実行をまたいで覚えておくキャッシュ。
+# 本文は保存せず、一度分類した記事は二度と分類し直さない。
+NEWS_CACHE_FILE = 'steam_news_cache.sqlite3'
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS items (
+    appid INTEGER NOT NULL,
+    gid   TEXT NOT NULL,               -- Steamニュースの記事ID
+    date  INTEGER NOT NULL,            -- 公開日時（UNIX時刻）
+    rank  TEXT NOT NULL,               -- S / A / ''（加点しない記事）
+    PRIMARY KEY (appid, gid)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS feeds (
+    appid      INTEGER PRIMARY KEY,
+    checked_at REAL NOT NULL           -- 最後にSteamに新しい記事がないか確かめた時刻
+);
+"""
+
+# steam_news はスレッドプールで並行に動くので、接続は1つにしてロックで順番に使う
+_lock = threading.Lock()
+
+
+def open_cache(path=NEWS_CACHE_FILE):
+    conn = sqlite3.connect(path, check_same_thread=False)
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute('PRAGMA synchronous=NORMAL')
+    conn.executescript(_SCHEMA)
+    return conn
+
+
+def close_cache(conn):
+    if conn is not None:
+        with _lock:
+            conn.commit()
+            conn.close()
+
+
+def last_checked(conn, appid):
+    """最後にSteamに新しい記事がないか確かめた時刻（一度も確かめていなければ None）"""
+    with _lock:
+        row = conn.execute('SELECT checked_at FROM feeds WHERE appid = ?', (appid,)).fetchone()
+    return row[0] if row else None
+
+
+def known_gids(conn, appid, gids):
+    """gids のうち、分類済みの記事のIDを返す"""
+    if not gids:
+        return set()
+    placeholders = ','.join('?' * len(gids))
+    with _lock:
+        rows = conn.execute(
+            f'SELECT gid FROM items WHERE appid = ? AND gid IN ({placeholders})', (appid, *gids)
+        ).fetchall()
+    return {gid for gid, in rows}
+
+
+def store_items(conn, appid, items, retention_days, keep_latest, now=None):
+    """
+    分類した記事 [(gid, 公開日時, ランク), ...] を保存し、確かめた時刻を更新する。
+    保存期間(retention_days)より古い記事は消す（ただし、新しい方から keep_latest 件は
+    Steamの最新の記事一覧にまだ載っているので、分類し直さなくて済むように残す）。
+    """
+    now = time.time() if now is None else now
+    with _lock:
+        conn.executemany(
+            'INSERT OR REPLACE INTO items (appid, gid, date, rank) VALUES (?, ?, ?, ?)',
+            [(appid, str(gid), int(date), rank) for gid, date, rank in items],
+        )
+        conn.execute('INSERT OR REPLACE INTO feeds (appid, checked_at) VALUES (?, ?)', (appid, now))
+        conn.execute(
+            'DELETE FROM items WHERE appid = ? AND date < ? AND gid NOT IN '
+            '(SELECT gid FROM items WHERE appid = ? ORDER BY date DESC LIMIT ?)',
+            (appid, now - retention_days * 86400, appid, keep_latest),
+        )
+        conn.commit()
+
+
+def latest_items(conn, appid, count):
+    """新しい順に count 件の記事を (公開日時, ランク) で返す"""
+    with _lock:
+        return conn.execute(
+            'SELECT date, rank FROM items WHERE appid = ? ORDER BY date DESC LIMIT ?', (appid, count)
+        ).fetchall()
@@ -0,0 +1,174 @@
+import asyncio
+import json
+import os
+import time
+from urllib.parse import quote, urlsplit
+import aiohttp
+
+# Discordの上限（https://discord.com/developers/docs/resources/message#embed-object-embed-limits）
+MAX_EMBEDS_PER_MESSAGE = 10
+MAX_CHARS_PER_MESSAGE = 6000   # 1つのメッセージに入る全Embedの文字数の合計
+MAX_FIELDS_PER_EMBED = 25
+MAX_FIELD_NAME = 256
+MAX_FIELD_VALUE = 1024
+GAMES_PER_EMBED = 10
+
+
+def _game_field(game, rank):
+    tags_for_title = " ".join([f"`{flag}`" for flag in game['flags'][:2]])
+    medal = '🥇🥈🥉'[rank - 1] if rank <= 3 else '🔹'
+    field_name = f"{medal} {rank}位: {game['name']} (スコア: {game.get('total_score', 0):.0f}) {tags_for_title}"
+
+    links = []
+    if 'steam_appid' in game:
+        links.append(f"**[Steam](https://store.steampowered.com/app/{game['steam_appid']})**")
+    twitch_category_name = game['name'].lower().replace(' ', '-')
+    links.append(f"**[Twitch](https://www.twitch.tv/directory/category/{twitch_category_name})**")
+    google_trend_query = quote(f"{game['name']} ゲーム")
+    links.append(f"**[Googleトレンド](https://trends.google.com/trends/explore?q={google_trend_query}&geo=JP)**")
+    field_value = f"🔗 {' | '.join(links)}\n──────────"
+    return {"name": field_name[:MAX_FIELD_NAME], "value": field_value[:MAX_FIELD_VALUE]}
+
+
+def build_embeds(games, errored_games, cfg, horizon, run_summary=None):
+    """
+    通知するゲームを、10件ずつのEmbedにする。
+    エラーのあったゲームと実行の計測のまとめは、最後のEmbedに付ける。
+    """
+    score_threshold = cfg.get('notification_score_threshold', 10)
+    game_count = cfg.get('notification_game_count', 20)
+    games_to_notify = [g for g in games if g.get('total_score', 0) >= score_threshold][:game_count]
+
+    chunks = [games_to_notify[i:i + GAMES_PER_EMBED] for i in range(0, len(games_to_notify), GAMES_PER_EMBED)]
+    embeds = []
+    for i, chunk in enumerate(chunks):
+        # 2つ目以降のタイトルを少し変える
+        report_title = f"📈 Hot Games Radar ({horizon}) - 分析レポート"
+        if len(chunks) > 1:
+            report_title += f" ({i+1}/{len(chunks)})"
+        fields = [_game_field(game, i * GAMES_PER_EMBED + rank) for rank, game in enumerate(chunk, start=1)]
+        embeds.append({"title": report_title, "color": 5814783, "fields": fields})
+
+    # エラー報告と計測のまとめは、最後のEmbedにだけ付ける
+    # 通知するゲームがない実行でも、原因を調べられるように、エラーとまとめだけのEmbedを送る
+    include_errors = cfg.get('notification_include_errors', True)
+    if not embeds and include_errors and (errored_games or run_summary):
+        embeds.append({"title": f"🩺 Hot Games Radar ({horizon}) - 通知対象のゲームはありませんでした", "color": 9807270, "fields": []})
+    if embeds and include_errors:
+        if errored_games:
+            error_list_str = "\n".join([f"- {g['name']}" for g in errored_games[:5]])
+            embeds[-1]["fields"].append({"name": "⚠️ 一部センサーでエラーが検出されたゲーム", "value": error_list_str[:MAX_FIELD_VALUE]})
+        if run_summary:
+            embeds[-1]["fields"].append({"name": "🩺 今回の実行の計測", "value": "\n".join(run_summary)[:MAX_FIELD_VALUE]})
+    for embed in embeds:
+        del embed["fields"][MAX_FIELDS_PER_EMBED:]
+    return embeds
+
+
+def embed_size(embed):
+    """Discordが上限の計算に数える文字数（タイトル・説明・フィールド・フッター）"""
+    size = len(embed.get('title', '')) + len(embed.get('description', ''))
+    size += len(embed.get('footer', {}).get('text', ''))
+    return size + sum(len(field['name']) + len(field['value']) for field in embed.get('fields', []))
+
+
+def pack_embeds(embeds):
+    """Embedを、1メッセージ10個・合計6000文字に収まる範囲で、できるだけ少ないメッセージに詰める"""
+    messages, current, current_size = [], [], 0
+    for embed in embeds:
+        size = embed_size(embed)
+        if current and (len(current) >= MAX_EMBEDS_PER_MESSAGE or current_size + size > MAX_CHARS_PER_MESSAGE):
+            messages.append(current)
+            current, current_size = [], 0
+        current.append(embed)
+        current_size += size
+    if current:
+        messages.append(current)
+    return messages
+
+
+def webhook_env_name(horizon):
+    return f"DISCORD_WEBHOOK_URL_{horizon.upper()}"
+
+
+class DiscordNotifier:
+    """
+    Discordへの通知係。イベントループの上で、複数のWebhookに同時に送る。
+    - Embedは上限の範囲で1メッセージにまとめて送る
+    - 待ち時間は固定ではなく、Webhookごとのレート制限ヘッダー（429 の Retry-After を含む）に従う
+    rate_limiter / breakers / tracer を渡すと、ほかの問い合わせ先と同じように制限・遮断・計測する。
+    """
+
+    def __init__(self, cfg, rate_limiter=None, breakers=None, tracer=None):
+        self.cfg = cfg
+        self.rate_limiter = rate_limiter
+        self.breakers = breakers
+        self.tracer = tracer
+        self.max_retries = cfg.get('notification_max_retries', 3)
+        self.timeout = aiohttp.ClientTimeout(total=cfg.get('http', {}).get('timeout', 10))
+
+    async def send_all(self, reports, run_summary=None):
+        """reports: {horizon: (scored_games, errored_games)}。horizonごとのWebhookへ同時に送る"""
+        async with aiohttp.ClientSession(timeout=self.timeout) as session:
+            await asyncio.gather(*(
+                self.send_report(session, horizon, scored_games, errored_games, run_summary)
+                for horizon, (scored_games, errored_games) in reports.items()
+            ))
+
+    async def send_report(self, session, horizon, games, errored_games, run_summary=None):
+        webhook_secret_name = webhook_env_name(horizon)
+        webhook_url = os.environ.get(webhook_secret_name)
+        if not webhook_url:
+            print(f"⚠️ Webhook URL ({webhook_secret_name}) が設定されていません。"); return
+
+        messages = pack_embeds(build_embeds(games, errored_games, self.cfg, horizon, run_summary))
+        if not messages:
+            print(f"✅ ({horizon}) 通知対象の注目ゲームはありませんでした。"); return
+
+        # Discordのレート制限はWebhookごとなので、Webhookごとにバケットを分ける
+        bucket = None
+        if self.rate_limiter is not None:
+            bucket = self.rate_limiter.add_bucket(f"discord:{urlsplit(webhook_url).path}", like='discord')
+
+        for i, message in enumerate(messages):
+            try:
+                await self._post(session, webhook_url, bucket, {"embeds": message})
+                print(f"✅ Discordへ{horizon}のレポート({i+1}/{len(messages)})の通知に成功しました。")
+            except Exception as e:
+                print(f"❌ Discordへの通知に失敗しました ({horizon}): {e}")
+
+    async def _post(self, session, webhook_url, bucket, payload):
+        """1メッセージを送る。429 なら言われた時間だけ待って、max_retries 回まで送り直す"""
+        for attempt in range(self.max_retries + 1):
+            if bucket is not None:
+                await self.rate_limiter.acquire_async(bucket)
+            breaker = self.breakers.guard('discord') if self.breakers is not None else None
+
+            started = time.perf_counter()
+            try:
+                async with session.post(webhook_url, data=json.dumps(payload), headers={'Content-Type': 'application/json'}) as response:
+                    status, headers, body = response.status, response.headers, await response.text()
+            except Exception as e:
+                if self.tracer:
+                    self.tracer.record_request('discord', time.perf_counter() - started, type(e).__name__)
+                if breaker:
+                    breaker.record_failure()
+                raise
+            if self.tracer:
+                self.tracer.record_request('discord', time.perf_counter() - started, status)
+            if self.breakers is not None:
+                self.breakers.record_status('discord', status)
+
+            if bucket is not None:
+                wait = self.rate_limiter.observe(bucket, status, headers)
+            else:
+                wait = float(headers.get('Retry-After', 1)) if status == 429 else 0
+            if status == 429 and attempt < self.max_retries:
+                print(f"   - Discordのレート制限に達しました。{wait:.1f}秒後に送り直します...")
+                if bucket is None:
+                    await asyncio.sleep(wait)
+                # バケットには待ち時間が反映されているので、次の acquire_async で待つ
+                continue
+            if status >= 400:
+                raise RuntimeError(f"HTTP {status}: {body[:200]}")
+            return
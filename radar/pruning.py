@@ -0,0 +1,65 @@
+import numpy as np
+
+from . import scoring
+
+
+def is_expensive(module, signal_context):
+    """
+    外部APIへ問い合わせるシグナルかどうか。
+    UPSTREAM を持っていても、prepare() で集めた手元のデータだけで評価できるもの
+    （モジュールの uses_upstream() が False を返すもの）は、安いシグナルとして扱う。
+    """
+    if getattr(module, 'UPSTREAM', None) is None:
+        return False
+    uses_upstream = getattr(module, 'uses_upstream', None)
+    return uses_upstream(**signal_context) if uses_upstream else True
+
+
+def _weighted(value, weight):
+    # 重み0のスコアは、上限がなくても合計には効かない
+    return 0.0 if weight == 0 else value * weight
+
+
+def contribution_bounds(signal_modules, games, cfg, horizon):
+    """
+    まだ実行していないシグナルが、重み付け後の合計をどこまで下げ・上げうるかを、ゲームごとに返す。
+    各シグナルの score_bounds(game, cfg) は スコア名 -> (最小値, 最大値) を返す。
+    score_bounds() を持たないシグナルは、上限なし（= 絶対に足切りしない）として扱う。
+    """
+    weights = scoring.horizon_weights(cfg, horizon)
+    low, high = np.zeros(len(games)), np.zeros(len(games))
+
+    for module in signal_modules:
+        bounds_for = getattr(module, 'score_bounds', None)
+        for i, game in enumerate(games):
+            if bounds_for is None:
+                high[i] = np.inf
+                continue
+            bounds = bounds_for(game=game, cfg=cfg) or {}
+            weight_of = scoring.weight_vector(list(bounds), weights)
+            weighted = [
+                (_weighted(lo, w), _weighted(hi, w)) for (lo, hi), w in zip(bounds.values(), weight_of)
+            ]
+            # シグナルが何も返さない（0点の）こともあるので、0も範囲に含める
+            low[i] += min([0.0] + [min(pair) for pair in weighted])
+            high[i] += max([0.0] + [max(pair) for pair in weighted])
+    return low, high
+
+
+def select_candidates(partial_totals, low, high, cfg):
+    """
+    安いシグナルだけの合計(partial_totals)と、残りのシグナルの幅(low / high)から、
+    通知される上位(notification_game_count件)に入りうるゲームを True で返す。
+    どう転んでも通知の足切り点にも、上位K件の最低ラインにも届かないゲームだけを外すので、
+    通知される上位K件は、全ゲームを評価した場合と変わらない。
+    """
+    game_count = cfg.get('notification_game_count', 20)
+    score_threshold = cfg.get('notification_score_threshold', 10)
+    if game_count <= 0:
+        return np.zeros(len(partial_totals), dtype=bool)
+
+    lower = partial_totals + low
+    upper = partial_totals + high
+    ranked_lower = np.sort(lower)[::-1]
+    top_k_floor = ranked_lower[game_count - 1] if len(ranked_lower) >= game_count else -np.inf
+    return upper >= max(score_threshold, top_k_floor)
@@ -0,0 +1,146 @@
+import asyncio
+import threading
+import time
+
+# 問い合わせ先ごとの既定のレート（config.yaml の rate_limits で上書き可能）
+# rate: 1秒あたりに送れるリクエスト数 / burst: まとめて送れる最大数
+DEFAULT_RATE_LIMITS = {
+    'twitch': {'rate': 13, 'burst': 20},          # Helix: アプリトークンで 800ポイント/分
+    'steam': {'rate': 5, 'burst': 10},            # Steam Web API
+    'steamcharts': {'rate': 1, 'burst': 1},       # 非公式APIなので控えめに
+    'google_trends': {'rate': 1, 'burst': 1},
+    'x': {'rate': 0.5, 'burst': 1},               # search_recent: 450回/15分
+    'discord': {'rate': 2.5, 'burst': 5},         # Webhook: 5回/2秒
+}
+
+
+class TokenBucket:
+    """
+    トークンバケット方式のレート制限。スレッドからも非同期処理からも使える。
+    トークンは先に予約してマイナスにもなり得るので、待っている呼び出しは順番に進む。
+    """
+
+    def __init__(self, rate, burst):
+        self.rate = float(rate)
+        self.burst = float(burst)
+        self.tokens = float(burst)
+        self.updated_at = time.monotonic()
+        self.blocked_until = 0.0
+        self.lock = threading.Lock()
+
+    def _reserve(self):
+        """トークンを1つ予約し、送信してよいまでの待ち時間(秒)を返す"""
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.updated_at) * self.rate)
+            self.updated_at = now
+            self.tokens -= 1
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0.0
+            return max(wait, self.blocked_until - now)
+
+    def acquire(self):
+        wait = self._reserve()
+        if wait > 0:
+            time.sleep(wait)
+
+    async def acquire_async(self):
+        wait = self._reserve()
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    def block_for(self, seconds):
+        """サーバーから「待て」と言われた時間だけ、次の送信を止める"""
+        with self.lock:
+            self.blocked_until = max(self.blocked_until, time.monotonic() + max(seconds, 0))
+            self.tokens = min(self.tokens, 0)
+
+
+def _header_float(headers, *names):
+    for name in names:
+        value = headers.get(name)
+        if value is not None:
+            try:
+                return float(value)
+            except ValueError:
+                continue
+    return None
+
+
+class RateLimiter:
+    """問い合わせ先(upstream)ごとのトークンバケットをまとめて管理する"""
+
+    def __init__(self, cfg):
+        limits = cfg.get('rate_limits', {})
+        self.buckets = {}
+        for upstream, default in DEFAULT_RATE_LIMITS.items():
+            limit = {**default, **limits.get(upstream, {})}
+            self.buckets[upstream] = TokenBucket(limit['rate'], limit['burst'])
+        for upstream, limit in limits.items():
+            if upstream not in self.buckets:
+                self.buckets[upstream] = TokenBucket(limit.get('rate', 1), limit.get('burst', 1))
+
+    def add_bucket(self, key, like):
+        """
+        like と同じレートのバケットを、key の名前で別に用意する（既にあればそのまま）。
+        Discord のように、レート制限が宛先（Webhook）ごとに決まる問い合わせ先に使う。
+        """
+        if key not in self.buckets:
+            template = self.buckets[like]
+            self.buckets[key] = TokenBucket(template.rate, template.burst)
+        return key
+
+    def acquire(self, upstream):
+        bucket = self.buckets.get(upstream)
+        if bucket:
+            bucket.acquire()
+
+    async def acquire_async(self, upstream):
+        bucket = self.buckets.get(upstream)
+        if bucket:
+            await bucket.acquire_async()
+
+    def observe(self, upstream, status, headers):
+        """
+        レスポンスのレート制限ヘッダーを見て、バケットを実際の残量に合わせる。
+        - Twitch Helix : Ratelimit-Remaining / Ratelimit-Reset（UNIX時刻）
+        - Discord      : X-RateLimit-Remaining / X-RateLimit-Reset-After（秒）
+        - X            : x-rate-limit-remaining / x-rate-limit-reset（UNIX時刻）
+        - 429 の場合   : Retry-After（秒）
+        戻り値は、次の送信まで待つべき秒数（待つ必要がなければ 0）。
+        """
+        bucket = self.buckets.get(upstream)
+        if bucket is None:
+            return 0
+
+        wait = 0
+        retry_after = _header_float(headers, 'Retry-After')
+        remaining = _header_float(headers, 'Ratelimit-Remaining', 'X-RateLimit-Remaining', 'X-Rate-Limit-Remaining')
+        if status == 429 and retry_after is not None:
+            wait = retry_after
+        elif remaining is not None and remaining <= 0:
+            reset_after = _header_float(headers, 'X-RateLimit-Reset-After')
+            if reset_after is None:
+                reset_at = _header_float(headers, 'Ratelimit-Reset', 'X-RateLimit-Reset', 'X-Rate-Limit-Reset')
+                reset_after = reset_at - time.time() if reset_at is not None else 1
+            wait = reset_after
+        elif status == 429:
+            wait = 1
+
+        if wait > 0:
+            bucket.block_for(wait)
+        return wait
+
+    def attach_twitch(self, twitch_api):
+        """
+        twitchAPI の全リクエスト（get_streams のページ送りも含む）に、
+        Helixのトークンバケットとレート制限ヘッダーの反映を差し込む。
+        """
+        original_request = twitch_api._api_request
+
+        async def limited_request(method, session, url, *args, **kwargs):
+            await self.acquire_async('twitch')
+            response = await original_request(method, session, url, *args, **kwargs)
+            self.observe('twitch', response.status, response.headers)
+            return response
+
+        twitch_api._api_request = limited_request
@@ -0,0 +1,58 @@
+import numpy as np
+
+
+def horizon_weights(cfg, horizon):
+    """'weights'の取得方法を、3チャンネル対応の構造に合わせる"""
+    return cfg.get('weights', {}).get(horizon, cfg.get('weights', {}))
+
+
+def weight_vector(score_keys, weights):
+    """スコア名（xxx_score）ごとの重みを、1回だけ引いて配列にする"""
+    vector = []
+    for key in score_keys:
+        weight = weights.get(key.replace('_score', ''), 1)
+        vector.append(weight if isinstance(weight, (int, float)) else 1)
+    return np.asarray(vector, dtype=float)
+
+
+def _slate_columns(games, batch_results):
+    """ゲームごとの結果と score_batch() の列を、スコア名 -> 全ゲーム分の列 にまとめる"""
+    columns = {}
+    per_game_keys = sorted({key for game in games for key in game['scores']})
+    for key in per_game_keys:
+        columns[key] = np.array([game['scores'].get(key, 0.0) for game in games], dtype=float)
+
+    flags = [list(game['flags']) for game in games]
+    for result in batch_results:
+        for key, column in result.items():
+            if 'score' in key:
+                columns[key] = np.asarray(column, dtype=float)
+        for i, game_flags in enumerate(result.get('source_hit_flags', [])):
+            flags[i].extend(game_flags)
+    return columns, flags
+
+
+def slate_totals(games, batch_results, cfg, horizon):
+    """ゲームには書き込まずに、全ゲームの合計スコアの配列だけを返す"""
+    columns, _ = _slate_columns(games, batch_results)
+    score_keys = list(columns)
+    if games and score_keys:
+        matrix = np.nan_to_num(np.column_stack([columns[key] for key in score_keys]))
+        return matrix @ weight_vector(score_keys, horizon_weights(cfg, horizon))
+    return np.zeros(len(games))
+
+
+def score_slate(games, batch_results, cfg, horizon):
+    """
+    全ゲームのスコアを「ゲーム × シグナル」の行列にまとめ、重みを1回の行列積で掛ける。
+    - games         : ゲームごとのシグナル結果（scores / flags）を持つ辞書のリスト
+    - batch_results : score_batch() の戻り値のリスト（スコア名 -> 全ゲーム分の列）
+    各ゲームに total_score と flags を書き込む。
+    """
+    _, flags = _slate_columns(games, batch_results)
+    totals = slate_totals(games, batch_results, cfg, horizon)
+
+    for i, game in enumerate(games):
+        game['total_score'] = float(totals[i])
+        game['flags'] = list(set(flags[i]))
+    return games
@@ -0,0 +1,30 @@
+import importlib
+
+# 評価に使うシグナル（この順番で評価する）と、0にするとそのシグナルを無効にする重みの名前
+# 重みの名前が None のシグナルは、常に有効
+SIGNALS = [
+    ('steam_ccu', None),
+    ('slot_fit', None),
+    ('competition', None),
+    ('upcoming_event', None),
+    ('twitch_drops', None),
+    ('steam_news', None),
+    ('jp_ratio', None),
+    ('twitter', 'twitter_jp_spike'),
+    ('google_trends', 'trends_jp_spike'),
+    ('market_health', None),
+    ('twitch_growth', 'twitch_growth'),
+]
+
+
+def enabled_signal_names(cfg):
+    weights = cfg.get('weights', {})
+    return [name for name, weight_key in SIGNALS if weight_key is None or weights.get(weight_key, 0)]
+
+
+def load_signals(cfg):
+    """
+    有効なシグナルのモジュールだけを、必要になった時点で読み込んで返す。
+    無効なシグナル（重み0）は import もしないので、pytrends の読み込みも省ける。
+    """
+    return [importlib.import_module(f'{__name__}.{name}') for name in enabled_signal_names(cfg)]
@@ -1,37 +1,89 @@
-import asyncio
-import time
+from collections import defaultdict
 
-async def score(game, cfg, twitch_api, **_):
+# 問い合わせ先（同時実行数の制御に使う）
+UPSTREAM = 'twitch'
+
+# Helixの game_id パラメータに一度に渡せる上限
+GAME_ID_BATCH_SIZE = 100
+
+def _competitor_range(cfg):
+    my_avg_viewers = cfg.get('channel_profile', {}).get('avg_viewers', 10)
+    return my_avg_viewers * 0.3, my_avg_viewers * 2.5
+
+async def prepare(games, cfg, twitch_api, stream_index, jp_streams_truncated=False, **_):
+    """
+    【高速化版】実行ごとに1回だけ、ゲームごとの日本語配信の視聴者数一覧を作る。
+    司令塔がすでにまとめた stream_index を使い、取得上限で打ち切られて
+    競合の範囲の配信が欠けている可能性があるときだけ、Helixにまとめて問い合わせる。
+    """
+    if cfg.get('competition_source', 'jp_streams') != 'jp_streams':
+        return {}
+
+    competitor_range_min, _ = _competitor_range(cfg)
+    viewers = {game_id: entry['viewers'].tolist() for game_id, entry in stream_index['games'].items()}
+
+    # 配信は視聴者数の多い順に返ってくるので、打ち切られた地点の視聴者数が
+    # 競合の範囲の下限より小さければ、範囲内の配信はすべて揃っている
+    cutoff_viewers = stream_index['min_viewers']
+    if jp_streams_truncated and cutoff_viewers >= competitor_range_min:
+        game_ids = [game.id for game in games]
+        for i in range(0, len(game_ids), GAME_ID_BATCH_SIZE):
+            chunk = game_ids[i:i + GAME_ID_BATCH_SIZE]
+            fetched = defaultdict(list)
+            try:
+                async for stream in twitch_api.get_streams(game_id=chunk, language='ja', first=100):
+                    if stream.viewer_count < competitor_range_min:
+                        break  # ここから先は、競合の範囲より小さい配信しかない
+                    fetched[stream.game_id].append(stream.viewer_count)
+            except Exception as e:
+                # レートリミット等でエラーになったゲームは、従来どおり静かに評価をあきらめる (None)
+                fetched = dict.fromkeys(chunk)
+            for game_id in chunk:
+                viewers[game_id] = fetched.get(game_id, [])
+
+    return {'competition_viewers': viewers}
+
+def uses_upstream(competition_viewers=None, **_):
+    """prepare() で視聴者数一覧ができていれば、ゲームごとの評価ではHelixへ問い合わせない"""
+    return competition_viewers is None
+
+def score_bounds(game, cfg, **_):
+    """このシグナルが返しうるスコアの範囲（足切りの判定に使う）"""
+    base_bonus = cfg.get('weights', {}).get('blue_ocean_bonus', 25)
+    penalty = cfg.get('penalties', {}).get('competitor_penalty', {}).get('weight', 25)
+    return {"competition_score": (-penalty, base_bonus * 1.5)}
+
+async def score(game, cfg, twitch_api, competition_viewers=None, **_):
     """
     競合（日本人配信者）の状況を分析し、市場の参入しやすさを評価する。
-    APIへの負荷を考慮し、待機処理を挟む。
+    prepare() で作った視聴者数一覧があればそれを使い、なければゲームごとにHelixへ問い合わせる。
+    APIへの負荷は、twitch_api に差し込まれたレート制限(RateLimiter)が調整する。
     """
-    # ★★★【最後の働き方改革！】★★★
-    # Twitch APIへの連続アクセスを防ぐため、1秒間待機する
-    # これにより、レートリミットに遭遇する可能性を劇的に減らす
-    await asyncio.sleep(1)
+    competitor_range_min, competitor_range_max = _competitor_range(cfg)
 
-    my_avg_viewers = cfg.get('channel_profile', {}).get('avg_viewers', 10)
-    competitor_range_min = my_avg_viewers * 0.3
-    competitor_range_max = my_avg_viewers * 2.5
-    
     if not game.get('id'):
         return {}
 
-    try:
-        streams = [s async for s in twitch_api.get_streams(game_id=[game['id']], language='ja', first=100)]
-    except Exception as e:
-        # レートリミット等でエラーになっても、警告は出さずに静かに終了
-        # print(f"⚠️ competition.pyでのAPIエラー: {e}")
-        return {}
-        
+    if competition_viewers is not None:
+        viewer_counts = competition_viewers.get(game['id'], [])
+        if viewer_counts is None:
+            return {}
+    else:
+        try:
+            streams = [s async for s in twitch_api.get_streams(game_id=[game['id']], language='ja', first=100)]
+        except Exception as e:
+            # レートリミット等でエラーになっても、警告は出さずに静かに終了
+            # print(f"⚠️ competition.pyでのAPIエラー: {e}")
+            return {}
+        viewer_counts = [stream.viewer_count for stream in streams]
+
     competitor_count = 0
-    for stream in streams:
-        if competitor_range_min <= stream.viewer_count <= competitor_range_max:
+    for viewer_count in viewer_counts:
+        if competitor_range_min <= viewer_count <= competitor_range_max:
             competitor_count += 1
 
     bonus, penalty, tags = 0, 0, []
-    
+
     base_bonus = cfg.get('weights', {}).get('blue_ocean_bonus', 25)
     if competitor_count == 0:
         bonus = base_bonus * 1.5
@@ -52,5 +104,5 @@ async def score(game, cfg, twitch_api, **_):
     final_score = bonus - penalty
     if final_score != 0:
         return {"competition_score": final_score, "source_hit_flags": tags}
-    
-    return {}
\ No newline at end of file
+
+    return {}
@@ -1,22 +1,49 @@
-from pytrends.request import TrendReq
+import threading
 import pandas as pd
-import time
+from .. import trends_cache, circuit_breaker
 
-# Googleトレンドに接続するためのオブジェクトを準備
-pytrends = TrendReq(hl='ja-JP', tz=540)
+# 問い合わせ先（同時実行数の制御に使う）
+UPSTREAM = 'google_trends'
 
-def score(game, cfg, **_):
-    """
-    Googleトレンドを使い、日本でのゲーム名の検索インタレストが
-    直近で急上昇しているかを評価する。
-    """
-    weight = cfg.get('weights', {}).get('trends_jp_spike', 0)
-    if weight == 0:
-        return {}
+# 調べる期間（直近7日間）
+TIMEFRAME = 'today 7-d'
 
+# Googleトレンドの1回の問い合わせに入れられる語数の上限（アンカー語を含む）
+MAX_PAYLOAD_TERMS = 5
+
+# Googleトレンドの値は、問い合わせの中で一番大きい語を100とした整数。
+# まとめた問い合わせの中で最大値がこれに届かない語は、値が0や1に潰れているので、1語だけで問い合わせ直す
+MIN_PEAK = 10
+
+# Googleトレンドに接続するためのオブジェクトは、初めて問い合わせる時に作る
+# （作成時にCookie取得の通信が走るので、import の時点では作らない）
+_pytrends = None
+_pytrends_lock = threading.Lock()
+
+def get_pytrends():
+    global _pytrends
+    with _pytrends_lock:
+        if _pytrends is None:
+            from pytrends.request import TrendReq
+            _pytrends = TrendReq(hl='ja-JP', tz=540)
+    return _pytrends
+
+def _trends_cfg(cfg):
+    trends_cfg = cfg.get('google_trends', {})
+    return (
+        trends_cfg.get('anchor_term', 'Minecraft'),
+        max(1, min(trends_cfg.get('batch_size', MAX_PAYLOAD_TERMS), MAX_PAYLOAD_TERMS) - 1),
+        trends_cfg.get('cache_ttl_hours', 12),
+        trends_cfg.get('min_peak', MIN_PEAK),
+    )
+
+def _spike_cap(cfg):
+    """急上昇率の上限（signal_caps.trends_jp_spike）。未設定なら上限なし"""
+    return cfg.get('signal_caps', {}).get('trends_jp_spike') or float('inf')
+
+def _keywords(game_name):
     # --- ★★★【改善①】複数のキーワード候補で、賢く検索★★★ ---
     # ゲーム名から、考えられる検索キーワードのリストを作成
-    game_name = game['name']
     keywords = [
         f"{game_name} ゲーム", # 最も基本的な検索
         game_name,             # ゲーム名単体
@@ -24,41 +51,174 @@ def score(game, cfg, **_):
     # もしゲーム名にスペースがあれば、スペースなしのバージョンも追加 (例: Apex Legends -> ApexLegends)
     if ' ' in game_name:
         keywords.append(game_name.replace(' ', ''))
+    return keywords
 
-    best_spike_ratio = 0
-    
-    # 各キーワードでトレンドを調査し、最も良い結果を採用
+def canonical_keyword(keyword):
+    """Googleトレンドは大文字・小文字や余分な空白を区別しないので、同じ問い合わせとしてまとめる"""
+    return ' '.join(keyword.split()).lower()
+
+def _fetch_payload(keywords, anchor, rate_limiter=None):
+    """
+    アンカー語と一緒に最大4語を1回で問い合わせる。
+    同じ問い合わせの中の語は、Googleトレンド側で共通の尺度（一番大きい語が100）に揃えられている。
+    戻り値は キーワード -> (アンカー語の平均を100とした値のリスト, この問い合わせの中での最大値)
+    """
+    # アンカー語と同じキーワードは、アンカー語の列をそのまま使う
+    same_as_anchor = {keyword for keyword in keywords if keyword == canonical_keyword(anchor)}
+    terms = [anchor] + [keyword for keyword in keywords if keyword not in same_as_anchor]
+    df = _interest_over_time(terms, rate_limiter)
+
+    if df.empty or anchor not in df.columns:
+        return {keyword: ([], 0) for keyword in keywords}
+    anchor_mean = df[anchor].mean()
+    scale = 100 / anchor_mean if anchor_mean > 0 else 1
+    fetched = {}
     for keyword in keywords:
-        try:
-            # Google APIへの負荷を軽減するため、少しだけ待機
-            time.sleep(1) 
-            
-            pytrends.build_payload([keyword], cat=0, timeframe='today 7-d', geo='JP')
-            df = pytrends.interest_over_time()
-            
-            if df.empty or len(df) < 3 or keyword not in df.columns:
-                continue
-
-            past_avg = df[keyword].head(5).mean()
-            recent_avg = df[keyword].tail(2).mean()
-
-            if past_avg < 5:
-                continue
-            
-            # 現在の急上昇率を計算
-            current_spike_ratio = recent_avg / past_avg if past_avg > 0 else 0
-            
-            # これまでで最も高い急上昇率を記録
-            if current_spike_ratio > best_spike_ratio:
-                best_spike_ratio = current_spike_ratio
+        column = anchor if keyword in same_as_anchor else keyword
+        if column not in df.columns:
+            fetched[keyword] = ([], 0)
+            continue
+        values = df[column].astype(float)
+        fetched[keyword] = ((values * scale).tolist(), float(values.max()))
+    return fetched
+
+def _fetch_unanchored(keywords, rate_limiter=None):
+    """
+    アンカー語を入れずに問い合わせる（検索の少ない語どうしなら、一番大きい語が100になるので値が潰れにくい）。
+    急上昇率は尺度によらない比なので、アンカー語基準に揃えなくても判定できる。
+    戻り値は キーワード -> (値のリスト, この問い合わせの中での最大値)
+    """
+    df = _interest_over_time(keywords, rate_limiter)
+    return {
+        keyword: (df[keyword].astype(float).tolist(), float(df[keyword].max()))
+        if not df.empty and keyword in df.columns else ([], 0)
+        for keyword in keywords
+    }
+
+def _interest_over_time(terms, rate_limiter=None):
+    # Google APIへの負荷を軽減するため、レート制限の順番を待つ
+    if rate_limiter:
+        rate_limiter.acquire('google_trends')
+    pytrends = get_pytrends()
+    pytrends.build_payload(terms, cat=0, timeframe=TIMEFRAME, geo='JP')
+    return pytrends.interest_over_time()
+
+def _fetch_series(keywords, cfg, rate_limiter=None, trends_cache_conn=None, circuit_breakers=None):
+    """
+    キャッシュにないキーワードだけを問い合わせる。表記ゆれだけが違うキーワードは、正規化して1つにまとめる。
+    1. 前回見積もった検索量が近い語どうしで、アンカー語と一緒にまとめて問い合わせる
+       （人気の語と同じ組に入って、ほかの語の値が0に潰れるのを防ぐ）
+    2. 最大値が min_peak に届かなかった語と、前回から小さいと分かっている語は、
+       アンカー語を外して小さな語どうしで問い合わせ直し、それでも届かなければ1語だけで問い合わせる
+    戻り値は正規化したキーワード -> 値のリスト（取得に失敗したキーワードは含まない）。
+    """
+    anchor, terms_per_payload, ttl_hours, min_peak = _trends_cfg(cfg)
+    keywords = list(dict.fromkeys(canonical_keyword(keyword) for keyword in keywords))
+    series = trends_cache.get_many(trends_cache_conn, keywords, TIMEFRAME, anchor, ttl_hours)
 
+    missing = [keyword for keyword in keywords if keyword not in series]
+    volumes = trends_cache.get_volumes(trends_cache_conn, missing, TIMEFRAME, anchor)
+    # アンカー語の平均を100とした最大値が min_peak 未満の語は、アンカー語と組んでも潰れる
+    small = [keyword for keyword in missing if volumes.get(keyword, min_peak) < min_peak]
+    # 見積もりのない語を先に、残りは検索量の多い順に並べて、近い語どうしを同じ組にする
+    by_volume = lambda keyword: volumes.get(keyword, float('inf'))
+    anchored = sorted((keyword for keyword in missing if keyword not in small), key=by_volume, reverse=True)
+
+    def fetch(func, chunk, *args):
+        """1回分を問い合わせ、値が潰れていない語だけを保存して返す（潰れた語のリストも返す）"""
+        try:
+            fetched = circuit_breaker.call(circuit_breakers, UPSTREAM, func, chunk, *args, rate_limiter)
+        except circuit_breaker.CircuitOpenError:
+            raise
         except Exception as e:
-            # APIエラーは頻発するので、ループを継続
-            continue
-    
+            # APIエラーは頻発するので、次の塊へ進む（この塊は次回また問い合わせる）
+            return []
+        resolved, flattened = {}, []
+        for keyword, (values, peak) in fetched.items():
+            if func is _fetch_payload:
+                volumes[keyword] = max(values, default=0)
+            if peak >= min_peak or keyword == canonical_keyword(anchor) or len(chunk) == 1:
+                resolved[keyword] = (values, volumes.get(keyword, 0))
+            else:
+                flattened.append(keyword)
+        trends_cache.put_many(trends_cache_conn, resolved, TIMEFRAME, anchor)
+        series.update({keyword: values for keyword, (values, _) in resolved.items()})
+        return flattened
+
+    try:
+        # 1. 検索量の多い語は、アンカー語と一緒に
+        for i in range(0, len(anchored), terms_per_payload):
+            small += fetch(_fetch_payload, anchored[i:i + terms_per_payload], anchor)
+        # 2. 潰れた語は、検索量の近い小さな語どうしで（アンカー語の枠も使って5語ずつ）
+        small.sort(key=by_volume, reverse=True)
+        singles = []
+        for i in range(0, len(small), MAX_PAYLOAD_TERMS):
+            singles += fetch(_fetch_unanchored, small[i:i + MAX_PAYLOAD_TERMS])
+        # 3. それでも潰れた語は、1語だけで
+        for keyword in singles:
+            fetch(_fetch_unanchored, [keyword])
+    except circuit_breaker.CircuitOpenError:
+        pass  # 遮断中は、残りも問い合わせない
+    return series
+
+def _spike_ratio(values):
+    """
+    1つのキーワードの直近の急上昇率。データ不足やノイズなら None。
+    値は、まとめた問い合わせ（アンカー語基準）でも1語だけの問い合わせでも、最大値が min_peak 以上ある
+    （整数に潰れていない）ものだけが入っているので、引き伸ばさずにそのまま比を取る。
+    """
+    if len(values) < 3:
+        return None
+    peak = max(values)
+    if peak <= 0:
+        return None
+    values = pd.Series(values)
+
+    past_avg = values.head(5).mean()
+    recent_avg = values.tail(2).mean()
+
+    # 1語だけで問い合わせた時の「最大値(100)の5%未満はノイズ」と同じ基準を、尺度によらず当てはめる
+    if past_avg < peak * 0.05:
+        return None
+    return recent_avg / past_avg
+
+def prefetch(games, cfg, rate_limiter=None, trends_cache_conn=None, circuit_breakers=None, **_):
+    """評価するゲームのキーワードを、まとめて問い合わせてキャッシュに入れておく"""
+    if cfg.get('weights', {}).get('trends_jp_spike', 0) == 0:
+        return
+    keywords = [keyword for game in games for keyword in _keywords(game['name'])]
+    _fetch_series(keywords, cfg, rate_limiter, trends_cache_conn, circuit_breakers)
+
+def score_bounds(game, cfg, **_):
+    """このシグナルが返しうるスコアの範囲（足切りの判定に使う）"""
+    weight = cfg.get('weights', {}).get('trends_jp_spike', 0)
+    if weight == 0:
+        return {}
+    return {"trends_jp_spike_score": (0, weight * (_spike_cap(cfg) / 2))}
+
+def score(game, cfg, rate_limiter=None, trends_cache_conn=None, circuit_breakers=None, **_):
+    """
+    Googleトレンドを使い、日本でのゲーム名の検索インタレストが
+    直近で急上昇しているかを評価する。
+    prefetch() 済みのキーワードはキャッシュから読み、残りだけを問い合わせる。
+    """
+    weight = cfg.get('weights', {}).get('trends_jp_spike', 0)
+    if weight == 0:
+        return {}
+
+    keywords = _keywords(game['name'])
+    series = _fetch_series(keywords, cfg, rate_limiter, trends_cache_conn, circuit_breakers)
+
+    # 各キーワードでトレンドを調査し、最も良い結果を採用
+    best_spike_ratio = 0
+    for keyword in keywords:
+        current_spike_ratio = _spike_ratio(series.get(canonical_keyword(keyword), []))
+        if current_spike_ratio and current_spike_ratio > best_spike_ratio:
+            best_spike_ratio = current_spike_ratio
+
     # 最も良かった結果が、2倍以上の上昇を示していれば「急上昇」と判断
     if best_spike_ratio > 2:
-        final_score = weight * (best_spike_ratio / 2)
+        final_score = weight * (min(best_spike_ratio, _spike_cap(cfg)) / 2)
         return {"trends_jp_spike_score": final_score, "source_hit_flags": [f"🔍Gトレンド急上昇({best_spike_ratio:.1f}倍)"]}
 
-    return {}
\ No newline at end of file
+    return {}
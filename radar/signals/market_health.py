@@ -1,6 +1,8 @@
-def score(game, cfg, jp_streams, **_):
+import numpy as np
+
+def score(game, cfg, stream_index, **_):
     """
-    【高速化版】司令塔から渡された日本語配信リスト(jp_streams)を元に、
+    【高速化版】司令塔がゲームごとにまとめた日本語配信(stream_index)を元に、
     VPCと人気集中度を分析する。APIへの追加リクエストは行わない。
     """
 
@@ -11,14 +13,14 @@ def score(game, cfg, jp_streams, **_):
         return {}
 
     # --- ★★★【効率化！】★★★ ---
-    # 司令塔から渡されたリストの中から、このゲームの配信だけを抽出
-    streams_for_this_game = [s for s in jp_streams if s.game_id == game.get('id')]
-        
+    # 合計・件数・最大値は、司令塔が集計済みなので引くだけ
+    streams_for_this_game = stream_index['games'].get(game.get('id'))
+
     if not streams_for_this_game:
         return {}
-        
-    total_viewers = sum(s.viewer_count for s in streams_for_this_game)
-    streamer_count = len(streams_for_this_game)
+
+    total_viewers = streams_for_this_game['total']
+    streamer_count = streams_for_this_game['count']
     
     final_scores = {}
     final_flags = []
@@ -35,8 +37,7 @@ def score(game, cfg, jp_streams, **_):
         threshold = top_share_penalty.get('threshold', 0.7)
         weight = top_share_penalty.get('weight', 80)
             
-        top_streamer = max(streams_for_this_game, key=lambda s: s.viewer_count)
-        top_streamer_viewers = top_streamer.viewer_count
+        top_streamer_viewers = streams_for_this_game['max']
             
         top_share_ratio = top_streamer_viewers / total_viewers
             
@@ -47,4 +48,43 @@ def score(game, cfg, jp_streams, **_):
     if final_scores:
         return {**final_scores, "source_hit_flags": final_flags}
             
-    return {}
\ No newline at end of file
+    return {}
+
+def score_batch(games, cfg, stream_index, **_):
+    """
+    全ゲーム分のVPCと人気集中度を、配列の演算でまとめて計算する（score() と同じ基準）。
+    """
+    vpc_weight = cfg.get('weights', {}).get('viewers_per_ch', 0)
+    top_share_penalty = cfg.get('penalties', {}).get('top_share', {})
+
+    if vpc_weight == 0 and not top_share_penalty:
+        return {}
+
+    entries = [stream_index['games'].get(game.get('id')) for game in games]
+    total_viewers = np.array([e['total'] if e else 0 for e in entries], dtype=float)
+    streamer_count = np.array([e['count'] if e else 0 for e in entries], dtype=float)
+    top_streamer_viewers = np.array([e['max'] if e else 0 for e in entries], dtype=float)
+    has_streams = streamer_count > 0
+
+    final_scores = {}
+    final_flags = [[] for _ in games]
+
+    # --- 分析①：【日本の】VPC ---
+    if vpc_weight > 0:
+        viewers_per_channel = np.divide(total_viewers, streamer_count, out=np.zeros(len(games)), where=has_streams)
+        final_scores["viewers_per_ch_score"] = np.where(has_streams, np.minimum(viewers_per_channel * vpc_weight, 50), 0.0)
+        for i in np.flatnonzero(has_streams):
+            final_flags[i].append(f"👥VPC(JP): {viewers_per_channel[i]:.1f}")
+
+    # --- 分析②：【日本の】人気集中度 ---
+    if top_share_penalty:
+        threshold = top_share_penalty.get('threshold', 0.7)
+        weight = top_share_penalty.get('weight', 80)
+        has_viewers = has_streams & (total_viewers > 0)
+        top_share_ratio = np.divide(top_streamer_viewers, total_viewers, out=np.zeros(len(games)), where=has_viewers)
+        concentrated = has_viewers & (top_share_ratio > threshold)
+        final_scores["top_share_penalty"] = np.where(concentrated, -weight, 0.0)
+        for i in np.flatnonzero(concentrated):
+            final_flags[i].append(f"🎯人気集中(JP): {top_share_ratio[i]:.0%}")
+
+    return {**final_scores, "source_hit_flags": final_flags}
\ No newline at end of file
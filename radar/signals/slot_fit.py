@@ -1,53 +1,77 @@
 from datetime import datetime, timedelta
+import numpy as np
 import pytz
+from ..event_index import to_ns
+
+JST = pytz.timezone('Asia/Tokyo')
+
+
+async def prepare(games, cfg, **_):
+    """配信スケジュールは全ゲームで同じなので、実行ごとに1回だけ具体的な日時の範囲にしておく"""
+    return {'slot_windows': get_slot_windows(cfg, datetime.now(JST))}
+
+def get_slot_windows(cfg, now_jst):
+    """
+    イベント開始が「配信スロットの3時間前から配信終了まで」に入れば最高評価、という範囲の一覧。
+    索引と同じUTCのナノ秒で返す。
+    """
+    datetime_slots = parse_slots_to_datetime(get_relevant_slots(cfg, now_jst), now_jst)
+    return [(to_ns(start_slot - timedelta(hours=3)), to_ns(end_slot)) for start_slot, end_slot in datetime_slots]
+
+def fits_slots(game_events, slot_windows):
+    """このゲームのイベントのどれかが、どれかの配信スロットに合うか（スロットごとに二分探索）"""
+    for window_start, window_end in slot_windows:
+        window = game_events.between(window_start, window_end)
+        if window.start < window.stop:
+            return True
+    return False
 
 # このセンサーは非同期である必要はありません
-def score(game, cfg, events_df, **_):
+def score(game, cfg, event_index=None, slot_windows=None, **_):
     """
-    司令塔から渡されたイベント台帳(events_df)を元に、
+    司令塔から渡されたイベント台帳の索引(event_index)を元に、
     イベント日時と、あなたの配信スケジュールの相性を評価する。
     """
     # イベント台帳がなければ、分析不能
-    if events_df is None or events_df.empty:
+    if not event_index:
         return {}
-        
-    # --- ★★★【改善①】イベント台帳から、このゲームの情報を取得★★★ ---
-    game_events = events_df[events_df['game_name'].str.lower() == game['name'].lower()]
-    if game_events.empty:
+
+    game_events = event_index.get(game['name'])
+    if game_events is None:
         return {} # このゲームに関するイベントは登録されていない
 
-    # --- これ以降は、あなたの元の優れたロジックを、ほぼそのまま活用します ---
-    
-    JST = pytz.timezone('Asia/Tokyo')
-    now_jst = datetime.now(JST)
-    
-    # 複数のイベントがある場合、最もフィットするもので評価
-    best_fit_score = 0
-    
-    for _, event in game_events.iterrows():
-        # タイムゾーン情報を付与
-        event_start_jst = event['start_jst'].tz_localize('Asia/Tokyo') if event['start_jst'].tzinfo is None else event['start_jst']
-
-        # あなたの配信スケジュールを取得
-        relevant_slots = get_relevant_slots(cfg, now_jst)
-        datetime_slots = parse_slots_to_datetime(relevant_slots, now_jst)
-    
-        current_fit_score = 0
-        for start_slot, end_slot in datetime_slots:
-            # イベント開始が、配信スロットの3時間前から配信終了までの間にあるか (最高評価)
-            if (start_slot - timedelta(hours=3)) <= event_start_jst <= end_slot:
-                current_fit_score = 1.0; break
-        
-        if current_fit_score > best_fit_score:
-            best_fit_score = current_fit_score
-
-    if best_fit_score > 0:
+    if slot_windows is None:
+        slot_windows = get_slot_windows(cfg, datetime.now(JST))
+
+    # 複数のイベントがある場合でも、1つでも配信スロットに合えば最高評価
+    if fits_slots(game_events, slot_windows):
         weight = cfg.get('weights', {}).get('slot_fit', 30)
-        final_score = best_fit_score * weight
-        return {"slot_fit_score": final_score, "source_hit_flags": ["⏰配信時間に最適！"]}
+        return {"slot_fit_score": 1.0 * weight, "source_hit_flags": ["⏰配信時間に最適！"]}
 
     return {}
 
+def score_batch(games, cfg, event_index=None, slot_windows=None, **_):
+    """
+    全ゲーム分をまとめて評価する（score() と同じ基準）。
+    ゲームごとに索引を1回引き、配信スロットごとに二分探索するだけなので、台帳の大きさに依らない。
+    """
+    if not event_index:
+        return {}
+
+    if slot_windows is None:
+        slot_windows = get_slot_windows(cfg, datetime.now(JST))
+
+    hits = np.zeros(len(games), dtype=bool)
+    for i, game in enumerate(games):
+        game_events = event_index.get(game['name'])
+        hits[i] = game_events is not None and fits_slots(game_events, slot_windows)
+
+    weight = cfg.get('weights', {}).get('slot_fit', 30)
+    return {
+        "slot_fit_score": np.where(hits, 1.0 * weight, 0.0),
+        "source_hit_flags": [["⏰配信時間に最適！"] if hit else [] for hit in hits],
+    }
+
 # --- 以下は、あなたのコードに含まれていたヘルパー関数です（変更なし） ---
 
 def get_relevant_slots(cfg, now_jst):
@@ -1,35 +1,81 @@
 import os
-import requests
 import time
+import requests
+from .. import steamcharts_cache, singleflight
+
+# 問い合わせ先（同時実行数の制御に使う）
+UPSTREAM = 'steam'
 
 # 過去のデータを取得するためのエンドポイント（非公式APIのため、将来変更される可能性あり）
 HISTORY_URL = "https://steamcharts.com/app/{appid}/chart-data.json"
 
-def get_recent_player_history(appid):
-    """SteamChartsから直近のプレイヤー数履歴を取得するヘルパー関数"""
+# 「過去の平均プレイヤー数」を計算する期間
+HISTORY_WINDOW_DAYS = 30
+
+def _download_history(appid, http=requests):
+    """SteamChartsから、プレイヤー数の履歴全体を [(UNIX時刻(秒), プレイヤー数), ...] で取得する"""
     try:
         headers = {'User-Agent': 'Mozilla/5.0'} # Botアクセスを偽装
-        response = requests.get(HISTORY_URL.format(appid=appid), headers=headers, timeout=5)
+        response = http.get(HISTORY_URL.format(appid=appid), headers=headers, timeout=5)
         response.raise_for_status()
         data = response.json()
-        
-        # UNIXタイムスタンプとプレイヤー数のリストを取得
-        timestamps = [entry[0] // 1000 for entry in data]
-        players = [entry[1] for entry in data]
-        
-        # 過去30日間の平均プレイヤー数を計算
-        # （ここでは簡略化のため、取得データ全体の平均を使う）
-        if players:
-            return sum(players) / len(players)
+        return [(entry[0] // 1000, entry[1]) for entry in data if entry[1] is not None]
     except Exception:
         return None
+
+def get_recent_player_history(appid, http=requests, steamcharts_cache_conn=None, cfg=None):
+    """
+    直近30日間の平均プレイヤー数を返すヘルパー関数。
+    キャッシュがあれば保存済みの時系列を使い、一番新しい点が古くなった時だけSteamChartsから取り直す。
+    """
+    steamcharts_cfg = (cfg or {}).get('steamcharts', {})
+    now = time.time()
+    window_start = now - HISTORY_WINDOW_DAYS * 86400
+
+    if steamcharts_cache_conn is None:
+        points = _download_history(appid, http) or []
+        players = [p for ts, p in points if ts >= window_start]
+    else:
+        _, _, fetch_info = steamcharts_cache.load_series(steamcharts_cache_conn, appid, window_start)
+        if steamcharts_cache.is_stale(fetch_info, steamcharts_cfg.get('refresh_hours', 12), now):
+            points = _download_history(appid, http)
+            # 取得に失敗した場合は、保存済みの（少し古い）時系列で評価する
+            if points is not None:
+                steamcharts_cache.store_points(
+                    steamcharts_cache_conn, appid, points, steamcharts_cfg.get('retention_days', 60), now
+                )
+        _, players, _ = steamcharts_cache.load_series(steamcharts_cache_conn, appid, window_start)
+
+    if len(players):
+        return sum(players) / len(players)
     return None
 
-def score(game, cfg, **_):
+def _ratio_cap(cfg):
+    """伸び率の上限（signal_caps.steam_ccu_ratio）。未設定なら上限なし"""
+    return cfg.get('signal_caps', {}).get('steam_ccu_ratio') or float('inf')
+
+def score_bounds(game, cfg, **_):
+    """このシグナルが返しうるスコアの範囲（足切りの判定に使う）"""
+    if not game.get('steam_appid') or not os.environ.get('STEAM_API_KEY'):
+        return {}
+    weight = cfg.get('weights', {}).get('steam_ccu_ratio', 8)
+    return {
+        "steam_ccu_ratio_score": (0, weight * (_ratio_cap(cfg) / 1.5)),
+        "steam_ccu_score": (0, weight),
+    }
+
+def _get_current_players(appid, steam_api_key, http):
+    current_players_url = f"https://api.steampowered.com/ISteamUserStats/GetNumberOfCurrentPlayers/v1/?appid={appid}&key={steam_api_key}"
+    response = http.get(current_players_url, timeout=5)
+    response.raise_for_status()
+    return response.json().get("response", {}).get("player_count", 0)
+
+def score(game, cfg, http=None, steamcharts_cache_conn=None, single_flight=None, **_):
     """
     現在のプレイヤー数と、過去の平均プレイヤー数を比較し、
     その「伸び率（勢い）」を評価する。
     """
+    http = http or requests
     steam_appid = game.get('steam_appid')
     if not steam_appid:
         return {}
@@ -40,18 +86,21 @@ def score(game, cfg, **_):
         return {}
 
     # --- 1. 現在のプレイヤー数を取得 ---
+    # 同じAppIDに当たるゲーム（エディション違い・体験版など）とは、1回の問い合わせを分け合う
     try:
-        current_players_url = f"https://api.steampowered.com/ISteamUserStats/GetNumberOfCurrentPlayers/v1/?appid={steam_appid}&key={steam_api_key}"
-        response = requests.get(current_players_url, timeout=5)
-        response.raise_for_status()
-        current_players = response.json().get("response", {}).get("player_count", 0)
+        current_players = singleflight.call(
+            single_flight, ('steam_current_players', steam_appid),
+            _get_current_players, steam_appid, steam_api_key, http
+        )
     except requests.exceptions.RequestException:
         return {} # 現在のプレイヤー数が取れなければ分析不能
 
     # --- 2. 過去の平均プレイヤー数を取得 ---
-    # 外部サイトへの負荷を考慮し、1秒待機
-    time.sleep(1)
-    past_avg_players = get_recent_player_history(steam_appid)
+    # 外部サイトへの負荷は、共有HTTPクライアントのレート制限(steamcharts)が調整する
+    past_avg_players = singleflight.call(
+        single_flight, ('steamcharts_history', steam_appid),
+        get_recent_player_history, steam_appid, http, steamcharts_cache_conn, cfg
+    )
 
     # --- 3. 「勢い」をスコアリング ---
     # 過去のデータが取得できた場合のみ、「伸び率」を評価
@@ -62,7 +111,8 @@ def score(game, cfg, **_):
         if ratio >= 1.5:
             weight = cfg.get('weights', {}).get('steam_ccu_ratio', 8)
             # 伸び率が大きいほど、スコアも高くなるように調整
-            final_score = weight * (ratio / 1.5)
+            # 極端な伸び率（過去の平均が小さいゲームなど）は、上限で頭打ちにする
+            final_score = weight * (min(ratio, _ratio_cap(cfg)) / 1.5)
             return {"steam_ccu_ratio_score": final_score, "source_hit_flags": [f"Steam人気急増({ratio:.1f}倍)🔥"]}
 
     # 過去のデータが取れなかった場合は、以前の「絶対数」で評価
@@ -1,5 +1,10 @@
+import time
 import requests
-from datetime import datetime, timedelta
+from .. import news_cache, singleflight
+from datetime import datetime
+
+# 問い合わせ先（同時実行数の制御に使う）
+UPSTREAM = 'steam'
 
 # --- ★★★【改善①】キーワードを「重要度」でランク分け★★★ ---
 
@@ -12,44 +17,105 @@ A_RANK_KEYWORDS = ['update', 'event', 'アップデート', 'イベント']
 # Bランク：軽微な修正や日常的なお知らせ（これらは“加点しない”ために使う）
 B_RANK_KEYWORDS = ['patch', 'hotfix', 'bug fix', 'maintenance', 'パッチ', '修正', 'メンテナンス']
 
-def score(game, cfg, **_):
+# 評価するのは、最新の記事から何件までか
+NEWS_COUNT = 5
+NEWS_URL = "https://api.steampowered.com/ISteamNews/GetNewsForApp/v2/"
+
+
+class KeywordRanker:
+    """
+    3つのキーワードリストを、優先順位（B → S → A）つきの1つの表にまとめた分類器。
+    記事を小文字にするのは1回だけで、最初に見つかったキーワードのランクで決まる。
+    （Bランクが1つでもあれば加点しない、次にSランク、最後にAランク、という元の判定と同じ）
+    """
+
+    def __init__(self, ranked_keywords):
+        self.table = tuple((keyword.lower(), rank) for keywords, rank in ranked_keywords for keyword in keywords)
+
+    def rank(self, title, contents):
+        content = (title + " " + contents).lower()
+        for keyword, rank in self.table:
+            if keyword in content:
+                return rank
+        return ''
+
+
+RANKER = KeywordRanker([(B_RANK_KEYWORDS, ''), (S_RANK_KEYWORDS, 'S'), (A_RANK_KEYWORDS, 'A')])
+
+def score_bounds(game, cfg, **_):
+    """このシグナルが返しうるスコアの範囲（足切りの判定に使う）"""
+    if not game.get('steam_appid'):
+        return {}
+    # 最高は「3日以内のSランクニュース」＝ 鮮度1.0 × ランク1.5
+    weight = cfg.get('weights', {}).get('steam_news_update', 15)
+    return {"steam_news_score": (0, weight * 1.5)}
+
+def _get_news_items(appid, http, maxlength=0):
+    """maxlength を小さくすると本文が短い要約になり、記事の一覧だけを軽く確かめられる"""
+    params = {'appid': appid, 'count': NEWS_COUNT, 'maxlength': maxlength}
+    response = http.get(NEWS_URL, params=params, timeout=5)
+    response.raise_for_status()
+    return response.json().get('appnews', {}).get('newsitems', [])
+
+def _classify(items):
+    return [(item['gid'], item['date'], RANKER.rank(item.get('title', ''), item.get('contents', ''))) for item in items]
+
+def get_ranked_news(appid, http, news_cache_conn=None, cfg=None):
+    """
+    最新の記事を (公開日時, ランク) の新しい順のリストで返す。
+    キャッシュがあれば、refresh_hours 以内は問い合わせず、それ以降も記事の一覧を軽く確かめて、
+    新しい記事があった時だけ本文を取り、新しい記事だけを分類する。
+    """
+    if news_cache_conn is None:
+        return [(date, rank) for _, date, rank in _classify(_get_news_items(appid, http))]
+
+    news_cfg = (cfg or {}).get('steam_news', {})
+    now = time.time()
+    checked_at = news_cache.last_checked(news_cache_conn, appid)
+    if checked_at is None:
+        # 初めてのAppIDは、一覧を確かめるまでもなく本文ごと取る
+        new_items = _get_news_items(appid, http)
+    elif now - checked_at >= news_cfg.get('refresh_hours', 6) * 3600:
+        listing = _get_news_items(appid, http, maxlength=1)
+        known = news_cache.known_gids(news_cache_conn, appid, [str(item['gid']) for item in listing])
+        new_items = [item for item in listing if str(item['gid']) not in known]
+        if new_items:
+            full_items = {str(item['gid']): item for item in _get_news_items(appid, http)}
+            new_items = [full_items[str(item['gid'])] for item in new_items if str(item['gid']) in full_items]
+    else:
+        new_items = None
+
+    if new_items is not None:
+        news_cache.store_items(
+            news_cache_conn, appid, _classify(new_items), news_cfg.get('retention_days', 30), NEWS_COUNT, now
+        )
+    return news_cache.latest_items(news_cache_conn, appid, NEWS_COUNT)
+
+def score(game, cfg, http=None, single_flight=None, news_cache_conn=None, **_):
     """
     Steamニュースのキーワードの“重要度”と“鮮度”の両方を評価する。
     """
+    http = http or requests
     appid = game.get('steam_appid')
     if not appid:
         return {}
 
-    URL = f"https://api.steampowered.com/ISteamNews/GetNewsForApp/v2/?appid={appid}&count=5"
-    
+    # 同じAppIDに当たるゲーム（エディション違い・体験版など）とは、1回の問い合わせを分け合う
     try:
-        response = requests.get(URL, timeout=5)
-        response.raise_for_status()
-        news_items = response.json().get('appnews', {}).get('newsitems', [])
+        news_items = singleflight.call(
+            single_flight, ('steam_news', appid), get_ranked_news, appid, http, news_cache_conn, cfg
+        )
     except requests.exceptions.RequestException:
         return {}
 
     best_score_multiplier = 0
     detected_rank = ""
 
-    for item in news_items:
-        content = (item.get('title', '') + " " + item.get('contents', '')).lower()
-        
-        # --- ★★★【改善②】ニュースの“重要度”を判定★★★ ---
-        current_rank = None
-        # Bランク（軽微な修正）のキーワードが含まれていたら、このニュースは無視する
-        if any(keyword in content for keyword in B_RANK_KEYWORDS):
-            continue
-        # Sランク（超重要）のキーワードが含まれていたら
-        elif any(keyword in content for keyword in S_RANK_KEYWORDS):
-            current_rank = "S"
-        # Aランク（重要）のキーワードが含まれていたら
-        elif any(keyword in content for keyword in A_RANK_KEYWORDS):
-            current_rank = "A"
-        
+    for date, current_rank in news_items:
+        # --- ★★★【改善②】ニュースの“重要度”は、取得した時に1回だけ判定済み★★★ ---
         # 重要なニュースが見つかった場合のみ、鮮度を評価
         if current_rank:
-            news_date = datetime.fromtimestamp(item['date'])
+            news_date = datetime.fromtimestamp(date)
             days_ago = (datetime.now() - news_date).days
             
             # 鮮度と重要度ランクを元に、スコア倍率を決定
@@ -1,4 +1,5 @@
 # 【この内容で radar/signals/twitch_drops.py を作成・保存してください】
+import numpy as np
 
 def score(game, cfg, twitch_api, **_):
     """
@@ -15,4 +16,18 @@ def score(game, cfg, twitch_api, **_):
         if weight > 0:
             return {"drops_score": weight, "source_hit_flags": ["💧Drops有効"]}
             
-    return {}
\ No newline at end of file
+    return {}
+
+def score_batch(games, cfg, **_):
+    """
+    全ゲーム分のDrops判定を、一度にまとめて列で返す（score() と同じ基準）。
+    """
+    weight = cfg.get('weights', {}).get('drops', 0)
+    if weight <= 0:
+        return {}
+
+    enabled = np.array([bool(getattr(g.get('game_data'), 'is_drops_enabled', False)) for g in games], dtype=bool)
+    return {
+        "drops_score": np.where(enabled, weight, 0.0),
+        "source_hit_flags": [["💧Drops有効"] if hit else [] for hit in enabled],
+    }
\ No newline at end of file
@@ -0,0 +1,100 @@
+import time
+import numpy as np
+from .. import history_store
+
+def _history_cfg(cfg):
+    history_cfg = cfg.get('history', {})
+    return (
+        history_cfg.get('lookback_runs', 6),       # 比較に使う過去の実行の回数
+        history_cfg.get('min_snapshots', 2),       # 過去の値がこれより少ないゲームは評価しない
+        history_cfg.get('min_viewers', 100),       # 過去の平均視聴者数がこれ未満のゲームはノイズとして除外
+    )
+
+def _growth_cap(cfg):
+    """伸び率の上限（signal_caps.twitch_growth）。未設定なら上限なし"""
+    return cfg.get('signal_caps', {}).get('twitch_growth') or float('inf')
+
+async def prepare(games, cfg, history_conn=None, history_taken_at=None, **_):
+    """
+    【外部API不要】手元の履歴(stream_history.sqlite3)から、直近の実行でのゲームごとの
+    平均の配信数・視聴者数を、実行ごとに1回だけ読み出しておく。
+    """
+    lookback_runs, min_snapshots, _ = _history_cfg(cfg)
+    before = history_taken_at if history_taken_at is not None else time.time()
+    _, snapshots = history_store.load_prior_snapshots(
+        history_conn, [game.id for game in games], before, lookback_runs
+    )
+    baselines = {
+        game_id: tuple(np.mean(values, axis=0))
+        for game_id, values in snapshots.items() if len(values) >= min_snapshots
+    }
+    return {'stream_baselines': baselines}
+
+def _growth(current_channels, current_viewers, baseline, cfg):
+    """今回の値と過去の平均から、(配信数の伸び率, 視聴者数の伸び率, 合わせた伸び率) を返す"""
+    _, _, min_viewers = _history_cfg(cfg)
+    baseline_channels, baseline_viewers = baseline
+    if baseline_viewers < min_viewers or baseline_channels <= 0:
+        return None
+    channel_ratio = current_channels / baseline_channels
+    viewer_ratio = current_viewers / baseline_viewers
+    # 視聴者数(70%)と配信者数(30%)を組み合わせる
+    return channel_ratio, viewer_ratio, viewer_ratio * 0.7 + channel_ratio * 0.3
+
+def _flags(channel_ratio, viewer_ratio):
+    flags = [f"📺JP視聴者増加({viewer_ratio:.1f}倍)"]
+    if channel_ratio >= 1.5:
+        flags.append(f"🎙️JP配信者増加({channel_ratio:.1f}倍)")
+    return flags
+
+def score(game, cfg, stream_index, stream_baselines=None, **_):
+    """
+    前回までの実行の記録と比べて、日本語配信の視聴者数・配信者数が伸びているかを評価する。
+    Twitchのデータは毎回取得済みなので、追加のAPIリクエストは行わない。
+    """
+    weight = cfg.get('weights', {}).get('twitch_growth', 0)
+    baseline = (stream_baselines or {}).get(game.get('id'))
+    current = stream_index['games'].get(game.get('id'))
+    if weight == 0 or baseline is None or current is None:
+        return {}
+
+    growth = _growth(current['count'], current['total'], baseline, cfg)
+    if growth is None:
+        return {}
+    channel_ratio, viewer_ratio, ratio = growth
+
+    # 伸び率が1.5倍（50%増）以上の場合にスコアを加算
+    if ratio >= 1.5:
+        final_score = weight * (min(ratio, _growth_cap(cfg)) / 1.5)
+        return {"twitch_growth_score": final_score, "source_hit_flags": _flags(channel_ratio, viewer_ratio)}
+    return {}
+
+def score_batch(games, cfg, stream_index, stream_baselines=None, **_):
+    """
+    全ゲーム分の伸び率を、一度にまとめて列で返す（score() と同じ基準）。
+    """
+    weight = cfg.get('weights', {}).get('twitch_growth', 0)
+    if weight == 0 or not stream_baselines or not games:
+        return {}
+    _, _, min_viewers = _history_cfg(cfg)
+
+    missing = {'count': 0, 'total': 0}
+    current = [stream_index['games'].get(g.get('id'), missing) for g in games]
+    current_channels = np.array([entry['count'] for entry in current], dtype=float)
+    current_viewers = np.array([entry['total'] for entry in current], dtype=float)
+    baselines = np.array([stream_baselines.get(g.get('id'), (0.0, 0.0)) for g in games], dtype=float)
+    baseline_channels, baseline_viewers = baselines[:, 0], baselines[:, 1]
+
+    valid = (baseline_viewers >= min_viewers) & (baseline_channels > 0) & (current_channels > 0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        channel_ratio = np.where(valid, current_channels / baseline_channels, 0.0)
+        viewer_ratio = np.where(valid, current_viewers / baseline_viewers, 0.0)
+    ratio = viewer_ratio * 0.7 + channel_ratio * 0.3
+
+    hit = valid & (ratio >= 1.5)
+    return {
+        "twitch_growth_score": np.where(hit, weight * (np.minimum(ratio, _growth_cap(cfg)) / 1.5), 0.0),
+        "source_hit_flags": [
+            _flags(channel_ratio[i], viewer_ratio[i]) if hit[i] else [] for i in range(len(games))
+        ],
+    }
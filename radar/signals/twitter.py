@@ -1,71 +1,235 @@
 import os
-import tweepy
+import re
 from datetime import datetime, timedelta, timezone
+import requests
+from .. import circuit_breaker
 
-bearer_token = os.environ.get("X_BEARER")
-client = tweepy.Client(bearer_token) if bearer_token else None
+# 問い合わせ先（同時実行数の制御に使う）
+UPSTREAM = 'x'
 
-def score(game, cfg, **_):
+# X API v2（config.yaml の x.api_base で、手元の偽サーバーに向けられる）
+DEFAULT_API_BASE = 'https://api.x.com'
+COUNTS_PATH = '/2/tweets/counts/recent'
+SEARCH_PATH = '/2/tweets/search/recent'
+
+QUERY_SUFFIX = ' -is:retweet lang:ja'
+SAMPLE_SIZE = 10    # 質を見るためのサンプルは、1ゲームあたり10件で十分
+MAX_RESULTS = 100   # search_recent の1回で返せる最大件数
+
+def score_bounds(game, cfg, **_):
+    """このシグナルが返しうるスコアの範囲（足切りの判定に使う）"""
+    weight = cfg.get('weights', {}).get('twitter_jp_spike', 0)
+    if not os.environ.get("X_BEARER") or weight == 0:
+        return {}
+    # 量(70%)と質(30%)の割合は、どちらも1.0で頭打ち
+    return {"twitter_jp_spike_score": (0, weight)}
+
+# --- クエリの組み立て ---
+
+def name_fragment(name):
+    """1ゲーム分の条件（ゲーム名そのもの、またはハッシュタグ）"""
+    phrase = name.replace('"', '')
+    hashtag = re.sub(r'\W', '', name)
+    return f'"{phrase}" OR #{hashtag}' if hashtag else f'"{phrase}"'
+
+def combined_query(names):
+    """複数のゲームの条件を OR でまとめた、1回分のクエリ"""
+    return '(' + ' OR '.join(name_fragment(name) for name in names) + ')' + QUERY_SUFFIX
+
+def pack_names(names, max_query_length, sizes=None, max_size=None):
+    """
+    ゲーム名を、クエリの長さの上限（と、sizes の合計が max_size 以下）に収まる組に、順番どおりに詰める。
+    1件だけでも上限を超える名前は、問い合わせられないので外す。
+    """
+    groups, current, current_size = [], [], 0
+    for name in names:
+        if len(combined_query([name])) > max_query_length:
+            continue
+        size = sizes[name] if sizes else 0
+        if current and (
+            len(combined_query(current + [name])) > max_query_length
+            or (max_size is not None and current_size + size > max_size)
+        ):
+            groups.append(current)
+            current, current_size = [], 0
+        current.append(name)
+        current_size += size
+    if current:
+        groups.append(current)
+    return groups
+
+def mentions(text, name):
+    """取得したツイートが、どのゲームの条件に当たったのかを手元で判定する"""
+    text = text.casefold()
+    hashtag = re.sub(r'\W', '', name)
+    return name.replace('"', '').casefold() in text or (bool(hashtag) and f"#{hashtag}".casefold() in text)
+
+# --- X APIの呼び出し ---
+
+def _get(http, cfg, path, params):
+    # 認証エラー(401)やレートリミット(429)が続いたら、共有HTTPクライアントのブレーカーが残りを止める
+    # クエリの問題(400)は、X側の不調ではないので数えない
+    url = cfg.get('x', {}).get('api_base', DEFAULT_API_BASE).rstrip('/') + path
+    headers = {'Authorization': f"Bearer {os.environ.get('X_BEARER')}"}
+    response = http.get(url, params=params, headers=headers, timeout=10)
+    response.raise_for_status()
+    return response.json()
+
+def _count(http, cfg, names, start_time):
+    """直近1時間の件数（ツイート本体は読まないので、月間の取得上限を使わない）"""
+    body = _get(http, cfg, COUNTS_PATH, {'query': combined_query(names), 'start_time': start_time, 'granularity': 'hour'})
+    return body.get('meta', {}).get('total_tweet_count', 0)
+
+def _count_group(http, cfg, names, start_time, counts):
+    """
+    組の件数が0なら、組の全員を0件で確定する。件数があれば、組を半分に分けて数え直す。
+    （まとめたクエリの件数は、どのゲームの分かに振り分けられないため。話題のゲームは少ないので、
+    大半の組は1回で確定する）
+    クエリが受け付けられなかった(400)組も半分に分け、1件でも通らない名前だけを外す（他の組の件数は残す）。
+    """
+    try:
+        total = _count(http, cfg, names, start_time)
+    except requests.HTTPError as e:
+        if e.response is None or e.response.status_code != 400:
+            raise
+        if len(names) == 1:
+            print(f"⚠️ twitter.py: 「{names[0]}」のクエリがXに受け付けられなかったため、件数を数えません。")
+            return
+        total = None
+    if total is not None and (total == 0 or len(names) == 1):
+        counts.update({name: total for name in names})
+        return
+    half = len(names) // 2
+    _count_group(http, cfg, names[:half], start_time, counts)
+    _count_group(http, cfg, names[half:], start_time, counts)
+
+def _search(http, cfg, names, start_time, max_results):
+    body = _get(http, cfg, SEARCH_PATH, {
+        'query': combined_query(names), 'start_time': start_time,
+        'max_results': max(SAMPLE_SIZE, min(max_results, MAX_RESULTS)),
+        'tweet.fields': 'public_metrics',  # いいね、リツイート数などを取得
+    })
+    return body.get('data') or []
+
+def _engagement(tweet):
+    metrics = tweet.get('public_metrics')
+    if not isinstance(metrics, dict):
+        return 0
+    return metrics.get('like_count', 0) + metrics.get('retweet_count', 0)
+
+def collect(games, cfg, http=None):
+    """
+    ゲームごとの直近1時間の件数(量)と、エンゲージメントのサンプル(質)を、まとめて問い合わせる。
+    1. 量 : 複数のゲーム名を1つのクエリに詰めて件数を数え、0件の組はそれで確定する。
+            件数があった組だけ、半分ずつに分けて数え直す
+    2. 質 : 件数の多い上位(x.sample_top件)だけ、ツイートを取得する。件数の少ないゲームは
+            取得件数の上限に収まるだけ1つのクエリに詰め、どのゲームのツイートかは手元で振り分ける
+    戻り値は ゲーム名 -> {'count': 件数, 'engagements': [いいね+リツイート, ...]}。
+    件数を取れなかったゲームは None にする（取れた組の結果は残し、score で1ゲームずつ問い合わせ直さない）。
+    ツイートを取得できなかった組は、サンプルなし（量だけで評価）にする。
+    """
+    http = http or requests
+    x_cfg = cfg.get('x', {})
+    max_query_length = x_cfg.get('max_query_length', 512)
+    start_time = (datetime.now(timezone.utc) - timedelta(hours=1)).strftime('%Y-%m-%dT%H:%M:%SZ')
+    names = list(dict.fromkeys(game['name'] for game in games))
+
+    counts = {}
+    for group in pack_names(names, max_query_length):
+        try:
+            _count_group(http, cfg, group, start_time, counts)
+        except circuit_breaker.CircuitOpenError:
+            break  # 遮断中は、残りの組も問い合わせない
+        except requests.exceptions.RequestException as e:
+            print(f"⚠️ twitter.py: {len(group)}件のゲームの件数を取得できませんでした: {e}")
+
+    shortlist = sorted((name for name in counts if counts[name] > 0), key=counts.get, reverse=True)
+    shortlist = shortlist[:x_cfg.get('sample_top', 30)]
+    engagements = {name: [] for name in counts}
+
+    # 件数がサンプルより少ないゲームは、全件が1回の取得に収まる範囲でまとめる
+    few = [name for name in shortlist if counts[name] <= SAMPLE_SIZE]
+    searches = [(group, sum(counts[name] for name in group)) for group in pack_names(few, max_query_length, counts, MAX_RESULTS)]
+    # 件数の多いゲームは、従来どおり1ゲームにつき直近の10件だけ
+    searches += [([name], SAMPLE_SIZE) for name in shortlist if counts[name] > SAMPLE_SIZE]
+    for group, max_results in searches:
+        try:
+            tweets = _search(http, cfg, group, start_time, max_results)
+        except circuit_breaker.CircuitOpenError:
+            break
+        except requests.exceptions.RequestException as e:
+            print(f"⚠️ twitter.py: {len(group)}件のゲームのツイートを取得できませんでした: {e}")
+            continue
+        for tweet in tweets:
+            for name in group:
+                if len(group) == 1 or mentions(tweet.get('text', ''), name):
+                    engagements[name].append(_engagement(tweet))
+
+    results = {name: {'count': counts[name], 'engagements': engagements[name][:SAMPLE_SIZE]} for name in counts}
+    results.update({name: None for name in names if name not in counts})
+    return results
+
+# --- シグナル ---
+
+async def prepare(games, cfg, **_):
+    """この実行の結果を入れておく場所（prefetch が埋め、score が読む）"""
+    return {'x_results': {}}
+
+def prefetch(games, cfg, http=None, x_results=None, **_):
+    """これから評価するゲームの分を、まとめて問い合わせておく"""
+    if not os.environ.get("X_BEARER") or cfg.get('weights', {}).get('twitter_jp_spike', 0) == 0 or x_results is None:
+        return
+    pending = [game for game in games if game['name'] not in x_results]
+    if pending:
+        x_results.update(collect(pending, cfg, http))
+
+def score(game, cfg, http=None, x_results=None, **_):
     """
     X (Twitter) APIを使い、直近の日本語ツイートの「量」と「質（エンゲージメント）」
     の両面から、ゲームの話題性を評価する。
     """
-    if not client:
-        if not bearer_token:
-            print("⚠️ twitter.py: X_BEARERが設定されていません。")
+    if not os.environ.get("X_BEARER"):
+        print("⚠️ twitter.py: X_BEARERが設定されていません。")
         return {}
 
     weight = cfg.get('weights', {}).get('twitter_jp_spike', 0)
     if weight == 0:
         return {}
-        
-    query = f'"{game["name"]}" OR #{game["name"]} -is:retweet lang:ja'
-    one_hour_ago = datetime.now(timezone.utc) - timedelta(hours=1)
-    
-    try:
-        # --- ★★★【改善①】ツイートの「質」も取得できるように、拡張フィールドを指定★★★ ---
-        response = client.search_recent_tweets(
-            query=query,
-            start_time=one_hour_ago,
-            max_results=10, # 質を見るので、サンプルは10件で十分
-            expansions=['author_id'],
-            tweet_fields=['public_metrics'] # いいね、リツイート数などを取得
-        )
-        
-        tweets = response.data
-        if not tweets:
+
+    x_results = x_results or {}
+    if game['name'] in x_results:
+        # まとめて問い合わせて失敗したゲーム(None)も、ここで問い合わせ直さない
+        result = x_results[game['name']]
+    else:
+        # まとめて取得しなかったゲームは、このゲームだけで問い合わせる
+        try:
+            result = collect([game], cfg, http).get(game['name'])
+        except requests.exceptions.RequestException:
+            return {}
+        except Exception as e:
+            print(f"⚠️ twitter.pyで予期せぬエラー: {e}")
             return {}
+    if not result or not result['count']:
+        return {}
 
-        # --- ★★★【改善②】「量」と「質」を組み合わせたスコアリング★★★ ---
-        
-        # 1. 量のスコア：1時間あたりのツイート数
-        #    (APIの仕様上、取得したツイート数(最大10)と、全体のツイート数(meta)を考慮)
-        tweet_count = response.meta.get('result_count', 0)
-        quantity_score_ratio = min(tweet_count / 100, 1.0) # 100件で満点
+    # --- ★★★【改善②】「量」と「質」を組み合わせたスコアリング★★★ ---
 
-        # 2. 質のスコア：平均エンゲージメント（いいね+リツイート）
-        total_engagement = 0
-        for tweet in tweets:
-            # public_metricsが存在し、辞書であることを確認
-            if tweet.public_metrics and isinstance(tweet.public_metrics, dict):
-                total_engagement += tweet.public_metrics.get('like_count', 0)
-                total_engagement += tweet.public_metrics.get('retweet_count', 0)
-        
-        avg_engagement = total_engagement / len(tweets) if tweets else 0
-        # 平均10エンゲージメントで満点とする（ハードルは低め）
-        quality_score_ratio = min(avg_engagement / 10, 1.0)
-        
-        # 最終的なスコアは、量(70%)と質(30%)を組み合わせて算出
-        final_score_ratio = (quantity_score_ratio * 0.7) + (quality_score_ratio * 0.3)
-        final_score = weight * final_score_ratio
-
-        if final_score > 0:
-            return {"twitter_jp_spike_score": final_score, "source_hit_flags": [f"💬Xで話題({tweet_count}+)"]}
-
-    except tweepy.errors.TweepyException:
-        return {}
-    except Exception as e:
-        print(f"⚠️ twitter.pyで予期せぬエラー: {e}")
-        return {}
-            
-    return {}
\ No newline at end of file
+    # 1. 量のスコア：1時間あたりのツイート数（件数のエンドポイントで数えた全体の件数）
+    tweet_count = result['count']
+    quantity_score_ratio = min(tweet_count / 100, 1.0) # 100件で満点
+
+    # 2. 質のスコア：平均エンゲージメント（いいね+リツイート）
+    #    サンプルを取らなかったゲーム（件数が上位でないもの）は、量だけで評価する
+    engagements = result['engagements']
+    avg_engagement = sum(engagements) / len(engagements) if engagements else 0
+    # 平均10エンゲージメントで満点とする（ハードルは低め）
+    quality_score_ratio = min(avg_engagement / 10, 1.0)
+
+    # 最終的なスコアは、量(70%)と質(30%)を組み合わせて算出
+    final_score_ratio = (quantity_score_ratio * 0.7) + (quality_score_ratio * 0.3)
+    final_score = weight * final_score_ratio
+
+    if final_score > 0:
+        return {"twitter_jp_spike_score": final_score, "source_hit_flags": [f"💬Xで話題({tweet_count}+)"]}
+
+    return {}
@@ -1,58 +1,63 @@
-import pandas as pd
+import numpy as np
 from datetime import datetime
 import pytz
+from ..event_index import NS_PER_DAY, to_ns
+
+# horizon(3d/7d/30d)ごとに結果が変わるので、司令塔はhorizonごとに評価し直す
+HORIZON_DEPENDENT = True
+
+# horizonごとに評価するイベント：開始までの日数（切り捨て）がこの範囲に入るもの
+HORIZON_DAYS = {'3d': (-1, 1), '7d': (0, 7), '30d': (0, 30)}
+
+def best_event(game_events, horizon, now_ns):
+    """
+    horizonの期間に開始するイベントだけを二分探索で切り出し、最もスコアの高いイベントを選ぶ。
+    同点なら events.csv で先に登録されたもの。戻り値は (スコア, フラグ)。
+    """
+    lo_days, hi_days = HORIZON_DAYS[horizon]
+    window = game_events.between(now_ns + lo_days * NS_PER_DAY, now_ns + (hi_days + 1) * NS_PER_DAY, include_end=False)
+    if window.start == window.stop:
+        return 0, None
+
+    days_until_event = (game_events.starts[window] - now_ns) // NS_PER_DAY
+    hype_weight = game_events.hype_weights[window]
+
+    # --- ★★★【改善②】horizonに応じた、賢いスコアリング★★★ ---
+    if horizon == '3d':
+        # 「まさに今日」開始されるイベントを最高に評価（昨日～明日、1.5倍ブースト！）
+        event_scores = hype_weight * 1.5
+    elif horizon == '7d':
+        # 「7日以内」に開始されるイベントを、日が近いほど高く評価
+        event_scores = hype_weight * (8 - days_until_event) / 8
+    else:
+        # 月モードでは、近さよりもイベント自体の重要度を評価
+        event_scores = hype_weight
+
+    best_score = event_scores.max()
+    if best_score <= 0:
+        return 0, None
+    candidates = np.flatnonzero(event_scores == best_score)
+    i = candidates[np.argmin(game_events.rows[window][candidates])]
+
+    days = int(days_until_event[i])
+    event_name = game_events.event_names[window][i]
+    flag = f"EVENT(開催中!): {event_name}" if days <= 0 else f"EVENT({days}日後): {event_name}"
+    return best_score, flag
 
 # ★★★【改善①】引数に horizon を追加★★★
-def score(game, cfg, events_df, horizon='3d', **_):
+def score(game, cfg, event_index=None, horizon='3d', **_):
     """
     司令塔から渡されたhorizon(3d/7d/30d)に応じて、
     未来のイベントを評価する。
     """
-    if events_df is None or events_df.empty:
+    if not event_index or horizon not in HORIZON_DAYS:
         return {}
 
-    game_events = events_df[events_df['game_name'].str.lower() == game['name'].lower()]
-    if game_events.empty:
+    game_events = event_index.get(game['name'])
+    if game_events is None:
         return {}
 
-    today = datetime.now(pytz.timezone('Asia/Tokyo'))
-    best_score = 0
-    best_flag = None
-
-    for _, event in game_events.iterrows():
-        start_time = event['start_jst'].tz_localize('Asia/Tokyo') if event['start_jst'].tzinfo is None else event['start_jst']
-        days_until_event = (start_time - today).days
-        
-        # --- ★★★【改善②】horizonに応じた、賢いスコアリング★★★ ---
-        
-        current_score = 0
-        
-        # --- now (3d) モードの評価 ---
-        # 「まさに今日」開始されるイベントを最高に評価
-        if horizon == '3d' and -1 <= days_until_event <= 1: # 昨日～明日
-            current_score = event['hype_weight'] * 1.5 # 1.5倍ブースト！
-            
-        # --- week (7d) モードの評価 ---
-        # 「7日以内」に開始されるイベントを評価
-        elif horizon == '7d' and 0 <= days_until_event <= 7:
-            # 日が近いほどスコアが高くなる
-            proximity_bonus = (8 - days_until_event) / 8
-            current_score = event['hype_weight'] * proximity_bonus
-            
-        # --- month (30d) モードの評価 ---
-        # 「30日以内」に開始されるイベントを評価
-        elif horizon == '30d' and 0 <= days_until_event <= 30:
-            # 月モードでは、近さよりもイベント自体の重要度を評価
-            current_score = event['hype_weight']
-
-        # --- スコアとフラグの更新 ---
-        if current_score > best_score:
-            best_score = current_score
-            if days_until_event <= 0:
-                best_flag = f"EVENT(開催中!): {event['event_name']}"
-            else:
-                best_flag = f"EVENT({days_until_event}日後): {event['event_name']}"
-
+    best_score, best_flag = best_event(game_events, horizon, to_ns(datetime.now(pytz.timezone('Asia/Tokyo'))))
     if best_score > 0:
         # config.yamlの重み付けは、各horizonモードごとに適用される
         weight = cfg.get('weights', {}).get(horizon, {}).get('upcoming_event_score', 1)
@@ -60,4 +65,27 @@ def score(game, cfg, events_df, horizon='3d', **_):
         if final_score > 0:
             return {"upcoming_event_score": final_score, "source_hit_flags": [best_flag]}
             
-    return {}
\ No newline at end of file
+    return {}
+
+def score_batch(games, cfg, event_index=None, horizon='3d', **_):
+    """
+    全ゲーム分をまとめて評価する（score() と同じ基準）。
+    ゲームごとに索引を1回引き、horizonの期間だけを二分探索で切り出して評価する。
+    """
+    if not event_index or horizon not in HORIZON_DAYS:
+        return {}
+
+    now_ns = to_ns(datetime.now(pytz.timezone('Asia/Tokyo')))
+    weight = cfg.get('weights', {}).get(horizon, {}).get('upcoming_event_score', 1)
+    final_scores = np.zeros(len(games))
+    final_flags = [[] for _ in games]
+    for i, game in enumerate(games):
+        game_events = event_index.get(game['name'])
+        if game_events is None:
+            continue
+        best_score, best_flag = best_event(game_events, horizon, now_ns)
+        if best_score * weight > 0:
+            final_scores[i] = best_score * weight
+            final_flags[i].append(best_flag)
+
+    return {"upcoming_event_score": final_scores, "source_hit_flags": final_flags}
@@ -0,0 +1,41 @@
+import threading
+from concurrent.futures import Future
+
+
+class SingleFlight:
+    """
+    1回の実行の中で、同じ問い合わせをまとめる係。
+    同じキーの呼び出しが同時に来たら、実際に問い合わせるのは最初の1件だけで、残りはその結果を待って分け合う。
+    成功した結果は実行の終わりまで覚えておき、後から来た呼び出しにもそのまま返す。
+    失敗した場合は、待っていた呼び出しにだけ同じエラーを返し、次の呼び出しはもう一度問い合わせる。
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.futures = {}
+        self.coalesced = 0  # 問い合わせを省けた回数
+
+    def do(self, key, func, *args, **kwargs):
+        with self.lock:
+            future = self.futures.get(key)
+            is_owner = future is None
+            if is_owner:
+                future = self.futures[key] = Future()
+            else:
+                self.coalesced += 1
+
+        if is_owner:
+            try:
+                future.set_result(func(*args, **kwargs))
+            except Exception as e:
+                with self.lock:
+                    del self.futures[key]
+                future.set_exception(e)
+        return future.result()
+
+
+def call(single_flight, key, func, *args, **kwargs):
+    """single_flight が渡されていなければ、そのまま実行する"""
+    if single_flight is None:
+        return func(*args, **kwargs)
+    return single_flight.do(key, func, *args, **kwargs)
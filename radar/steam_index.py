@@ -0,0 +1,331 @@
+import mmap
+import os
+import re
+import struct
+import unicodedata
+from bisect import bisect_left
+from collections import defaultdict
+import numpy as np
+from rapidfuzz import fuzz, process
+
+# Steamアプリリストを、そのままメモリマップして検索できるバイナリ形式で保存する
+STEAM_APP_INDEX_FILE = 'steam_app_list.bin'
+
+_MAGIC = b'HGRSTEAM'
+_VERSION = 1
+_HEADER = struct.Struct('<8sII')
+_SECTION = struct.Struct('<QQ')
+
+# ファイル内のセクション（この順番で、8バイト境界に並べて書き込む）
+_SECTIONS = [
+    'name_blob', 'name_offsets', 'appids', 'lengths', 'name_order',
+    'normalized_blob', 'normalized_offsets', 'normalized_postings_offsets', 'normalized_postings',
+    'grams_blob', 'grams_offsets', 'grams_postings_offsets', 'grams_postings',
+    'tokens_blob', 'tokens_offsets', 'tokens_postings_offsets', 'tokens_postings',
+]
+_DTYPES = {'lengths': np.uint16}
+
+# get_steam_appid と同じ「90%以上似ているもの」だけを採用する基準
+MATCH_SCORE_CUTOFF = 90
+NGRAM_SIZE = 3
+
+# 正規化で取り除く商標記号など
+_TRADEMARK_CHARS = str.maketrans('', '', '™®©℠')
+_PUNCTUATION_RE = re.compile(r'[^\w\s]')
+_SPACES_RE = re.compile(r'\s+')
+
+
+def normalize_title(name):
+    """ゲーム名を比較用に正規化する（大文字小文字・記号・商標マークを無視）"""
+    text = unicodedata.normalize('NFKC', name).translate(_TRADEMARK_CHARS).casefold()
+    text = _PUNCTUATION_RE.sub(' ', text)
+    return _SPACES_RE.sub(' ', text).strip()
+
+
+def _ngrams(text):
+    return {text[i:i + NGRAM_SIZE] for i in range(len(text) - NGRAM_SIZE + 1)}
+
+
+# --- 書き込み ---
+
+def _string_table(encoded):
+    offsets = np.zeros(len(encoded) + 1, dtype=np.uint64)
+    if encoded:
+        offsets[1:] = np.cumsum([len(b) for b in encoded], dtype=np.uint64)
+    return b''.join(encoded), offsets
+
+
+def _postings_table(prefix, table):
+    """{キー: 位置のリスト} を、ソート済みのキー表と、位置の配列に変換する"""
+    keys = sorted(table, key=lambda k: k.encode('utf-8'))
+    blob, offsets = _string_table([k.encode('utf-8') for k in keys])
+    postings = [np.asarray(table[k], dtype=np.uint32) for k in keys]
+    postings_offsets = np.zeros(len(keys) + 1, dtype=np.uint64)
+    if keys:
+        postings_offsets[1:] = np.cumsum([len(p) for p in postings], dtype=np.uint64)
+    return {
+        f'{prefix}_blob': blob,
+        f'{prefix}_offsets': offsets,
+        f'{prefix}_postings_offsets': postings_offsets,
+        f'{prefix}_postings': np.concatenate(postings) if postings else np.zeros(0, dtype=np.uint32),
+    }
+
+
+def write_index(app_names, app_dict, path=STEAM_APP_INDEX_FILE):
+    """
+    Steamアプリリストを、次のセクションからなるバイナリファイルに書き出す。
+    - name_*      : 元の順番のゲーム名（同点時の優先順位としてそのまま保持）と、その長さ・AppID
+    - name_order  : ゲーム名のバイト順に並べた位置（完全一致を二分探索で探す用）
+    - normalized  : 正規化した名前 -> 位置
+    - grams       : 3文字のn-gram -> 位置（候補の絞り込み用）
+    - tokens      : 単語 -> 位置（単語の組み合わせで一致するケース用）
+    """
+    encoded = [name.encode('utf-8') for name in app_names]
+    normalized = defaultdict(list)
+    grams = defaultdict(list)
+    tokens = defaultdict(list)
+
+    seen = set()
+    for pos, name in enumerate(app_names):
+        if name in seen:
+            continue
+        seen.add(name)
+        normalized[normalize_title(name)].append(pos)
+        for gram in _ngrams(name):
+            grams[gram].append(pos)
+        for token in set(name.split()):
+            tokens[token].append(pos)
+
+    name_blob, name_offsets = _string_table(encoded)
+    sections = {
+        'name_blob': name_blob,
+        'name_offsets': name_offsets,
+        # 同じ名前が複数あっても、従来の {名前: appid} の辞書と同じAppIDを返す
+        'appids': np.array([app_dict.get(name, 0) for name in app_names], dtype=np.uint32),
+        'lengths': np.array([min(len(name), 0xFFFF) for name in app_names], dtype=np.uint16),
+        'name_order': np.array(sorted(range(len(encoded)), key=lambda i: (encoded[i], i)), dtype=np.uint32),
+        **_postings_table('normalized', normalized),
+        **_postings_table('grams', grams),
+        **_postings_table('tokens', tokens),
+    }
+
+    header_size = _HEADER.size + _SECTION.size * len(_SECTIONS)
+    layout, payload, cursor = [], [], header_size
+    for name in _SECTIONS:
+        data = sections[name]
+        data = data if isinstance(data, bytes) else data.tobytes()
+        padding = -cursor % 8
+        payload.append(b'\0' * padding)
+        cursor += padding
+        layout.append((cursor, len(data)))
+        payload.append(data)
+        cursor += len(data)
+
+    # 読み込み中のプロセスを壊さないよう、一時ファイルに書いてから置き換える
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(_HEADER.pack(_MAGIC, _VERSION, len(app_names)))
+        for offset, size in layout:
+            f.write(_SECTION.pack(offset, size))
+        f.write(b''.join(payload))
+    os.replace(tmp_path, path)
+
+
+# --- 読み込み ---
+
+def open_index(path=STEAM_APP_INDEX_FILE):
+    """
+    バイナリファイルをメモリマップで開く。JSONのように全体を解析することはなく、
+    実際に参照したページだけがメモリに読み込まれる。
+    ファイルがない・形式が違う・途中で切れている場合は None（次の更新で作り直される）。
+    """
+    try:
+        with open(path, 'rb') as f:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (FileNotFoundError, ValueError):
+        return None
+
+    try:
+        magic, version, count = _HEADER.unpack_from(mm, 0)
+        if magic != _MAGIC or version != _VERSION:
+            return None
+
+        index = {'mm': mm, 'count': count}
+        for i, name in enumerate(_SECTIONS):
+            offset, size = _SECTION.unpack_from(mm, _HEADER.size + _SECTION.size * i)
+            if name.endswith('_blob'):
+                index[name] = (offset, size)
+                continue
+            dtype = np.dtype(np.uint64 if name.endswith('offsets') else _DTYPES.get(name, np.uint32))
+            index[name] = np.frombuffer(mm, dtype=dtype, count=size // dtype.itemsize, offset=offset)
+    except (struct.error, ValueError) as e:
+        print(f"⚠️ Steamアプリリストファイルが壊れています（次の更新で作り直します）: {e}")
+        return None
+    return index
+
+
+class _SortedKeys:
+    """二分探索用に、メモリマップ上の文字列表をソート済みのバイト列として見せる"""
+
+    def __init__(self, index, prefix, order=None):
+        self.mm = index['mm']
+        self.base = index[f'{prefix}_blob'][0]
+        self.offsets = index[f'{prefix}_offsets']
+        self.order = order
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        if self.order is not None:
+            i = self.order[i]
+        return self.mm[self.base + int(self.offsets[i]):self.base + int(self.offsets[i + 1])]
+
+
+def decode_names(index, positions):
+    """指定した位置のゲーム名だけを、メモリマップから取り出す"""
+    mm = index['mm']
+    base = index['name_blob'][0]
+    positions = np.asarray(positions, dtype=np.int64)
+    starts = (index['name_offsets'][positions] + base).tolist()
+    ends = (index['name_offsets'][positions + 1] + base).tolist()
+    return [mm[start:end].decode('utf-8') for start, end in zip(starts, ends)]
+
+
+def app_names(index):
+    """元の順番で、全てのゲーム名を取り出す（ベンチマーク用）"""
+    return decode_names(index, np.arange(index['count']))
+
+
+def _first_pos(index, name):
+    """完全一致する名前の、リスト内で最初の位置を返す"""
+    keys = _SortedKeys(index, 'name', index['name_order'])
+    key = name.encode('utf-8')
+    i = bisect_left(keys, key)
+    if i < len(keys) and keys[i] == key:
+        return int(index['name_order'][i])
+    return None
+
+
+def _postings(index, prefix, keys):
+    sorted_keys = _SortedKeys(index, prefix)
+    postings_offsets = index[f'{prefix}_postings_offsets']
+    postings = index[f'{prefix}_postings']
+    arrays = []
+    for key in keys:
+        key = key.encode('utf-8')
+        i = bisect_left(sorted_keys, key)
+        if i < len(sorted_keys) and sorted_keys[i] == key:
+            arrays.append(postings[int(postings_offsets[i]):int(postings_offsets[i + 1])])
+    return np.concatenate(arrays) if arrays else np.zeros(0, dtype=np.uint32)
+
+
+def _shortlist(index, game_name):
+    """
+    WRatioで90点以上になり得る候補だけを、元のリストの位置で返す。
+    WRatioが90点に届くのは、次のいずれかの場合に限られる。
+    - 長さの比が1.5未満で、編集距離が小さいか、単語の組み合わせがほぼ同じ
+    - 長さの比が1.5～8で、短い方が長い方にそのまま含まれている
+    """
+    lengths = index['lengths']
+    query_len = len(game_name)
+    query_grams = _ngrams(game_name)
+    if not query_grams:
+        # 短すぎる名前はn-gramで絞り込めないので、長さの条件だけで候補にする
+        return set(np.flatnonzero((lengths >= 1) & (lengths <= query_len * 8)).tolist())
+
+    candidates = set(_postings(index, 'normalized', [normalize_title(game_name)]).tolist())
+
+    # 候補の方が短く、ゲーム名の一部にそのまま含まれているケース
+    for size in range(max(1, -(-query_len // 8)), int(query_len / 1.5) + 1):
+        for start in range(query_len - size + 1):
+            pos = _first_pos(index, game_name[start:start + size])
+            if pos is not None:
+                candidates.add(pos)
+
+    # n-gramの共有数を、全件まとめて数える
+    shared = np.bincount(_postings(index, 'grams', query_grams), minlength=len(lengths))
+    token_hit = np.bincount(_postings(index, 'tokens', set(game_name.split())), minlength=len(lengths)) > 0
+
+    # 1回の編集で失われるn-gramは最大3つ、単語の並べ替えで失われるのは境界の分だけ
+    gram_count = len(query_grams)
+    token_slack = 2 * (len(game_name.split()) - 1)
+    max_edits = (query_len + lengths.astype(np.int64)) * (100 - MATCH_SCORE_CUTOFF) // 100
+    min_shared = np.maximum(1, gram_count - 3 * max_edits - token_slack)
+
+    similar_length = (lengths * 1.5 >= query_len) & (lengths <= query_len * 1.5)
+    longer = (lengths >= query_len * 1.5) & (lengths <= query_len * 8)
+    mask = (similar_length & ((shared >= min_shared) | token_hit)) | (longer & (shared == gram_count))
+    candidates.update(np.flatnonzero(mask).tolist())
+    return candidates
+
+
+def attach_overlay(index, changed_apps):
+    """
+    インデックスを作った後に追加・改名されたアプリ [(AppID, 名前), ...] を、インデックスに上乗せする。
+    上乗せしたAppIDの元の行は検索から外し、上乗せ分はリストの末尾にあるものとして扱う。
+    インデックスのファイルは書き換えず、辞書の差し替えだけなので、検索の途中で呼んでも安全。
+    """
+    names = [name for _, name in changed_apps]
+    appids = [int(appid) for appid, _ in changed_apps]
+    positions = {}
+    for pos, name in enumerate(names):
+        positions.setdefault(name, pos)
+    index['overlay'] = {
+        'names': names,
+        'appids': appids,
+        'positions': positions,
+        'stale': np.isin(index['appids'], np.asarray(appids, dtype=np.uint32)),
+    }
+
+
+def find_match(index, game_name, score_cutoff=MATCH_SCORE_CUTOFF):
+    """
+    インデックスを使って、最も似ているアプリを (AppID, 一致した名前, スコア) で返す。
+    結果は全件に対する process.extractOne(..., scorer=fuzz.WRatio) と同じになる。
+    上乗せの差分(attach_overlay)があれば、それも含めた全件に対する結果になる。
+    """
+    appids = index['appids']
+    overlay = index.get('overlay')
+    stale = overlay['stale'] if overlay else None
+
+    # 完全一致なら、あいまい検索をするまでもなく100点で確定
+    pos = _first_pos(index, game_name)
+    if pos is not None and (stale is None or not stale[pos]):
+        return int(appids[pos]), game_name, 100.0
+    if overlay and game_name in overlay['positions']:
+        return overlay['appids'][overlay['positions'][game_name]], game_name, 100.0
+
+    candidates = _shortlist(index, game_name)
+    if stale is not None:
+        candidates = {pos for pos in candidates if not stale[pos]}
+
+    # 元のリストの順番に並べ直し、同点時に選ばれる候補を揃える（上乗せ分は末尾）
+    positions = sorted(candidates)
+    choices = decode_names(index, positions)
+    choice_appids = [int(appids[pos]) for pos in positions]
+    if overlay:
+        choices += overlay['names']
+        choice_appids += overlay['appids']
+    if not choices:
+        return None
+
+    best_match = process.extractOne(game_name, choices, scorer=fuzz.WRatio, score_cutoff=score_cutoff)
+    if best_match:
+        return choice_appids[best_match[2]], best_match[0], best_match[1]
+    return None
+
+
+def find_appid(index, game_name, score_cutoff=MATCH_SCORE_CUTOFF):
+    """インデックスを使ってAppIDだけを探す"""
+    match = find_match(index, game_name, score_cutoff)
+    return match[0] if match else None
+
+
+def index_version(path=STEAM_APP_INDEX_FILE):
+    """アプリリストが書き換えられたかを判定するための、ファイルの版を返す"""
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return f"{stat.st_size}:{stat.st_mtime_ns}"
@@ -0,0 +1,93 @@
+import sqlite3
+import threading
+import time
+import numpy as np
+
+# SteamChartsのプレイヤー数の履歴を、AppIDごとの時系列として実行をまたいで覚えておくキャッシュ
+STEAMCHARTS_CACHE_FILE = 'steamcharts_cache.sqlite3'
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS points (
+    appid   INTEGER NOT NULL,
+    ts      INTEGER NOT NULL,          -- UNIX時刻（秒）
+    players INTEGER NOT NULL,
+    PRIMARY KEY (appid, ts)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS series (
+    appid      INTEGER PRIMARY KEY,
+    newest_ts  INTEGER,                -- 保存している一番新しい点の時刻（NULL はデータなし）
+    fetched_at REAL NOT NULL
+);
+"""
+
+# steam_ccu はスレッドプールで並行に動くので、接続は1つにしてロックで順番に使う
+_lock = threading.Lock()
+
+
+def open_cache(path=STEAMCHARTS_CACHE_FILE):
+    conn = sqlite3.connect(path, check_same_thread=False)
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute('PRAGMA synchronous=NORMAL')
+    conn.executescript(_SCHEMA)
+    return conn
+
+
+def close_cache(conn):
+    if conn is not None:
+        with _lock:
+            conn.commit()
+            conn.close()
+
+
+def load_series(conn, appid, since):
+    """
+    since 以降の点を (時刻の配列, プレイヤー数の配列) で返し、
+    あわせて最後に取得した時の情報 (一番新しい点の時刻, 取得した時刻) も返す。
+    一度も取得していなければ、取得の情報は None。
+    """
+    with _lock:
+        row = conn.execute('SELECT newest_ts, fetched_at FROM series WHERE appid = ?', (appid,)).fetchone()
+        rows = conn.execute(
+            'SELECT ts, players FROM points WHERE appid = ? AND ts >= ? ORDER BY ts', (appid, since)
+        ).fetchall()
+    points = np.array(rows, dtype=np.int64).reshape(-1, 2)
+    return points[:, 0], points[:, 1], row
+
+
+def is_stale(fetch_info, refresh_hours, now=None):
+    """
+    一番新しい点が refresh_hours より古ければ、取り直しが必要。
+    ただし、取り直したばかりなのにSteamCharts側がまだ更新されていない場合は、
+    同じ間隔を空けてから、次に取り直す。
+    """
+    if fetch_info is None:
+        return True
+    now = time.time() if now is None else now
+    newest_ts, fetched_at = fetch_info
+    refresh_seconds = refresh_hours * 3600
+    newest_is_old = newest_ts is None or now - newest_ts >= refresh_seconds
+    return newest_is_old and now - fetched_at >= refresh_seconds
+
+
+def store_points(conn, appid, points, retention_days, now=None):
+    """
+    取得した履歴のうち、保存済みの一番新しい点より後のものだけを追記し、
+    保存期間(retention_days)より古い点は消す。
+    """
+    now = time.time() if now is None else now
+    with _lock:
+        row = conn.execute('SELECT newest_ts FROM series WHERE appid = ?', (appid,)).fetchone()
+        newest_ts = row[0] if row and row[0] is not None else None
+        expired_before = now - retention_days * 86400
+        new_points = [
+            (appid, int(ts), int(players)) for ts, players in points
+            if ts >= expired_before and (newest_ts is None or ts > newest_ts)
+        ]
+        conn.executemany('INSERT OR REPLACE INTO points (appid, ts, players) VALUES (?, ?, ?)', new_points)
+        if new_points:
+            newest_ts = max(ts for _, ts, _ in new_points)
+        conn.execute(
+            'INSERT OR REPLACE INTO series (appid, newest_ts, fetched_at) VALUES (?, ?, ?)', (appid, newest_ts, now)
+        )
+        conn.execute('DELETE FROM points WHERE appid = ? AND ts < ?', (appid, expired_before))
+        conn.commit()
@@ -0,0 +1,34 @@
+from collections import defaultdict
+import numpy as np
+
+
+def build_stream_index(jp_streams):
+    """
+    取得した日本語配信を、ゲームごとに1回だけまとめる。
+    シグナルはゲームIDで引くだけで、配信リスト全体をなめる必要がなくなる。
+
+    戻り値:
+      games        : game_id -> {'viewers': 視聴者数の配列(多い順), 'total', 'count', 'max'}
+      min_viewers  : 取得した配信の中で最も少ない視聴者数（取得上限で打ち切った地点）
+      stream_count : 取得した配信の総数
+    """
+    grouped = defaultdict(list)
+    for stream in jp_streams:
+        if stream.game_id:
+            grouped[stream.game_id].append(stream.viewer_count)
+
+    games = {}
+    for game_id, counts in grouped.items():
+        viewers = np.sort(np.asarray(counts, dtype=np.int64))[::-1]
+        games[game_id] = {
+            'viewers': viewers,
+            'total': int(viewers.sum()),
+            'count': len(viewers),
+            'max': int(viewers[0]),
+        }
+
+    return {
+        'games': games,
+        'min_viewers': min((s.viewer_count for s in jp_streams), default=0),
+        'stream_count': len(jp_streams),
+    }
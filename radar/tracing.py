@@ -0,0 +1,175 @@
+import contextvars
+import json
+import os
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import datetime, timezone
+import numpy as np
+
+# レイテンシのヒストグラムの区切り（秒）
+LATENCY_BUCKETS = [0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30]
+
+# いま実行中のシグナル（外部へのリクエストを、どのシグナルが出したかを数えるのに使う）
+current_signal = contextvars.ContextVar('current_signal', default=None)
+
+
+def signal_name(module, hook='score'):
+    """レポートに載せるシグナルの名前（score 以外のフックは「名前.フック」）"""
+    name = module.__name__.rsplit('.', 1)[-1]
+    return name if hook == 'score' else f"{name}.{hook}"
+
+
+def outcome_of(result, error=None):
+    """シグナル1回分の結果の分類（スコアを返せば hit、何も返さなければ empty）"""
+    if error is not None:
+        return 'error'
+    if isinstance(result, dict) and any('score' in key for key in result):
+        return 'hit'
+    return 'empty'
+
+
+def _histogram(durations):
+    counts = np.histogram(durations, bins=[0] + LATENCY_BUCKETS + [np.inf])[0].tolist()
+    labels = [f"<={bound}s" for bound in LATENCY_BUCKETS] + [f">{LATENCY_BUCKETS[-1]}s"]
+    return dict(zip(labels, counts))
+
+
+def _latency_stats(durations):
+    if not durations:
+        return {'count': 0}
+    values = np.asarray(durations)
+    return {
+        'count': len(values),
+        'total_seconds': round(float(values.sum()), 3),
+        'p50': round(float(np.percentile(values, 50)), 3),
+        'p95': round(float(np.percentile(values, 95)), 3),
+        'max': round(float(values.max()), 3),
+        'histogram': _histogram(values),
+    }
+
+
+class RunTrace:
+    """
+    1回の実行の計測係。スレッドからも非同期処理からも記録できる。
+    - シグナル : フックごとの実行時間・結果（hit / empty / error / skipped）・エラー内容
+    - 外部リクエスト : 問い合わせ先ごとの回数・レイテンシ・ステータス、どのシグナルが出したか
+    """
+
+    def __init__(self):
+        self.started_at = time.time()
+        self.lock = threading.Lock()
+        self.signal_durations = defaultdict(list)
+        self.signal_outcomes = defaultdict(lambda: defaultdict(int))
+        self.signal_errors = defaultdict(list)
+        self.request_durations = defaultdict(list)
+        self.request_statuses = defaultdict(lambda: defaultdict(int))
+        self.requests_by_signal = defaultdict(lambda: defaultdict(int))
+        self.phases = {}
+
+    def record_signal(self, name, seconds, outcome, error=None, game=None):
+        with self.lock:
+            self.signal_durations[name].append(seconds)
+            self.signal_outcomes[name][outcome] += 1
+            if error is not None:
+                self.signal_errors[name].append({'game': game, 'error': f"{type(error).__name__}: {error}"})
+
+    def record_request(self, upstream, seconds, status):
+        """status: HTTPステータス、または例外のクラス名"""
+        signal = current_signal.get() or '(司令塔)'
+        with self.lock:
+            self.request_durations[upstream].append(seconds)
+            self.request_statuses[upstream][str(status)] += 1
+            self.requests_by_signal[signal][upstream] += 1
+
+    def record_phase(self, name, seconds):
+        with self.lock:
+            self.phases[name] = round(seconds, 3)
+
+    @contextmanager
+    def measure(self, name):
+        """with ブロックを1回のシグナル実行として計測する（一括評価や事前準備に使う）"""
+        token = current_signal.set(name)
+        started = time.perf_counter()
+        try:
+            yield
+        except Exception as e:
+            self.record_signal(name, time.perf_counter() - started, 'error', e)
+            raise
+        finally:
+            current_signal.reset(token)
+        self.record_signal(name, time.perf_counter() - started, 'ok')
+
+    def timed(self, upstream, func, *args, **kwargs):
+        """func を1回の外部リクエストとして計測しながら実行する"""
+        started = time.perf_counter()
+        try:
+            result = func(*args, **kwargs)
+        except Exception as e:
+            self.record_request(upstream, time.perf_counter() - started, type(e).__name__)
+            raise
+        self.record_request(upstream, time.perf_counter() - started, 'ok')
+        return result
+
+    def attach_twitch(self, twitch_api):
+        """twitchAPI の全リクエストを、twitch への外部リクエストとして数える"""
+        original_request = twitch_api._api_request
+
+        async def traced_request(method, session, url, *args, **kwargs):
+            started = time.perf_counter()
+            try:
+                response = await original_request(method, session, url, *args, **kwargs)
+            except Exception as e:
+                self.record_request('twitch', time.perf_counter() - started, type(e).__name__)
+                raise
+            self.record_request('twitch', time.perf_counter() - started, response.status)
+            return response
+
+        twitch_api._api_request = traced_request
+
+    def to_dict(self):
+        with self.lock:
+            return {
+                'started_at': datetime.fromtimestamp(self.started_at, timezone.utc).isoformat(),
+                'elapsed_seconds': round(time.time() - self.started_at, 3),
+                'phases': dict(self.phases),
+                'signals': {
+                    name: {
+                        **_latency_stats(durations),
+                        'outcomes': dict(self.signal_outcomes[name]),
+                        'requests': dict(self.requests_by_signal.get(name, {})),
+                        'errors': self.signal_errors.get(name, [])[:20],
+                        'error_count': len(self.signal_errors.get(name, [])),
+                    }
+                    for name, durations in sorted(self.signal_durations.items())
+                },
+                'upstreams': {
+                    upstream: {**_latency_stats(durations), 'statuses': dict(self.request_statuses[upstream])}
+                    for upstream, durations in sorted(self.request_durations.items())
+                },
+                'requests_by_signal': {name: dict(counts) for name, counts in self.requests_by_signal.items()},
+            }
+
+    def write_report(self, report_dir, extra=None):
+        """実行ごとのJSONレポートを書き出し、そのパスを返す"""
+        os.makedirs(report_dir, exist_ok=True)
+        stamp = datetime.fromtimestamp(self.started_at, timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+        path = os.path.join(report_dir, f"run_{stamp}.json")
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({**self.to_dict(), **(extra or {})}, f, ensure_ascii=False, indent=2)
+        return path
+
+    def summary_lines(self, limit=8):
+        """Discordに載せる短いまとめ（失敗のあったシグナルと、時間のかかったシグナル・問い合わせ先）"""
+        report = self.to_dict()
+        lines = [f"⏱️ 実行時間 {report['elapsed_seconds']:.0f}秒"]
+        for name, stats in report['signals'].items():
+            if stats['error_count']:
+                lines.append(f"❗ {name}: 失敗 {stats['error_count']}/{stats['count']}回")
+        slowest = sorted(report['signals'].items(), key=lambda item: item[1].get('total_seconds', 0), reverse=True)
+        for name, stats in slowest[:3]:
+            lines.append(f"🐢 {name}: 合計 {stats['total_seconds']:.1f}秒 (p95 {stats['p95']:.2f}秒)")
+        for upstream, stats in report['upstreams'].items():
+            lines.append(f"🌐 {upstream}: {stats['count']}リクエスト (p95 {stats['p95']:.2f}秒)")
+        return lines[:limit]
@@ -0,0 +1,84 @@
+import json
+import sqlite3
+import threading
+import time
+
+# Googleトレンドの interest_over_time を、キーワード × 期間ごとに覚えておくキャッシュ
+TRENDS_CACHE_FILE = 'trends_cache.sqlite3'
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS interest (
+    keyword    TEXT NOT NULL,
+    timeframe  TEXT NOT NULL,
+    anchor     TEXT NOT NULL,
+    series     TEXT NOT NULL,          -- 値のJSON配列（空はデータなし）。急上昇率は尺度によらない比で判定する
+    volume     REAL NOT NULL,          -- アンカー語の平均を100とした、その語の最大値の見積もり（問い合わせの組分けに使う）
+    fetched_at REAL NOT NULL,
+    PRIMARY KEY (keyword, timeframe, anchor)
+);
+"""
+
+# google_trends はスレッドプールで並行に動くので、接続は1つにしてロックで順番に使う
+_lock = threading.Lock()
+
+
+def open_cache(path=TRENDS_CACHE_FILE):
+    conn = sqlite3.connect(path, check_same_thread=False)
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute('PRAGMA synchronous=NORMAL')
+    # volume 列のない古いキャッシュは、作り直す（TTLの短いキャッシュなので、捨てても次の実行で埋まる）
+    columns = {row[1] for row in conn.execute('PRAGMA table_info(interest)')}
+    if columns and 'volume' not in columns:
+        conn.execute('DROP TABLE interest')
+    conn.executescript(_SCHEMA)
+    return conn
+
+
+def close_cache(conn):
+    if conn is not None:
+        with _lock:
+            conn.commit()
+            conn.close()
+
+
+def get_many(conn, keywords, timeframe, anchor, ttl_hours):
+    """TTL以内に取得済みのキーワードだけを、キーワード -> 値のリスト で返す"""
+    if conn is None or not keywords:
+        return {}
+    fresh_after = time.time() - ttl_hours * 3600
+    placeholders = ','.join('?' * len(keywords))
+    with _lock:
+        rows = conn.execute(
+            f'SELECT keyword, series FROM interest WHERE timeframe = ? AND anchor = ? AND fetched_at >= ? '
+            f'AND keyword IN ({placeholders})',
+            (timeframe, anchor, fresh_after, *keywords),
+        ).fetchall()
+    return {keyword: json.loads(series) for keyword, series in rows}
+
+
+def get_volumes(conn, keywords, timeframe, anchor):
+    """前回までに見積もった、キーワード -> アンカー語基準の最大値（TTLが切れていても使う）"""
+    if conn is None or not keywords:
+        return {}
+    placeholders = ','.join('?' * len(keywords))
+    with _lock:
+        rows = conn.execute(
+            f'SELECT keyword, volume FROM interest WHERE timeframe = ? AND anchor = ? AND keyword IN ({placeholders})',
+            (timeframe, anchor, *keywords),
+        ).fetchall()
+    return dict(rows)
+
+
+def put_many(conn, fetched, timeframe, anchor):
+    """fetched: キーワード -> (値のリスト, アンカー語基準の最大値の見積もり)"""
+    if conn is None or not fetched:
+        return
+    now = time.time()
+    with _lock:
+        conn.executemany(
+            'INSERT OR REPLACE INTO interest (keyword, timeframe, anchor, series, volume, fetched_at) '
+            'VALUES (?, ?, ?, ?, ?, ?)',
+            [(keyword, timeframe, anchor, json.dumps(series), volume, now)
+             for keyword, (series, volume) in fetched.items()],
+        )
+        conn.commit()
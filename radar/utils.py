@@ -1,14 +1,17 @@
 import requests
-import json
 import os
+import asyncio
 from datetime import datetime, timedelta
-from rapidfuzz import fuzz, process # 新しい「あいまい検索」ライブラリをインポート
+from . import steam_index, app_catalog, appid_cache
 
-STEAM_APP_LIST_FILE = 'steam_app_list.json'
+# 全アプリの名前とAppIDを、メモリマップで読めるバイナリ形式で保存する
+STEAM_APP_LIST_FILE = steam_index.STEAM_APP_INDEX_FILE
 
-def update_steam_app_list():
+def update_steam_app_list(http=None):
     """Steamの全アプリリストを取得し、ローカルに保存する関数"""
-    if os.path.exists(STEAM_APP_LIST_FILE):
+    http = http or requests
+    # 壊れていて開けないファイルは、新しくても作り直す
+    if os.path.exists(STEAM_APP_LIST_FILE) and steam_index.open_index(STEAM_APP_LIST_FILE) is not None:
         last_modified_time = datetime.fromtimestamp(os.path.getmtime(STEAM_APP_LIST_FILE))
         if datetime.now() - last_modified_time < timedelta(days=1):
             print("✅ Steamアプリリストは最新です。")
@@ -17,7 +20,7 @@ def update_steam_app_list():
     print("🔄 Steamアプリリストを更新中...")
     try:
         url = "https://api.steampowered.com/ISteamApps/GetAppList/v2/"
-        response = requests.get(url, timeout=30)
+        response = http.get(url, timeout=30)
         response.raise_for_status()
         apps = response.json().get('applist', {}).get('apps', [])
         
@@ -26,36 +29,99 @@ def update_steam_app_list():
         app_names = [app['name'] for app in apps if app.get('name')]
         app_dict = {app['name']: app['appid'] for app in apps if app.get('name')}
         
-        # 2つのデータをまとめて一つのjsonに保存
-        data_to_save = {'names': app_names, 'dict': app_dict}
-        
-        with open(STEAM_APP_LIST_FILE, 'w', encoding='utf-8') as f:
-            json.dump(data_to_save, f, ensure_ascii=False) # indentなしでファイルサイズを圧縮
+        # 名前の表・AppIDの配列・検索用インデックスを、まとめて一つのファイルに保存
+        steam_index.write_index(app_names, app_dict, STEAM_APP_LIST_FILE)
         print("✅ Steamアプリリストの更新が完了しました。")
     except requests.exceptions.RequestException as e:
         print(f"❌ Steamアプリリストの更新に失敗しました: {e}")
 
-def get_steam_appid(game_name, app_list_data):
+def incremental_app_list_enabled(cfg):
+    """差分の同期は IStoreService を使うので、STEAM_API_KEY がある時だけ有効にする"""
+    mode = cfg.get('steam_app_list', {}).get('mode', 'incremental')
+    return mode == 'incremental' and bool(os.environ.get('STEAM_API_KEY'))
+
+async def start_steam_app_list_sync(http, cfg):
+    """
+    Steamアプリリストの更新を始める。
+    - incremental : 前回から変わったアプリだけを取得する。手元にインデックスがあれば、
+                    Twitchの調査を待たせないようにバックグラウンドで進め、そのタスクを返す（初回だけは完了を待つ）
+    - full        : 従来どおり、1日1回アプリリスト全体を取り直す（完了を待ち、None を返す）
+    """
+    if not incremental_app_list_enabled(cfg):
+        await asyncio.to_thread(update_steam_app_list, http)
+        return None
+
+    task = asyncio.create_task(asyncio.to_thread(app_catalog.sync, http, cfg))
+    if os.path.exists(STEAM_APP_LIST_FILE):
+        print("🔄 Steamアプリリストの差分を、バックグラウンドで取得します...")
+        return task
+
+    print("🔄 Steamアプリリストを初めて取得中...")
+    await asyncio.gather(task, return_exceptions=True)
+    report_steam_app_list_sync(task)
+    return None
+
+def report_steam_app_list_sync(task, app_index=None):
+    """
+    バックグラウンドの同期が終わった時に呼ぶ。結果を表示し、インデックスを作り直していなければ、
+    変わったアプリを実行中のインデックスにそのまま上乗せする。
+    """
+    if task.cancelled():
+        return
+    if task.exception() is not None:
+        print(f"❌ Steamアプリリストの更新に失敗しました: {task.exception()}")
+        return
+    result = task.result()
+    print(
+        f"✅ Steamアプリリストを更新しました（{'全件' if result['mode'] == 'full' else '差分'}: "
+        f"受信 {result['received']}件 / 追加・改名 {result['changed']}件 / 削除 {result['removed']}件）"
+    )
+    if app_index is not None and not result['rebuilt']:
+        attach_app_list_overlay(app_index)
+
+def attach_app_list_overlay(app_index):
+    """インデックスを作った後に追加・改名されたアプリを、カタログから読んで上乗せする"""
+    conn = app_catalog.open_catalog()
+    try:
+        overlay = app_catalog.load_overlay(conn, STEAM_APP_LIST_FILE)
+    finally:
+        app_catalog.close_catalog(conn)
+    if overlay:
+        steam_index.attach_overlay(app_index, overlay)
+
+def load_steam_app_index(cfg=None):
+    """保存済みのアプリリストを、メモリマップで開く（全体の解析は行わない）"""
+    index = steam_index.open_index(STEAM_APP_LIST_FILE)
+    if index is None:
+        if not os.path.exists(STEAM_APP_LIST_FILE):
+            print("⚠️ Steamアプリリストファイルが見つかりません。")
+    elif cfg is not None and incremental_app_list_enabled(cfg):
+        attach_app_list_overlay(index)
+    return index
+
+def open_appid_cache(cfg):
+    """
+    AppIDの対応のキャッシュを開く。
+    incremental では、アプリの追加・改名で変わりうる対応だけを捨てる（全件を取り直した時だけ丸ごと捨てる）。
+    full では、アプリリストが書き換えられるたびに丸ごと捨てる。
+    """
+    if not incremental_app_list_enabled(cfg):
+        return appid_cache.open_cache(steam_index.index_version(STEAM_APP_LIST_FILE))
+
+    catalog_conn = app_catalog.open_catalog()
+    try:
+        conn = appid_cache.open_cache(app_catalog.catalog_version(catalog_conn))
+        appid_cache.apply_app_changes(conn, catalog_conn)
+    finally:
+        app_catalog.close_catalog(catalog_conn)
+    return conn
+
+def get_steam_appid(game_name, app_index):
     """
     「編集距離」を用いた、賢い“あいまい検索”でAppIDを探す。
+    メモリマップしたアプリリスト上で候補を絞り込み、
+    WRatioで「90%以上似ているもの」の中から最も近いものを選ぶ。
     """
-    if not app_list_data or 'names' not in app_list_data or 'dict' not in app_list_data:
+    if not app_index:
         return None
-        
-    app_names = app_list_data['names']
-    app_dict = app_list_data['dict']
-
-    # --- ★★★【改善①】“あいまい検索”で、最も似ている候補を1つだけ見つける★★★ ---
-    
-    # rapidfuzzライブラリを使い、最も一致スコアが高い候補を抽出
-    # score_cutoff=90 は、「90%以上似ているもの」だけに絞り込む、非常に厳しい基準
-    best_match = process.extractOne(game_name, app_names, scorer=fuzz.WRatio, score_cutoff=90)
-    
-    if best_match:
-        # 最も似ていると判断されたゲーム名を取得
-        matched_name = best_match[0]
-        # その名前を元に、辞書からAppIDを返す
-        return app_dict.get(matched_name)
-            
-    # 厳しい基準で見つからなければ、諦める
-    return None
\ No newline at end of file
+    return steam_index.find_appid(app_index, game_name)